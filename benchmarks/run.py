@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Headless benchmarks of the gtabview readers, models and Qt adapters.
+
+Each benchmark runs in a separate process (under the offscreen Qt platform)
+and reports the best time of a few repetitions, the peak memory traced
+during a single extra run and the peak resident size of the process.
+Results can be saved as baselines and compared across commits::
+
+  python benchmarks/run.py --save                   # baselines/<commit>.json
+  python benchmarks/run.py --compare baselines/abc1234.json
+  python benchmarks/run.py -k csv --rows 1e4,1e7    # select and size
+"""
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_ROOT)
+BASELINE_ROOT = os.path.join(BENCH_ROOT, 'baselines')
+DATA_ROOT = os.path.join(tempfile.gettempdir(), 'gtabview-bench')
+
+ROWS = [10 ** 4, 10 ** 5, 10 ** 6]  # Default row counts of the generated data
+REPEAT = 3                          # Timed repetitions of each benchmark
+THRESHOLD = 1.25                    # Slowdown ratio reported as a regression
+
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+
+BENCHMARKS = []
+
+def benchmark(name, params=None):
+    """Register a benchmark: func(param) performs the setup and returns the
+    function to time. params is a list, or a function returning the list"""
+    def register(func):
+        BENCHMARKS.append((name, func, params))
+        return func
+    return register
+
+
+def benchmarks():
+    """Return the (name, func, param) of each benchmark run"""
+    runs = []
+    for name, func, params in BENCHMARKS:
+        params = params() if callable(params) else params
+        for param in (params or [None]):
+            runs.append((name if param is None else '{}[{}]'.format(name, param),
+                         func, param))
+    return runs
+
+
+_APP = []
+
+def _app():
+    from gtabview.viewer import QtWidgets
+    if not _APP:
+        _APP.append(QtWidgets.QApplication.instance() or QtWidgets.QApplication([]))
+    return _APP[0]
+
+
+def csv_path(rows, cols=8):
+    """Return the path of a generated CSV file, creating it when needed"""
+    path = os.path.join(DATA_ROOT, 'data_{}x{}.csv'.format(rows, cols))
+    if os.path.exists(path):
+        return path
+    if not os.path.isdir(DATA_ROOT):
+        os.makedirs(DATA_ROOT)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fd:
+        fd.write(','.join('col{}'.format(x) for x in range(cols)) + '\n')
+        for y in range(rows):
+            fd.write('{},{:.3f},item{},'.format(y, y * 0.37, y % 1000))
+            fd.write(','.join(str((y * x) % 9973) for x in range(3, cols)) + '\n')
+    os.rename(tmp, path)
+    return path
+
+
+def frame(rows, cols=8):
+    import numpy as np
+    import pandas as pd
+    data = {'col{}'.format(x): np.arange(rows) * (x + 0.5) for x in range(cols - 2)}
+    data['text'] = ['item{}'.format(y % 1000) for y in range(rows)]
+    data['date'] = pd.date_range('2000-01-01', periods=rows, freq='s')
+    return pd.DataFrame(data)
+
+
+# Readers
+
+def _read_model(rows, **kwargs):
+    from gtabview.dataio import read_model
+    path = csv_path(rows)
+    def run():
+        model = read_model(path, **kwargs)
+        # the last row forces indexing the whole file when lazy
+        model.data(model.shape[0] - 1, 0)
+    return run
+
+@benchmark('read_model.csv', lambda: ROWS)
+def bench_read_csv(rows):
+    return _read_model(rows)
+
+@benchmark('read_model.csv_eager', lambda: ROWS)
+def bench_read_csv_eager(rows):
+    return _read_model(rows, lazy=False)
+
+
+# Models
+
+@benchmark('as_model', ['list', 'dict', 'vector', 'matrix', 'frame', 'series'])
+def bench_as_model(kind):
+    from gtabview.models import as_model
+    rows = 10 ** 5
+    if kind == 'list':
+        data = [[y, y * 0.5, 'x'] for y in range(rows)]
+    elif kind == 'dict':
+        data = {'col{}'.format(x): list(range(rows)) for x in range(8)}
+    elif kind == 'vector':
+        data = list(range(rows))
+    elif kind == 'matrix':
+        import numpy as np
+        data = np.arange(rows * 8.).reshape(rows, 8)
+    elif kind == 'frame':
+        data = frame(rows)
+    else:
+        data = frame(rows)['col1']
+    def run():
+        model = as_model(data)
+        model.shape
+    return run
+
+
+# Qt adapters
+
+def _viewport(model, qmodel, rows=64, cols=16):
+    from gtabview.viewer import QtCore
+    y0 = qmodel.rowCount() // 2
+    indexes = [qmodel.index(y, x) for y in range(y0, min(qmodel.rowCount(), y0 + rows))
+               for x in range(min(qmodel.columnCount(), cols))]
+    role = QtCore.Qt.DisplayRole
+    def run():
+        # with a cold cache
+        qmodel._cache.clear()
+        for index in indexes:
+            qmodel.data(index, role)
+    return run
+
+def _models(kind):
+    from gtabview.dataio import read_model
+    from gtabview.models import as_model
+    rows = 10 ** 6
+    if kind == 'csv':
+        model = read_model(csv_path(rows))
+        model.data(model.shape[0] - 1, 0)
+        return model
+    if kind == 'list':
+        return as_model([[y, y * 0.5, 'x{}'.format(y % 100)] * 4 for y in range(rows)])
+    if kind == 'matrix':
+        import numpy as np
+        return as_model(np.arange(rows * 16.).reshape(rows, 16))
+    data = frame(rows, 16)
+    if kind == 'multiindex':
+        import pandas as pd
+        data.index = pd.MultiIndex.from_arrays([data.index // 100, data['text']])
+    return as_model(data)
+
+@benchmark('Data4ExtModel.data', ['list', 'matrix', 'frame', 'csv'])
+def bench_data(kind):
+    from gtabview.viewer import Data4ExtModel
+    model = _models(kind)
+    return _viewport(model, Data4ExtModel(model))
+
+@benchmark('Header4ExtModel.data', ['frame', 'multiindex'])
+def bench_header(kind):
+    from gtabview.viewer import Header4ExtModel, QtGui
+    _app()
+    model = _models(kind)
+    return _viewport(model, Header4ExtModel(model, 1, QtGui.QPalette()))
+
+@benchmark('ExtTableView.resizeColumnsToContents', [16, 300])
+def bench_autosize(cols):
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView
+    _app()
+    table = ExtTableView()
+    table.setModel(as_model(frame(10 ** 5, cols)))
+    def run():
+        table._autosized_cols.clear()
+        table._glyphs.clear()
+        table.resizeColumnsToContents()
+    return run
+
+@benchmark('Viewer.view', ['frame', 'csv'])
+def bench_first_paint(kind):
+    from gtabview.dataio import read_model
+    from gtabview.models import as_model
+    from gtabview.viewer import Viewer
+    app = _app()
+    data = frame(10 ** 6) if kind == 'frame' else csv_path(10 ** 6)
+    def run():
+        # from reading the data to the first paint
+        model = as_model(data) if kind == 'frame' else read_model(data)
+        viewer = Viewer()
+        viewer.resize(1024, 768)
+        viewer.view(model)
+        viewer.grab()
+        app.processEvents()
+        viewer.close()
+    return run
+
+
+# Harness
+
+def _measure(name, repeat):
+    import tracemalloc
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    func, param = [(f, p) for n, f, p in benchmarks() if n == name][0]
+    run = func(param)
+    times = []
+    for _ in range(repeat):
+        start = clock()
+        run()
+        times.append(clock() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {'time': min(times), 'peak_mb': peak / 2.0 ** 20}
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result['rss_mb'] = rss / (2.0 ** 20 if sys.platform == 'darwin' else 2.0 ** 10)
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=PROJECT_ROOT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline, threshold):
+    regressions = 0
+    print("\ncompared with {} ({}):".format(baseline.get('commit'), baseline.get('date')))
+    for name, result in sorted(results.items()):
+        base = baseline['results'].get(name, {})
+        if 'time' not in base or 'time' not in result:
+            print("{:<48} (not comparable)".format(name))
+            continue
+        ratio = result['time'] / max(base['time'], 1e-9)
+        mark = ''
+        if ratio > threshold:
+            mark = '  SLOWER'
+            regressions += 1
+        elif ratio < 1 / threshold:
+            mark = '  faster'
+        print("{:<48} {:>9.4f}s {:>9.4f}s {:>6.2f}x{}".format(
+            name, base['time'], result['time'], ratio, mark))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the gtabview benchmarks")
+    parser.add_argument('-k', dest='select', action='append', default=[],
+                        help="Only run benchmarks containing this string")
+    parser.add_argument('--rows', help="Comma-separated row counts of the "
+                        "generated data (default: {})".format(
+                            ','.join(map(str, ROWS))))
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help="Timed repetitions of each benchmark")
+    parser.add_argument('--list', action='store_true', help="List the benchmarks")
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help="Save the results as a baseline (default: "
+                        "baselines/<commit>.json)")
+    parser.add_argument('--compare', metavar='PATH', help="Compare with a baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Slowdown ratio reported as a regression")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rows:
+        ROWS[:] = [int(float(rows)) for rows in args.rows.split(',')]
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.repeat)))
+        return 0
+
+    names = [name for name, _, _ in benchmarks()
+             if all(sel in name for sel in args.select)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = {}
+    for name in names:
+        cmd = [sys.executable, os.path.abspath(__file__), '--child', name,
+               '--repeat', str(args.repeat)]
+        if args.rows:
+            cmd += ['--rows', args.rows]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        if proc.returncode:
+            results[name] = {'error': err.decode(errors='replace').strip().split('\n')[-1]}
+            print("{:<48} error: {}".format(name, results[name]['error']))
+            continue
+        results[name] = json.loads(out.decode().strip().split('\n')[-1])
+        print("{:<48} {:>9.4f}s {:>9.1f}MB traced {:>9.1f}MB rss".format(
+            name, results[name]['time'], results[name]['peak_mb'],
+            results[name].get('rss_mb', 0)))
+
+    report = {'commit': _commit(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'results': results}
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_ROOT, '{}.json'.format(report['commit']))
+        if not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+        with open(path, 'w') as fd:
+            json.dump(report, fd, indent=2, sort_keys=True)
+        print("\nsaved to {}".format(path))
+    if args.compare:
+        with open(args.compare) as fd:
+            if _compare(results, json.load(fd), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
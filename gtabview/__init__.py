@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, unicode_literals, absolute_import
 
-import inspect
 import sys
 import warnings
 
 from gtabview_cli import __version__
 from .compat import *
+from . import profiling
 from .dataio import read_model
-from .viewer import QtGui, QtCore, QtWidgets
-from .viewer import Viewer
+
+# Qt is only imported when first needed
+_VIEWER_NAMES = ('QtGui', 'QtCore', 'QtWidgets', 'Viewer')
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _VIEWER_NAMES:
+            from . import viewer
+            return getattr(viewer, name)
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+else:
+    from .viewer import QtGui, QtCore, QtWidgets
+    from .viewer import Viewer
 
 
 # view defaults
@@ -25,6 +36,7 @@ class ViewController(object):
     def __init__(self):
         super(ViewController, self).__init__()
         self._view = None
+        self._read_kwargs = {}
 
     def visible(self):
         if self._view is None:
@@ -32,25 +44,51 @@ class ViewController(object):
         return self._view.isVisible()
 
     def wait(self):
+        from .viewer import QtCore
         if self._view is None:
             return
         while self._view.isVisible():
             APP.processEvents(QtCore.QEventLoop.AllEvents |
                               QtCore.QEventLoop.WaitForMoreEvents)
 
-    def view(self, data, view_kwargs, wait, recycle):
+    def view(self, data, view_kwargs, wait, recycle, read_kwargs=None):
         global APP
-        APP = QtWidgets.QApplication.instance()
-        if APP is None:
-            APP = QtWidgets.QApplication([])
-        if self._view is None or not recycle:
-            self._view = Viewer()
-        self._view.view(data, **view_kwargs)
+        # the stage does not include the time spent waiting for the window
+        with profiling.stage('ViewController.view'):
+            from .viewer import QtWidgets, Viewer
+            APP = QtWidgets.QApplication.instance()
+            if APP is None:
+                APP = QtWidgets.QApplication([])
+            if self._view is None or not recycle:
+                self._view = Viewer()
+            if read_kwargs is not None:
+                self._read_kwargs = read_kwargs
+            self._view.view(data, **view_kwargs)
         if wait:
             self.wait()
 
+    @profiling.timed('ViewController.update')
+    def update(self, data, **kwargs):
+        """Show data, an updated version of the data being viewed (such as a
+        DataFrame after appending rows), without resetting the view: only the
+        changed rows, columns and visible values are refreshed, keeping the
+        selection, cursor, scroll position and column widths. The data is
+        read with the options given to view(), overridden by kwargs"""
+        if self._view is None:
+            raise RuntimeError("no data is being viewed")
+        read_kwargs = dict(self._read_kwargs, **kwargs)
+        model = read_model(data, **read_kwargs)
+        if model is None:
+            warnings.warn("cannot visualize the supplied data type: {}".format(type(data)),
+                          category=RuntimeWarning)
+            return
+        self._read_kwargs = read_kwargs
+        self._view.updateModel(model)
+        APP.processEvents()
+
 
 def _varname_in_stack(var, skip):
+    import inspect
     frame = inspect.currentframe().f_back
     while skip:
         frame = frame.f_back
@@ -64,12 +102,17 @@ def _varname_in_stack(var, skip):
 
 def view(data, enc=None, start_pos=None, delimiter=None, hdr_rows=None,
          idx_cols=None, sheet_index=0, transpose=False, wait=None,
-         recycle=None, detach=None, metavar=None, title=None, sort=False):
+         recycle=None, detach=None, metavar=None, title=None, sort=False,
+         lazy=None, background=False, precision=None, profile=None,
+         follow=False):
     """View the supplied data in an interactive, graphical table widget.
 
     data: When a valid path or IO object, read it as a tabular text
-          file. Any other supported datatype is visualized directly and
-          incrementally *without copying*.
+          file, decompressing gzip, bzip2, xz and zstd (when zstandard
+          is installed) files transparently. Parquet files (or directories), Arrow/Feather and .npy
+          files are recognized and read on-demand. Any other supported
+          datatype is visualized directly and incrementally *without
+          copying*.
 
     enc: File encoding (such as "utf-8", normally autodetected).
 
@@ -89,9 +132,29 @@ def view(data, enc=None, start_pos=None, delimiter=None, hdr_rows=None,
 
     transpose: Transpose the resulting view.
 
+    precision: Number of digits shown after the decimal point for floating
+               point values. By default, use the shortest representation
+               (see ``gtabview.formatting.FLOAT_PRECISION``).
+
     sort: Request sorting of sets and keys of dicts where ordering is
           *normally* not meaningful.
 
+    lazy: For text files, only index the lines and parse rows on-demand
+          instead of reading the whole file in memory. By default, only
+          files larger than ``gtabview.dataio.LAZY_SIZE`` are read lazily.
+          Spreadsheets are always read on-demand, unless False.
+
+    background: For streams and large files, show the data immediately and
+                keep reading in the background. The view grows as rows are
+                loaded. Files read completely (see lazy) are parsed at once.
+
+    follow: For text files being appended to (such as logs), keep reading the
+            lines as they are written, like ``tail -f``. The view scrolls to
+            the new rows while showing the last row. The file is read again
+            when truncated or replaced (rotated). Changes are watched with
+            inotify on Linux, or polled every ``gtabview.watch.POLL_INTERVAL``
+            seconds.
+
     metavar: name of the variable being shown for display purposes (inferred
              automatically when possible).
 
@@ -105,16 +168,27 @@ def view(data, enc=None, start_pos=None, delimiter=None, hdr_rows=None,
     recycle: Recycle the previous window instead of creating a new one. The
              default is True, and can also be set through ``gtabview.RECYCLE``.
 
+    profile: Report the time spent in each loading stage (reading, modeling,
+             layout and first paint) as JSON: True for stderr, or the path of
+             the report. Also enabled by the ``GTABVIEW_PROFILE`` environment
+             variable (1 or a path). A Chrome trace is also written when
+             ``gtabview.profiling.TRACE`` (or ``GTABVIEW_PROFILE_TRACE``) is
+             set to a path.
+
     detach: Ignored for backward compatibility.
     """
     global WAIT, RECYCLE, VIEW
 
-    model = read_model(data, enc=enc, delimiter=delimiter, hdr_rows=hdr_rows,
-                       idx_cols=idx_cols, sheet_index=sheet_index,
-                       transpose=transpose, sort=sort)
+    profiling.start(profile)
+    read_kwargs = {'enc': enc, 'delimiter': delimiter, 'hdr_rows': hdr_rows,
+                   'idx_cols': idx_cols, 'sheet_index': sheet_index,
+                   'transpose': transpose, 'sort': sort, 'lazy': lazy,
+                   'background': background, 'follow': follow}
+    model = read_model(data, **read_kwargs)
     if model is None:
         warnings.warn("cannot visualize the supplied data type: {}".format(type(data)),
                       category=RuntimeWarning)
+        profiling.finish()
         return None
 
     # install gui hooks in ipython/jupyter
@@ -149,6 +223,7 @@ def view(data, enc=None, start_pos=None, delimiter=None, hdr_rows=None,
 
     # actually show the data
     view_kwargs = {'hdr_rows': hdr_rows, 'idx_cols': idx_cols,
-                   'start_pos': start_pos, 'metavar': metavar, 'title': title}
-    VIEW.view(model, view_kwargs, wait=wait, recycle=recycle)
+                   'start_pos': start_pos, 'metavar': metavar, 'title': title,
+                   'precision': precision, 'follow': follow}
+    VIEW.view(model, view_kwargs, wait=wait, recycle=recycle, read_kwargs=read_kwargs)
     return VIEW
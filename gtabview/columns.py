@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+# Typed column storage of parsed text, see dataio.read_csv_typed
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+from .formatting import format_column
+from .models import ExtDataModel, getitem
+
+import sys
+
+KINDS = ['int', 'float', 'bool', 'date', 'datetime', 'str']
+
+DTYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool',
+          'date': 'datetime64[D]', 'datetime': 'datetime64[s]'}
+
+DICT_SIZE = 1 << 12     # Maximum distinct strings of dictionary-encoded columns
+DICT_RATIO = 0.5        # ... relative to the number of rows
+CHECK_ROWS = 256        # Floats checked to be shown as read in each parsed column
+
+def infer_kind(values):
+    """Return the kind of a column from a sample of its strings: the first
+    of KINDS which converts all of them exactly (see convert)"""
+    if not any(values):
+        return 'str'
+    for kind in KINDS[:-1]:
+        if convert(values, kind) is not None:
+            return kind
+    return 'str'
+
+
+_BOOLS = {'True': True, 'False': False}
+
+_NAN = {'': 'nan'}
+
+
+def _ascii(values):
+    # bytes of the values joined by newlines (or None if not ASCII)
+    import numpy as np
+    try:
+        return np.frombuffer('\n'.join(values).encode('ascii'), np.uint8)
+    except UnicodeError:
+        return None
+
+
+def _leading_zeros(chars, start):
+    # whether some value starts (after a minus) with a zero followed by a digit
+    zero = start & (chars == 48)
+    zero[1:] |= start[:-1] & (chars[:-1] == 45) & (chars[1:] == 48)
+    digit = (chars >= 48) & (chars <= 57)
+    return bool((zero[:-1] & digit[1:]).any())
+
+
+def _starts(chars):
+    # whether each byte starts a newline-separated value
+    import numpy as np
+    start = np.ones(len(chars), dtype=bool)
+    start[1:] = chars[:-1] == 10
+    return start
+
+
+def _is_int(chars):
+    # whether all the newline-separated values are integers shown as such
+    import numpy as np
+    digit = (chars >= 48) & (chars <= 57)
+    newline = chars == 10
+    minus = chars == 45
+    start = _starts(chars)
+    after_minus = np.zeros(len(chars), dtype=bool)
+    after_minus[1:] = minus[:-1] & start[:-1]
+    first = digit & (start | after_minus)
+    # no negative zero either
+    return bool((digit | newline | minus).all() and not (minus & ~start).any() and
+                not _leading_zeros(chars, start) and not (after_minus & (chars == 48)).any() and
+                first.sum() == newline.sum() + 1)
+
+
+def _is_float(chars):
+    # whether the newline-separated values only contain decimal numbers,
+    # without leading zeros (as for identifiers or codes)
+    import numpy as np
+    allowed = np.zeros(256, dtype=bool)
+    allowed[[ord(c) for c in '0123456789.-+eE\n']] = True
+    return bool(allowed[chars].all()) and not _leading_zeros(chars, _starts(chars))
+
+
+def convert(values, kind):
+    """Return the strings values converted to a NumPy array of kind, or None
+    when some value does not conform. Values are only converted when shown
+    exactly as the original strings (no leading zeros or partial dates).
+    Floats are checked on CHECK_ROWS of the values: when not shown as read
+    (such as with fixed decimals, or integers with missing values), the
+    strings are kept along the array in a SourceColumn"""
+    import numpy as np
+    if kind == 'str':
+        return None
+    if not len(values):
+        return np.empty(0, dtype=DTYPES[kind])
+    try:
+        if kind in ('int', 'float'):
+            # validated on the bytes, converted by Python
+            chars = _ascii(values)
+            if chars is None or not (_is_int if kind == 'int' else _is_float)(chars):
+                return None
+            if kind == 'int':
+                array = np.fromiter(map(int, values), np.int64, len(values))
+            else:
+                array = np.fromiter(map(float, map(_NAN.get, values, values)),
+                                    np.float64, len(values))
+        elif kind == 'bool':
+            array = np.fromiter(map(_BOOLS.__getitem__, values), bool, len(values))
+        else:
+            strings = np.array(values, dtype=str)
+            if (strings == 'NaT').any():
+                return None
+            strings = np.where(strings == '', 'NaT', strings)
+            array = strings.astype(DTYPES[kind])
+            if not (np.datetime_as_string(array) == strings).all():
+                return None
+    except (KeyError, ValueError, OverflowError, TypeError):
+        return None
+    if kind == 'float':
+        step = max(1, len(values) // CHECK_ROWS)
+        if format_column(array[::step]) != list(values[::step]):
+            return SourceColumn(array, text_column(values))
+    return array
+
+
+def missing(kind, count):
+    """Return an array of count missing values of kind, or None for kinds
+    which cannot represent them"""
+    import numpy as np
+    if kind == 'str':
+        return CodedColumn(np.zeros(count, dtype=np.uint8), [''])
+    if kind == 'float':
+        return np.full(count, np.nan)
+    if kind in ('date', 'datetime'):
+        return np.full(count, np.datetime64('NaT'), dtype=DTYPES[kind])
+    return None
+
+
+class TextColumn(object):
+    """Strings stored compactly as a single string, with the end offset of
+    each one"""
+
+    def __init__(self, text, ends):
+        self.text = text
+        self.ends = ends
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self.text) + self.ends.nbytes
+
+    @classmethod
+    def from_strings(cls, strings):
+        import numpy as np
+        ends = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, strings), np.int64, len(strings)), out=ends[1:])
+        return cls(''.join(strings), ends)
+
+    @classmethod
+    def concat(cls, columns):
+        import numpy as np
+        columns = [column.text_column() if isinstance(column, CodedColumn) else column
+                   for column in columns]
+        ends = [np.zeros(1, dtype=np.int64)]
+        offset = 0
+        for column in columns:
+            ends.append(column.ends[1:] + offset)
+            offset += len(column.text)
+        return cls(''.join(column.text for column in columns), np.concatenate(ends))
+
+    def __len__(self):
+        return len(self.ends) - 1
+
+    def __getitem__(self, idx):
+        return self.text[int(self.ends[idx]):int(self.ends[idx + 1])]
+
+    def slice(self, y0, y1):
+        ends = self.ends[y0:y1 + 1].tolist()
+        return [self.text[a:b] for a, b in zip(ends, ends[1:])]
+
+    def take(self, rows):
+        import numpy as np
+        rows = np.asarray(rows)
+        starts = self.ends[rows].tolist()
+        ends = self.ends[rows + 1].tolist()
+        return [self.text[a:b] for a, b in zip(starts, ends)]
+
+    def array(self, y0, y1):
+        return _native(self.slice(y0, y1))
+
+    def take_array(self, rows):
+        return _native(self.take(rows))
+
+
+def _code_type(count):
+    import numpy as np
+    return np.uint8 if count <= 1 << 8 else np.uint16 if count <= 1 << 16 else np.int32
+
+
+class CodedColumn(object):
+    """Strings stored as integer codes into a dictionary of distinct values
+    (categories), for columns of few distinct strings"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = list(categories)
+        self._objects = _native(self.categories)
+
+    @classmethod
+    def encode(cls, strings, limit=None):
+        """Return strings encoded as a CodedColumn, or None when having more
+        than limit (by default DICT_SIZE, or DICT_RATIO of the rows) distinct
+        values"""
+        import numpy as np
+        if limit is None:
+            limit = min(DICT_SIZE, int(len(strings) * DICT_RATIO))
+        # quickly reject columns of unique values from their head
+        if len(dict.fromkeys(strings[:limit * 2 + 1])) > limit:
+            return None
+        index = dict.fromkeys(strings)
+        if len(index) > limit:
+            return None
+        for code, string in enumerate(index):
+            index[string] = code
+        codes = np.fromiter(map(index.__getitem__, strings), _code_type(len(index)), len(strings))
+        return cls(codes, index)
+
+    @classmethod
+    def merge(cls, columns, limit=None):
+        """Return the concatenation of CodedColumns, merging their
+        dictionaries, or None when the merged one exceeds limit (by default
+        DICT_SIZE)"""
+        import numpy as np
+        if limit is None:
+            limit = DICT_SIZE
+        index = {}
+        mappings = []
+        for column in columns:
+            mappings.append([index.setdefault(string, len(index))
+                             for string in column.categories])
+            if len(index) > limit:
+                return None
+        dtype = _code_type(len(index))
+        codes = [np.asarray(mapping, dtype=dtype)[column.codes]
+                 for mapping, column in zip(mappings, columns)]
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=dtype)
+        return cls(codes, index)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self._objects.nbytes + \
+            sum(map(sys.getsizeof, self.categories))
+
+    @property
+    def text_nbytes(self):
+        """Size of the strings when stored as a TextColumn"""
+        import numpy as np
+        lengths = np.fromiter(map(len, self.categories), np.int64, len(self.categories))
+        counts = np.bincount(self.codes, minlength=len(self.categories))
+        chars = int(counts.dot(lengths))
+        # the size of str depends on its widest character
+        top = max([max(string) for string in self.categories if string] or [''])
+        width = 1 if top <= '\xff' else 2 if top <= '\uffff' else 4
+        base = sys.getsizeof(top) - len(top) * width
+        return base + chars * width + (len(self) + 1) * 8
+
+    def text_column(self):
+        return TextColumn.from_strings(self.slice(0, len(self)))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, idx):
+        return self.categories[self.codes[idx]]
+
+    def slice(self, y0, y1):
+        return self.array(y0, y1).tolist()
+
+    def take(self, rows):
+        return self.take_array(rows).tolist()
+
+    def array(self, y0, y1):
+        return self._objects[self.codes[y0:y1]]
+
+    def take_array(self, rows):
+        return self._objects[self.codes[rows]]
+
+
+class SourceColumn(object):
+    """Native values along with the strings they were read from, which are
+    shown instead of the formatted values"""
+
+    def __init__(self, values, text):
+        self.values = values
+        self.text = text
+
+    @classmethod
+    def concat(cls, columns):
+        """Concatenate SourceColumns or arrays, whose strings are formatted"""
+        import numpy as np
+        columns = [column if isinstance(column, cls) else
+                   cls(column, text_column(format_column(column))) for column in columns]
+        return cls(np.concatenate([column.values for column in columns]),
+                   concat_text([column.text for column in columns]))
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.text.nbytes
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _values(column):
+    return column.values if isinstance(column, SourceColumn) else column
+
+
+def is_text(column):
+    return isinstance(column, (TextColumn, CodedColumn))
+
+
+def text_column(strings):
+    """Return strings as a CodedColumn when having few distinct values, or
+    as a TextColumn otherwise"""
+    column = CodedColumn.encode(strings)
+    return column if column is not None else TextColumn.from_strings(strings)
+
+
+def concat_text(columns):
+    """Concatenate string columns, keeping the dictionary encoding while
+    the merged dictionary stays within DICT_SIZE"""
+    if columns and all(isinstance(column, CodedColumn) for column in columns):
+        column = CodedColumn.merge(columns)
+        if column is not None:
+            return column
+    return TextColumn.concat(columns)
+
+
+def _strings(column, y0, y1):
+    # text of a column slice, as in the parsed file
+    if is_text(column):
+        return column.slice(y0, y1)
+    if isinstance(column, SourceColumn):
+        return column.text.slice(y0, y1)
+    return format_column(column[y0:y1])
+
+
+def _native(values):
+    import numpy as np
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class ExtColumnModel(ExtDataModel):
+    """Columns of parsed text stored by type: as NumPy arrays, or
+    CodedColumn/TextColumn for strings. Header rows are kept as lists of
+    strings, while the first idx_cols columns are the index. Values are
+    returned as text (as read), while column slices are native arrays"""
+
+    def __init__(self, columns, rows, header=(), idx_cols=0):
+        super(ExtColumnModel, self).__init__()
+        self._columns = list(columns)
+        self._header = [list(row) for row in header]
+        self._idx_cols = min(idx_cols, len(self._columns))
+        self._shape = (rows, len(self._columns) - self._idx_cols)
+        self._header_shape = (len(self._header), self._idx_cols)
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def header_shape(self):
+        return self._header_shape
+
+    def kind(self, x):
+        """Return the kind of column x (see KINDS)"""
+        column = self._columns[x + self._idx_cols]
+        if is_text(column):
+            return 'str'
+        return [kind for kind, dtype in DTYPES.items() if _values(column).dtype == dtype][0]
+
+    def memory_usage(self):
+        """Return the bytes used by each column (including the index)"""
+        return [column.nbytes for column in self._columns]
+
+    def data(self, y, x):
+        column = self._columns[x + self._idx_cols]
+        if is_text(column):
+            return column[y]
+        if isinstance(column, SourceColumn):
+            return column.text[y]
+        return _strings(column, y, y + 1)[0]
+
+    def data_block(self, y0, y1, x0, x1):
+        columns = [_strings(self._columns[x + self._idx_cols], y0, y1) for x in range(x0, x1)]
+        if not columns:
+            return [[] for _ in range(y0, y1)]
+        return [list(row) for row in zip(*columns)]
+
+    def column_block(self, x, y0, y1):
+        column = self._columns[x + self._idx_cols]
+        if is_text(column):
+            return column.array(y0, y1)
+        return _values(column)[y0:y1]
+
+    def column_text(self, x, y0, y1):
+        column = self._columns[x + self._idx_cols]
+        if isinstance(column, SourceColumn):
+            return column.text.slice(y0, y1)
+        return None
+
+    def row_block(self, y, x0, x1):
+        return None
+
+    def column_take(self, x, rows):
+        column = self._columns[x + self._idx_cols]
+        if is_text(column):
+            return column.take_array(rows)
+        return _values(column)[rows]
+
+    def header(self, axis, x, level):
+        if axis == 0:
+            return getitem(self._header[level], x + self._idx_cols)
+        return _strings(self._columns[level], x, x + 1)[0]
+
+    def header_block(self, axis, x0, x1, level):
+        if axis == 0:
+            return super(ExtColumnModel, self).header_block(axis, x0, x1, level)
+        return _strings(self._columns[level], x0, x1)
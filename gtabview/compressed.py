@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from .compat import *
+
+import bisect
+import io
+import threading
+from collections import OrderedDict
+
+READ_BYTES = 1 << 16         # Compressed bytes read at once
+BLOCK_BYTES = 1 << 20        # Decompressed bytes in each cached block
+BLOCK_CACHE = 64             # Maximum number of decompressed blocks kept by each buffer
+CHECKPOINT_BYTES = 16 << 20  # Decompressed bytes between decompressor checkpoints
+
+MAGIC = [(b'\x1f\x8b', 'gzip'),
+         (b'BZh', 'bz2'),
+         (b'\xfd7zXZ\x00', 'xz'),
+         (b'\x28\xb5\x2f\xfd', 'zstd')]
+
+
+def detect(head):
+    """Return the compression format given the first bytes of a file, or None"""
+    for magic, fmt in MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def detect_path(path):
+    with open(path, 'rb') as fd:
+        return detect(fd.read(8))
+
+
+def decompressor(fmt):
+    """Return a new decompressor for a single member (or stream, or frame)"""
+    if fmt == 'gzip':
+        import zlib
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if fmt == 'bz2':
+        import bz2
+        return bz2.BZ2Decompressor()
+    if fmt == 'xz':
+        import lzma
+        return lzma.LZMADecompressor()
+    try:
+        from compression import zstd
+        return zstd.ZstdDecompressor()
+    except ImportError:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _finished(state):
+    # Python 2 decompressors lack eof, but keep any data after the end
+    return state.eof if hasattr(state, 'eof') else bool(state.unused_data)
+
+
+class _Cursor(object):
+    # Sequential decompression of fd, starting from the in_pos/out_pos offsets
+    # of the compressed/decompressed data with a copy of a decompressor state
+    # (or from the start of a member). When in_pos is None, fd is read as a
+    # stream without seeking.
+    def __init__(self, fmt, fd, in_pos=None, out_pos=0, state=None):
+        self.fmt = fmt
+        self.fd = fd
+        self.in_pos = in_pos
+        self.out_pos = out_pos
+        self.state = state.copy() if state is not None else None
+        self.eof = False
+        self._input = b''
+
+    def read(self):
+        """Return the next decompressed bytes, or b'' at the end"""
+        while not self.eof:
+            if self.in_pos is not None:
+                self.fd.seek(self.in_pos)
+            data = self._input or self.fd.read(READ_BYTES)
+            self._input = b''
+            if not data:
+                self.eof = True
+                break
+            if self.state is None:
+                # a new member starts, otherwise ignore the trailing garbage
+                if detect(data) != self.fmt:
+                    self.eof = True
+                    break
+                self.state = decompressor(self.fmt)
+            out = self.state.decompress(data)
+            used = len(data)
+            if _finished(self.state):
+                used -= len(self.state.unused_data)
+                if self.in_pos is None:
+                    self._input = self.state.unused_data
+                self.state = None
+            if self.in_pos is not None:
+                self.in_pos += used
+            self.out_pos += len(out)
+            if out:
+                return out
+        return b''
+
+
+class DecompressedStream(io.RawIOBase):
+    """Read-only stream over the decompressed contents of fd"""
+
+    def __init__(self, fd, fmt):
+        super(DecompressedStream, self).__init__()
+        in_pos = fd.tell() if fd.seekable() else None
+        self._cursor = _Cursor(fmt, fd, in_pos)
+        self._data = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._data:
+            self._data = self._cursor.read()
+        size = min(len(b), len(self._data))
+        b[:size] = self._data[:size]
+        self._data = self._data[size:]
+        return size
+
+
+def open_stream(fd):
+    """Return a decompressed stream for fd when compressed, or fd itself.
+    The compression is detected without consuming fd when possible."""
+    if hasattr(fd, 'peek'):
+        head = fd.peek(8)[:8]
+    elif getattr(fd, 'seekable', lambda: False)():
+        pos = fd.tell()
+        head = fd.read(8)
+        fd.seek(pos)
+    else:
+        # including Python 2 files, which are read as they are
+        return fd
+    fmt = detect(head)
+    if fmt is None:
+        return fd
+    return io.BufferedReader(DecompressedStream(fd, fmt), READ_BYTES)
+
+
+class SeekableBuffer(object):
+    """Random-access buffer over the decompressed contents of a file.
+
+    The file is decompressed sequentially with `fill`, which records
+    checkpoints: the start of each member/frame and, when the decompressor
+    state can be copied, its state every CHECKPOINT_BYTES. Slices are then
+    decompressed from the closest checkpoint and kept in an LRU of blocks.
+    `size` grows until `complete`.
+
+    Only gzip decompressors can be copied: bzip2, xz and zstd files are
+    resumed from the start of their streams/frames, so that files made of a
+    single large frame are decompressed again from their start on random
+    access. The checkpoints only live as long as the buffer: they are not
+    stored along the file, nor reused by other processes."""
+
+    def __init__(self, path, fmt):
+        self._fd = open(path, 'rb')
+        self._fmt = fmt
+        self._lock = threading.Lock()
+        self._checkpoints = [(0, 0, None)]
+        self._outs = [0]
+        self._blocks = OrderedDict()
+        self._scan = _Cursor(fmt, self._fd, 0)
+        self._tail = b''
+        self.size = 0
+        self.complete = False
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        with self._lock:
+            self._fd.close()
+
+    def _store(self, block, data):
+        self._blocks.pop(block, None)
+        self._blocks[block] = data
+        if len(self._blocks) > BLOCK_CACHE:
+            self._blocks.popitem(last=False)
+
+    def _checkpoint(self, cursor):
+        if cursor.state is None:
+            state = None
+        elif hasattr(cursor.state, 'copy') and \
+             cursor.out_pos - self._outs[-1] >= CHECKPOINT_BYTES:
+            state = cursor.state.copy()
+        else:
+            return
+        if cursor.out_pos > self._outs[-1]:
+            self._checkpoints.append((cursor.out_pos, cursor.in_pos, state))
+            self._outs.append(cursor.out_pos)
+
+    def fill(self, end=None):
+        """Decompress up to end (or everything). Return the available size"""
+        with self._lock:
+            while not self.complete and (end is None or self.size < end):
+                data = self._scan.read()
+                if not data:
+                    self.complete = True
+                    if self._tail:
+                        self._store(self.size // BLOCK_BYTES, self._tail)
+                    break
+                self._tail += data
+                start = self.size - (self.size % BLOCK_BYTES)
+                self.size += len(data)
+                while len(self._tail) >= BLOCK_BYTES:
+                    self._store(start // BLOCK_BYTES, self._tail[:BLOCK_BYTES])
+                    self._tail = self._tail[BLOCK_BYTES:]
+                    start += BLOCK_BYTES
+                self._checkpoint(self._scan)
+            return self.size
+
+    def _block(self, block):
+        data = self._blocks.get(block)
+        if data is not None:
+            self._blocks[block] = self._blocks.pop(block)
+            return data
+        if block == self.size // BLOCK_BYTES and not self.complete:
+            return self._tail
+
+        # decompress from the closest checkpoint
+        start = block * BLOCK_BYTES
+        out_pos, in_pos, state = self._checkpoints[bisect.bisect_right(self._outs, start) - 1]
+        cursor = _Cursor(self._fmt, self._fd, in_pos, out_pos, state)
+        parts = []
+        pos = out_pos
+        while pos < start + BLOCK_BYTES:
+            chunk = cursor.read()
+            if not chunk:
+                break
+            if pos + len(chunk) > start:
+                parts.append(chunk[max(0, start - pos):])
+            pos += len(chunk)
+        data = b''.join(parts)[:BLOCK_BYTES]
+        self._store(block, data)
+        return data
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("only slices are supported")
+        start, stop, _ = key.indices(self.size)
+        if start >= stop:
+            return b''
+        with self._lock:
+            parts = []
+            for block in range(start // BLOCK_BYTES, (stop - 1) // BLOCK_BYTES + 1):
+                base = block * BLOCK_BYTES
+                parts.append(self._block(block)[max(0, start - base):stop - base])
+            return b''.join(parts)
@@ -1,13 +1,62 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, unicode_literals, absolute_import
 
+import array
+import bisect
 import io
 import os
 import sys
+import threading
 import warnings
+from collections import OrderedDict
+from itertools import islice
 
 from .compat import *
-from .models import as_model
+from . import compressed
+from . import profiling
+from .watch import Watcher
+from .models import ExtDataModel, ExtListModel, as_model, getitem
+
+try:
+    from itertools import zip_longest
+except ImportError:
+    from itertools import izip_longest as zip_longest
+
+try:
+    array.array('Q')
+    _TYPECODE = 'Q'
+except (ValueError, TypeError):
+    # Python 2 lacks 'Q', and takes native strings only
+    _TYPECODE = b'L'
+
+
+LAZY_SIZE = 1 << 22     # Files larger than this (in bytes) are indexed, not parsed
+SCAN_BYTES = 1 << 22    # Bytes scanned at once when indexing lines
+SAMPLE_ROWS = 256       # Rows sampled to detect the format and width of lazy files
+ROW_CACHE = 4096        # Maximum number of parsed rows kept by lazy files
+LOAD_ROWS = 4096        # Rows published at once when loading in the background
+SAMPLE_BYTES = 1 << 16  # Size of each spot sampled for format detection
+SAMPLE_SPOTS = 4        # Random spots sampled in addition to the head and tail
+SNIFF_LINES = 32        # Lines of the sample given to csv.Sniffer
+SHEET_ROWS = 1024       # Rows decoded at once from streamed spreadsheets
+SHEET_BLOCKS = 16       # Maximum number of row blocks kept by streamed spreadsheets
+ARROW_COLUMNS = 16      # Columns read at once from each Arrow/Parquet chunk
+ARROW_CACHE = 1 << 28   # Memory budget (in bytes) for the column chunks kept in memory
+
+PARQUET_EXT = ('.parquet', '.pq')
+
+INDEX_CACHE = 2         # Indexes of compressed files kept for reuse (in this process only)
+FORMAT_CACHE = 64       # Detected formats of files kept for reuse
+
+PARALLEL_SIZE = 1 << 24 # With parallel=True, text larger than this (in bytes) is parsed in parallel
+PARALLEL_CHUNK = 1 << 24 # Bytes parsed at once by each worker process
+PARALLEL_WORKERS = None # Worker processes parsing in parallel (None for one per CPU)
+
+# Detected (encoding, dialect) by file
+_formats = OrderedDict()
+
+# Complete line indexes of compressed files, by file
+_indexes = OrderedDict()
 
 
 def _detect_encoding(data=None):
@@ -16,7 +65,7 @@ def _detect_encoding(data=None):
     list of encoding types to test.
 
     Args:
-        data - list of lists
+        data - list of byte lines (normally a sample from _sample_lines)
     Returns:
         enc - system encoding
     """
@@ -38,58 +87,1346 @@ def _detect_encoding(data=None):
     print("Encoding not detected. Please pass encoding value manually")
 
 
-def _parse_lines(data, enc=None, delimiter=None):
+def _decode(data, enc):
+    """Decode data with enc, falling back to the encoding detected on data
+    itself for the parts where the detection from a sample was wrong"""
+    try:
+        return data.decode(enc)
+    except UnicodeError:
+        pass
+    lines = data.splitlines(True)
+    if len(lines) > 1:
+        return ''.join(_decode(line, enc) for line in lines)
+    return data.decode(_detect_encoding(lines) or enc, 'replace')
+
+
+def _sample_lines(buf, size=None):
+    """Return a bounded sample of whole lines taken from the head, the tail and
+    a few spots in between of a buffer (or the head only, when size is None)"""
+    import random
+    if size is None or size <= SAMPLE_BYTES * (SAMPLE_SPOTS + 2):
+        spots = [0]
+        length = len(buf) if size is not None else SAMPLE_BYTES
+    else:
+        rnd = random.Random(size)
+        spots = [0, size - SAMPLE_BYTES]
+        spots += [rnd.randrange(SAMPLE_BYTES, size - SAMPLE_BYTES) for _ in range(SAMPLE_SPOTS)]
+        length = SAMPLE_BYTES
+    lines = []
+    for start in sorted(spots):
+        chunk = buf[start:start + length].split(b'\n')
+        if start:
+            chunk.pop(0)
+        if len(chunk) > 1 and (size is None or start + length < size):
+            chunk.pop()
+        lines.extend(line + b'\n' for line in chunk if line)
+    return lines
+
+
+def _detect_dialect(lines, enc, delimiter=None):
+    """Return a csv.Dialect for a sample of lines. The delimiter is sniffed
+    from the first (header) line when possible, as the whole sample can be
+    ambiguous. Only the delimiter and quote character are detected."""
     import csv
-    if enc is None:
-        enc = _detect_encoding(data)
+    sniffer = csv.Sniffer()
+    head = [_decode(line, enc) for line in lines[:SNIFF_LINES]]
+    if delimiter is None and head:
+        for text in [head[0], ''.join(head)]:
+            try:
+                delimiter = sniffer.sniff(text).delimiter
+                break
+            except csv.Error:
+                pass
     if delimiter is None:
-        delimiter = csv.Sniffer().sniff(data[0].decode(enc)).delimiter
-    csv_data = []
+        raise csv.Error("Could not determine delimiter")
+    try:
+        quotechar = sniffer.sniff(''.join(head), delimiters=delimiter).quotechar
+    except csv.Error:
+        quotechar = '"'
+    return _dialect(str(delimiter), str(quotechar))
+
+
+def _dialect(delimiter, quotechar):
+    import csv
+    dialect = csv.excel()
+    dialect.delimiter = delimiter
+    dialect.quotechar = quotechar
+    return dialect
+
+
+def _detect_format(lines, enc=None, delimiter=None, key=None):
+    """Return the encoding and csv.Dialect of a sample of lines. Results are
+    cached by key (such as the file identity) when provided"""
+    if key is not None:
+        key = (key, enc, delimiter)
+        if key in _formats:
+            return _formats[key]
+    if enc is None:
+        with profiling.stage('detect_encoding'):
+            enc = _detect_encoding(lines)
+    with profiling.stage('detect_dialect'):
+        fmt = (enc, _detect_dialect(lines, enc, delimiter))
+    if key is not None:
+        _formats[key] = fmt
+        while len(_formats) > FORMAT_CACHE:
+            _formats.popitem(last=False)
+    return fmt
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return (os.path.realpath(path), st.st_size, st.st_mtime)
+
+
+def _has_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+
+def _workers(size, parallel):
+    # number of worker processes parsing size bytes (0 when not parallel).
+    # Only done on request, as the processes are spawned anew
+    if not parallel or not _has_numpy():
+        return 0
+    if parallel is True:
+        if size <= PARALLEL_SIZE:
+            return 0
+        import multiprocessing
+        parallel = PARALLEL_WORKERS or multiprocessing.cpu_count()
+    return parallel if parallel > 1 else 0
+
+
+def _pool(workers):
+    # processes are spawned (not forked), as the caller can have threads
+    import multiprocessing
+    try:
+        context = multiprocessing.get_context('spawn')
+    except AttributeError:
+        # Python 2 only forks
+        context = multiprocessing
+    return context.Pool(workers)
+
+
+@profiling.timed('parse_lines')
+def _parse_lines(data, enc=None, delimiter=None, key=None, path=None, parallel=None):
+    if not data:
+        return []
+    enc, dialect = _detect_format(_sample_lines(data, len(data)), enc, delimiter, key)
+    workers = _workers(len(data), parallel)
+    if workers:
+        return _parse_parallel(data, enc, dialect, workers, path)
+    return list(_csv_reader(data, enc, dialect))
+
+
+def _csv_lines(lines, dialect):
+    """Reader of the rows of decoded lines"""
+    import csv
     if sys.version_info.major < 3:
-        csv_obj = csv.reader(data, delimiter=delimiter.encode(enc))
-        for row in csv_obj:
-            row = [x.decode(enc) for x in row]
-            csv_data.append(row)
+        # the csv module only reads bytes
+        csv_obj = csv.reader((line.encode('utf-8') for line in lines),
+                             delimiter=dialect.delimiter.encode('utf-8'),
+                             quotechar=dialect.quotechar.encode('utf-8'))
+        return ([x.decode('utf-8') for x in row] for row in csv_obj)
+    return csv.reader(lines, dialect)
+
+
+def _csv_reader(data, enc, dialect):
+    """Reader of the rows of data, encoded with enc"""
+    return _csv_lines(io.StringIO(_decode(data, enc), newline=''), dialect)
+
+
+@profiling.timed('read_csv')
+def read_csv(fd_or_path, enc, delimiter, hdr_rows, parallel=None):
+    if isinstance(fd_or_path, (io.IOBase, file)):
+        return _parse_lines(compressed.open_stream(fd_or_path).read(), enc, delimiter,
+                            parallel=parallel)
+    key = _file_key(fd_or_path)
+    if compressed.detect_path(fd_or_path) is None and \
+       _workers(os.path.getsize(fd_or_path), parallel):
+        # workers read their own chunk of the file
+        import mmap
+        with open(fd_or_path, 'rb') as fd:
+            buf = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _parse_lines(buf, enc, delimiter, key, fd_or_path, parallel)
+        finally:
+            buf.close()
+    with io.open(fd_or_path, 'rb') as fd:
+        data = compressed.open_stream(fd).read()
+    return _parse_lines(data, enc, delimiter, key, parallel=parallel)
+
+
+def _index_lines(buf, start, end, offsets, quote=b'"', parity=0):
+    """Append to offsets the start of each line found in buf[start:end].
+    Newlines within quotes are not considered to be line terminators.
+
+    Args:
+        buf - bytes-like buffer (such as a mmap)
+        offsets - array of offsets to extend
+        parity - quote parity at start
+    Returns:
+        parity - quote parity at end
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    qc = ord(quote)
+    for pos in range(start, end, SCAN_BYTES):
+        stop = min(end, pos + SCAN_BYTES)
+        if np is not None:
+            try:
+                chunk = np.frombuffer(buf, np.uint8, stop - pos, pos)
+            except TypeError:
+                # not a buffer (such as a SeekableBuffer)
+                chunk = np.frombuffer(buf[pos:stop], np.uint8)
+            nl = np.flatnonzero(chunk == 10)
+            quoted = chunk == qc
+            if parity or quoted.any():
+                quoted = np.bitwise_xor.accumulate(quoted.view(np.uint8))
+                if parity:
+                    quoted ^= 1
+                nl = nl[quoted[nl] == 0]
+                parity = int(quoted[-1])
+            offsets.frombytes((nl + (pos + 1)).astype(np.uint64).tobytes())
+            del chunk, quoted
+        else:
+            chunk = buf[pos:stop]
+            prev = 0
+            idx = chunk.find(b'\n')
+            if not parity and quote not in chunk:
+                while idx != -1:
+                    offsets.append(pos + idx + 1)
+                    idx = chunk.find(b'\n', idx + 1)
+            else:
+                while idx != -1:
+                    parity ^= chunk.count(quote, prev, idx) & 1
+                    if not parity:
+                        offsets.append(pos + idx + 1)
+                    prev = idx
+                    idx = chunk.find(b'\n', idx + 1)
+                parity ^= chunk.count(quote, prev) & 1
+    return parity
+
+
+def _split_lines(buf, size, count, quote=b'"', start=0):
+    """Return the offsets splitting buf[start:size] in up to count chunks of
+    about the same size, on line boundaries (outside of quotes). start must
+    be the start of a line"""
+    import numpy as np
+    qc = ord(quote)
+    bounds = [start]
+    pos = start
+    parity = 0
+    offsets = array.array(_TYPECODE)  # line starts found after pos
+    for i in range(1, count):
+        # the first line starting after target
+        target = start + (size - start) * i // count - 1
+        if target > pos:
+            # quote parity up to the target
+            for block in range(pos, target, SCAN_BYTES):
+                stop = min(target, block + SCAN_BYTES)
+                chunk = np.frombuffer(buf, np.uint8, stop - block, block)
+                parity ^= int(np.count_nonzero(chunk == qc)) & 1
+                del chunk
+            pos = target
+            offsets = array.array(_TYPECODE)
+        del offsets[:bisect.bisect_right(offsets, target)]
+        while not offsets and pos < size:
+            end = min(size, pos + SAMPLE_BYTES)
+            parity = _index_lines(buf, pos, end, offsets, quote, parity)
+            pos = end
+        if not offsets or offsets[0] >= size:
+            break
+        if offsets[0] > bounds[-1]:
+            bounds.append(offsets[0])
+    bounds.append(size)
+    return bounds
+
+
+def _chunks(buf, enc, dialect, workers, path=None, start=0):
+    # arguments of the workers parsing buf[start:] by chunk. Workers read
+    # their chunk from path when given
+    size = len(buf)
+    count = max(workers, -(-(size - start) // PARALLEL_CHUNK))
+    bounds = _split_lines(buf, size, count, dialect.quotechar.encode(enc), start)
+    return [(path if path is not None and workers else buf[a:b], a, b, enc,
+             dialect.delimiter, dialect.quotechar) for a, b in zip(bounds, bounds[1:])]
+
+
+def _map_chunks(func, chunks, workers):
+    # results of func for each chunk, by a pool of worker processes if any
+    if not workers or len(chunks) < 2:
+        return [func(chunk) for chunk in chunks]
+    with profiling.stage('parallel_map') as stage:
+        stage.set(workers=min(workers, len(chunks)), chunks=len(chunks))
+        pool = _pool(min(workers, len(chunks)))
+        try:
+            results = pool.map(func, chunks)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return results
+
+
+def _chunk_reader(source, start, end, enc, delimiter, quotechar):
+    if isinstance(source, bytes):
+        data = source
     else:
-        data = [i.decode(enc) for i in data]
-        csv_obj = csv.reader(data, delimiter=delimiter)
-        for row in csv_obj:
-            csv_data.append(row)
-    return csv_data
+        with open(source, 'rb') as fd:
+            fd.seek(start)
+            data = fd.read(end - start)
+    return _csv_reader(data, enc, _dialect(delimiter, quotechar))
+
+
+def _parse_chunk(args):
+    # parse a chunk of lines in a worker process. The fields are returned
+    # compactly: as a single string, with the offsets of each field within
+    # it and the offsets of each row within the fields
+    import numpy as np
+    fields = []
+    rows = array.array(_TYPECODE, [0])
+    for row in _chunk_reader(*args):
+        fields.extend(row)
+        rows.append(len(fields))
+    ends = np.zeros(len(fields) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, fields), np.int64, len(fields)), out=ends[1:])
+    rows = np.frombuffer(rows, dtype=np.uint64).astype(np.int64)
+    width = int(np.diff(rows).max()) if len(rows) > 1 else 0
+    return ''.join(fields), ends, rows, width
+
+
+@profiling.timed('parse_parallel')
+def _parse_parallel(buf, enc, dialect, workers, path=None):
+    """Parse the lines of buf in chunks with a pool of worker processes"""
+    chunks = _chunks(buf, enc, dialect, workers, path)
+    return _ParsedRows(_map_chunks(_parse_chunk, chunks, workers))
+
+
+def _parse_typed_chunk(args):
+    # parse a chunk of lines into columns converted to kinds (falling back
+    # to strings). Return the number of rows and the columns
+    from .columns import convert, text_column
+    args, kinds = args[:-1], args[-1]
+    fields = []
+    widths = []
+    for row in _chunk_reader(*args):
+        fields.extend(row)
+        widths.append(len(row))
+    width = max(widths or [0])
+    if widths.count(width) == len(widths):
+        # strided slices of the fields are much faster than transposing rows
+        values = [fields[x::width] for x in range(width)]
+    else:
+        rows = []
+        pos = 0
+        for count in widths:
+            rows.append(fields[pos:pos + count])
+            pos += count
+        values = zip_longest(*rows, fillvalue='')
+    columns = []
+    for x, column in enumerate(values):
+        kind = kinds[x] if x < len(kinds) else 'str'
+        converted = convert(column, kind)
+        columns.append(converted if converted is not None else text_column(column))
+    return len(widths), columns
+
+
+def _line_starts(buf, size, count, quote):
+    # offsets of the first count lines, and of the end of the last one
+    offsets = array.array(_TYPECODE, [0])
+    pos = parity = 0
+    while len(offsets) <= count and pos < size:
+        end = min(size, pos + SAMPLE_BYTES)
+        parity = _index_lines(buf, pos, end, offsets, quote, parity)
+        pos = end
+    if len(offsets) <= count and offsets[-1] != size:
+        offsets.append(size)
+    return offsets[:count + 1]
+
+
+@profiling.timed('parse_typed')
+def _parse_typed(buf, enc, delimiter, hdr_rows, idx_cols, key=None, path=None,
+                 parallel=None):
+    from .columns import ExtColumnModel, CodedColumn, SourceColumn, concat_text, infer_kind, \
+        is_text, missing
+    size = len(buf)
+    enc, dialect = _detect_format(_sample_lines(buf, size), enc, delimiter, key)
+
+    # header rows (as with _fixup_table) and sample, from the head
+    offsets = _line_starts(buf, size, (hdr_rows or 1) + 1 + SAMPLE_ROWS,
+                           dialect.quotechar.encode(enc))
+    head = [list(_csv_reader(buf[a:b], enc, dialect))
+            for a, b in zip(offsets, offsets[1:])]
+    head = [rows[0] if rows else [] for rows in head]
+    rows, hdr_rows = _fixup_table(list(head), hdr_rows)
+    hdr_rows = min(hdr_rows or 0, len(rows))
+    header, sample = rows[:hdr_rows], rows[hdr_rows:]
+    # after the header, and the empty line skipped after it
+    start = offsets[min(len(offsets) - 1, hdr_rows + len(head) - len(rows))]
+    width = max([len(row) for row in header + sample] or [0])
+    kinds = [infer_kind([getitem(row, x, '') for row in sample]) for x in range(width)]
+
+    # columns which cannot be converted in some chunk are parsed again as
+    # strings in the chunks where they were converted
+    workers = _workers(size, parallel)
+    chunks = _chunks(buf, enc, dialect, workers, path, start)
+    results = _map_chunks(_parse_typed_chunk, [chunk + (kinds,) for chunk in chunks], workers)
+    while True:
+        width = max([width] + [len(columns) for _, columns in results])
+        kinds += ['str'] * (width - len(kinds))
+        demoted = set()
+        for count, columns in results:
+            for x, kind in enumerate(kinds):
+                column = columns[x] if x < len(columns) else missing(kind, count)
+                if kind != 'str' and (column is None or is_text(column)):
+                    demoted.add(x)
+        if not demoted:
+            break
+        kinds = ['str' if x in demoted else kind for x, kind in enumerate(kinds)]
+        redo = [i for i, (_, columns) in enumerate(results)
+                if any(x < len(columns) and not is_text(columns[x])
+                       for x in demoted)]
+        for i, result in zip(redo, _map_chunks(_parse_typed_chunk,
+                                               [chunks[i] + (kinds,) for i in redo], workers)):
+            results[i] = result
 
+    import numpy as np
+    rows = sum(count for count, _ in results)
+    columns = []
+    with profiling.stage('encode_strings') as stage:
+        for x, kind in enumerate(kinds):
+            parts = [cols[x] if x < len(cols) else missing(kind, count) for count, cols in results]
+            if kind == 'str':
+                columns.append(concat_text(parts) if parts else missing(kind, 0))
+            elif any(isinstance(part, SourceColumn) for part in parts):
+                columns.append(SourceColumn.concat(parts))
+            else:
+                columns.append(np.concatenate(parts))
+        if profiling.active():
+            # memory of the string columns, as plain and encoded strings
+            strings = [column for column in columns if is_text(column)]
+            coded = [column for column in strings if isinstance(column, CodedColumn)]
+            stage.set(columns=len(strings), encoded=len(coded),
+                      text_bytes=sum(getattr(column, 'text_nbytes', column.nbytes)
+                                     for column in strings),
+                      encoded_bytes=sum(column.nbytes for column in strings))
+    return ExtColumnModel(columns, rows, header, idx_cols or 0)
 
 
-def read_csv(fd_or_path, enc, delimiter, hdr_rows):
+@profiling.timed('read_csv_typed')
+def read_csv_typed(fd_or_path, enc, delimiter, hdr_rows, idx_cols, parallel=None):
+    """Parse text into typed columns (see columns.ExtColumnModel). Return
+    None when empty"""
     if isinstance(fd_or_path, (io.IOBase, file)):
-        return _parse_lines(fd_or_path.readlines(), enc, delimiter)
-    with open(fd_or_path, 'rb') as fd:
-        return _parse_lines(fd.readlines(), enc, delimiter)
+        data = compressed.open_stream(fd_or_path).read()
+        return _parse_typed(data, enc, delimiter, hdr_rows, idx_cols,
+                            parallel=parallel) if data else None
+    key = _file_key(fd_or_path)
+    if compressed.detect_path(fd_or_path) is None:
+        if not os.path.getsize(fd_or_path):
+            return None
+        import mmap
+        with open(fd_or_path, 'rb') as fd:
+            buf = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _parse_typed(buf, enc, delimiter, hdr_rows, idx_cols, key,
+                                fd_or_path, parallel)
+        finally:
+            buf.close()
+    with io.open(fd_or_path, 'rb') as fd:
+        data = compressed.open_stream(fd).read()
+    return _parse_typed(data, enc, delimiter, hdr_rows, idx_cols, key,
+                        parallel=parallel) if data else None
+
+
+class _LazyRows(object):
+    """Sequence of rows read on-demand with `parse`. Only the most recently
+    accessed rows are kept in memory. The few header rows patched or removed
+    by _fixup_table are tracked separately."""
+
+    def __init__(self):
+        self._fixups = {}
+        self._skip = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self):
+        return True
+
+    @property
+    def random_access(self):
+        return True
+
+    def _count(self):
+        raise NotImplementedError("_LazyRows subclasses must implement _count")
+
+    def parse(self, idx):
+        raise NotImplementedError("_LazyRows subclasses must implement parse")
+
+    def close(self):
+        """Release the source of the rows"""
+        pass
+
+    def _row(self, idx):
+        # rows can also be read by background workers
+        with self._lock:
+            row = self._cache.get(idx)
+            if row is None:
+                row = self.parse(idx)
+                self._cache[idx] = row
+                if len(self._cache) > ROW_CACHE:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache[idx] = self._cache.pop(idx)
+            return row
+
+    def __len__(self):
+        return self._count() - (self._skip is not None)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        if self._skip is not None and idx >= self._skip:
+            idx += 1
+        row = self._fixups.get(idx)
+        if row is not None:
+            return row
+        return self._row(idx)
+
+    def __setitem__(self, idx, row):
+        # only used to patch a few header rows
+        if self._skip is not None and idx >= self._skip:
+            idx += 1
+        self._fixups[idx] = row
+
+    def __delitem__(self, idx):
+        if self._skip is not None:
+            raise IndexError("only a single row can be removed")
+        self._skip = idx
+        self._cache.clear()
+
+    def sample(self, count, start=0):
+        """Return the first and up to count evenly-spaced rows from start,
+        bypassing the row cache"""
+        size = len(self)
+        idx = set(range(start, min(size, start + count)))
+        idx.update(range(start, size, max(1, (size - start) // count)))
+        skip = self._skip if self._skip is not None else size
+        idx = [y + (y >= skip) for y in sorted(idx)]
+        return [self._fixups.get(y) or self.parse(y) for y in idx]
+
+
+class _IndexedRows(_LazyRows):
+    """Rows parsed on-demand from a buffer of text lines, given the start
+    offset of each line. Lines are indexed incrementally with `scan`.
+
+    Buffers growing while being read (such as a SeekableBuffer) are filled
+    while scanning. Their complete index is kept in _indexes by key."""
+
+    def __init__(self, buf, size, enc, dialect, key=None):
+        super(_IndexedRows, self).__init__()
+        self._buf = buf
+        self._size = size
+        self._generation = getattr(buf, 'generation', 0)
+        self._offsets = array.array(_TYPECODE, [0])
+        self._scanned = 0
+        self._parity = 0
+        self._lines = 0
+        self._enc = enc
+        self._dialect = dialect
+        self._quote = dialect.quotechar.encode(enc)
+        self._key = None if key is None else (key, self._quote)
+        if self._key in _indexes:
+            _, self._size, self._offsets, self._lines = _indexes[self._key]
+            self._scanned = self._size
+
+    @property
+    def complete(self):
+        return self._scanned == self._size and getattr(self._buf, 'complete', True)
+
+    @property
+    def scanned(self):
+        """Number of bytes indexed"""
+        return self._scanned
+
+    @property
+    def generation(self):
+        """Number of times the buffer was replaced"""
+        return self._generation
+
+    def _reset(self):
+        # the buffer was replaced: index it from the start
+        self._offsets = array.array(_TYPECODE, [0])
+        self._scanned = self._parity = self._lines = 0
+        with self._lock:
+            self._cache.clear()
+
+    @profiling.timed('index_lines')
+    def scan(self, size=None):
+        """Index the next size bytes (or everything). Return True when done"""
+        if hasattr(self._buf, 'fill'):
+            self._size = self._buf.fill(None if size is None else self._scanned + size)
+            generation = getattr(self._buf, 'generation', 0)
+            if generation != self._generation:
+                self._generation = generation
+                self._reset()
+        end = self._size if size is None else min(self._size, self._scanned + size)
+        self._parity = _index_lines(self._buf, self._scanned, end, self._offsets,
+                                    quote=self._quote, parity=self._parity)
+        self._scanned = end
+        if not self.complete:
+            self._lines = len(self._offsets) - 1
+        else:
+            self._lines = len(self._offsets) - (self._offsets[-1] == self._size)
+            if self._key is not None:
+                _indexes[self._key] = (self._buf, self._size, self._offsets, self._lines)
+                while len(_indexes) > INDEX_CACHE:
+                    _indexes.popitem(last=False)
+        return self.complete
+
+    @property
+    def random_access(self):
+        return getattr(self._buf, 'random_access', not hasattr(self._buf, 'fill'))
+
+    def close(self):
+        """Release the buffer (such as a mmap), unless kept in _indexes"""
+        if all(index[0] is not self._buf for index in _indexes.values()):
+            close = getattr(self._buf, 'close', None)
+            if close is not None:
+                close()
+
+    def _count(self):
+        return self._lines
+
+    def _line(self, idx):
+        start = self._offsets[idx]
+        end = self._offsets[idx + 1] if idx + 1 < len(self._offsets) else self._size
+        return self._buf[start:end]
+
+    def parse(self, idx):
+        rows = list(_csv_reader(self._line(idx), self._enc, self._dialect))
+        return rows[0] if rows else []
+
+
+class _ParsedRows(_LazyRows):
+    """Rows parsed by _parse_chunk, kept in their compact form and
+    materialized on access"""
+
+    def __init__(self, chunks):
+        super(_ParsedRows, self).__init__()
+        self._chunks = []
+        self._starts = [0]
+        self.width = 0
+        for chunk in chunks:
+            text, ends, rows, width = chunk
+            self._chunks.append((text, ends, rows))
+            self._starts.append(self._starts[-1] + len(rows) - 1)
+            self.width = max(self.width, width)
+
+    def _count(self):
+        return self._starts[-1]
+
+    def parse(self, idx):
+        chunk = bisect.bisect_right(self._starts, idx) - 1
+        text, ends, rows = self._chunks[chunk]
+        y = idx - self._starts[chunk]
+        ends = ends[rows[y]:rows[y + 1] + 1].tolist()
+        return [text[a:b] for a, b in zip(ends, ends[1:])]
+
+    def _row(self, idx):
+        # parsing is cheap and thread-safe: rows are not cached
+        return self.parse(idx)
+
+
+class _XlsRows(_LazyRows):
+    """Rows of an xlrd sheet, converted to lists on-demand"""
+
+    def __init__(self, sheet):
+        super(_XlsRows, self).__init__()
+        self._sheet = sheet
+        self.columns = sheet.ncols
+
+    def _count(self):
+        return self._sheet.nrows
+
+    def parse(self, idx):
+        return self._sheet.row_values(idx)
+
+
+class _XlsxRows(_LazyRows):
+    """Rows of a read-only openpyxl worksheet, decoded in blocks while
+    streaming through the sheet. Only the most recently used blocks are kept:
+    moving backward restarts the stream from the requested block."""
+
+    def __init__(self, sheet):
+        super(_XlsxRows, self).__init__()
+        self._sheet = sheet
+        self._rows = sheet.max_row
+        self.columns = sheet.max_column
+        self._blocks = OrderedDict()
+        self._stream = None
+        self._next = 0
+
+    @property
+    def random_access(self):
+        return False
+
+    def _count(self):
+        return self._rows
+
+    def _block(self, block):
+        rows = self._blocks.get(block)
+        if rows is not None:
+            self._blocks[block] = self._blocks.pop(block)
+            return rows
+        start = block * SHEET_ROWS
+        if self._stream is None or start < self._next:
+            self._stream = self._sheet.iter_rows(min_row=start + 1, values_only=True)
+            self._next = start
+        while True:
+            # keep the blocks read while moving forward
+            rows = [list(row) for row in islice(self._stream, SHEET_ROWS)]
+            current = self._next // SHEET_ROWS
+            self._next += SHEET_ROWS
+            self._blocks[current] = rows
+            if len(self._blocks) > SHEET_BLOCKS:
+                self._blocks.popitem(last=False)
+            if current == block:
+                return rows
+            if len(rows) < SHEET_ROWS:
+                # the sheet ends before block (max_row can be overstated)
+                return []
+
+    def _row(self, idx):
+        with self._lock:
+            rows = self._block(idx // SHEET_ROWS)
+        idx %= SHEET_ROWS
+        return rows[idx] if idx < len(rows) else []
+
+    parse = _row
+
+
+class ExtCsvModel(ExtListModel):
+    """ExtListModel over lazily parsed rows. The width of the table is
+    estimated from a sample of rows: longer rows are truncated.
+
+    When the rows are not completely indexed, indexing continues in a
+    background thread and the shape grows until `loading` is False."""
+
+    def __init__(self, rows, hdr_rows=0, idx_cols=0):
+        if rows.random_access:
+            sample = rows.sample(SAMPLE_ROWS)
+        else:
+            sample = [rows[y] for y in range(min(len(rows), SAMPLE_ROWS))]
+        columns = max(map(len, sample)) if sample else 0
+        super(ExtCsvModel, self).__init__(rows, hdr_rows=hdr_rows, idx_cols=idx_cols,
+                                          columns=columns)
+        self._thread = None
+        self._stopped = threading.Event()
+        if not rows.complete:
+            self._thread = threading.Thread(target=self._load)
+            self._thread.daemon = True
+            self._thread.start()
+
+    @property
+    def loading(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def random_access(self):
+        return self._data.random_access
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        """Stop indexing and release the file: rows cannot be read afterwards"""
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+        self._data.close()
+
+    def _grow(self, start):
+        # update the shape with the rows indexed after start
+        columns = self._shape[1] + self._header_shape[1]
+        if len(self._data) > start:
+            sample = self._data.sample(SAMPLE_ROWS // 16, start)
+            columns = max(columns, max(map(len, sample)))
+        self._shape = (max(0, len(self._data) - self._header_shape[0]),
+                       columns - self._header_shape[1])
+
+    def _load(self):
+        done = False
+        while not done and not self._stopped.is_set():
+            start = len(self._data)
+            done = self._data.scan(SCAN_BYTES)
+            self._grow(start)
+
+
+class _FollowedFile(object):
+    """Buffer over a file being appended to, read with plain reads (which,
+    unlike a mmap, are safe when the file is truncated). `fill` returns the
+    current size, and increments `generation` when the file was truncated or
+    replaced by another file (as when rotated), which is then reopened"""
+
+    complete = False
+    random_access = True
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self._fd = open(path, 'rb')
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def fill(self, size=None):
+        with self._lock:
+            current = os.fstat(self._fd.fileno())
+            try:
+                st = os.stat(self.path)
+                if (st.st_dev, st.st_ino) != (current.st_dev, current.st_ino):
+                    fd = open(self.path, 'rb')
+                    self._fd.close()
+                    self._fd = fd
+                    current = os.fstat(fd.fileno())
+                    self.generation += 1
+            except (IOError, OSError):
+                # being replaced: keep reading the current file
+                pass
+            if current.st_size < self._size:
+                self.generation += 1
+            self._size = current.st_size
+            return self._size
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        start, stop, _ = idx.indices(self._size)
+        with self._lock:
+            self._fd.seek(start)
+            return self._fd.read(max(0, stop - start))
+
+    def close(self):
+        with self._lock:
+            self._fd.close()
+
+
+class ExtFollowModel(ExtCsvModel):
+    """ExtCsvModel over the lines of a file being appended to (as with
+    `tail -f`). Only the bytes appended since the last complete line are
+    indexed as the file grows, until `stop` is called. The rows are indexed
+    again when the file is truncated or replaced."""
+
+    def __init__(self, rows, path, hdr_rows=0, idx_cols=0):
+        self._watcher = Watcher(path)
+        super(ExtFollowModel, self).__init__(rows, hdr_rows=hdr_rows, idx_cols=idx_cols)
+
+    @property
+    def generation(self):
+        return self._data.generation
+
+    def _load(self):
+        try:
+            while not self._stopped.is_set():
+                start = len(self._data)
+                scanned = self._data.scanned
+                self._data.scan(SCAN_BYTES)
+                self._grow(min(start, len(self._data)))
+                if self._data.scanned == scanned:
+                    self._watcher.wait()
+        finally:
+            self._watcher.close()
+
+
+class ExtStreamModel(ExtListModel):
+    """ExtListModel growing while the rows of a reader are consumed in a
+    background thread, until `loading` is False. Errors are stored in
+    `error`."""
+
+    def __init__(self, data, reader, hdr_rows=0, idx_cols=0):
+        columns = max(map(len, data)) if data else idx_cols
+        super(ExtStreamModel, self).__init__(data, hdr_rows=hdr_rows, idx_cols=idx_cols,
+                                             columns=columns)
+        self.error = None
+        self._pending = []
+        self._reader = reader
+        self._thread = threading.Thread(target=self._load)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def loading(self):
+        return self._thread.is_alive()
+
+    def flush(self):
+        """Publish the rows read so far"""
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        self._data.extend(rows)
+        columns = max(self._shape[1] + self._header_shape[1], max(map(len, rows)))
+        self._shape = (len(self._data) - self._header_shape[0],
+                       columns - self._header_shape[1])
+
+    def _load(self):
+        try:
+            for row in self._reader:
+                self._pending.append(row)
+                if len(self._pending) >= LOAD_ROWS:
+                    self.flush()
+        except Exception as e:
+            self.error = e
+        self.flush()
+
+
+class ExtSheetModel(ExtListModel):
+    """ExtListModel over the rows of a spreadsheet, read on-demand. The shape
+    is known upfront from the sheet dimensions."""
+
+    def __init__(self, rows, columns, hdr_rows=0, idx_cols=0):
+        super(ExtSheetModel, self).__init__(rows, hdr_rows=hdr_rows, idx_cols=idx_cols,
+                                            columns=columns)
+
+    @property
+    def random_access(self):
+        return self._data.random_access
+
+
+class ExtArrowModel(ExtDataModel):
+    """ExtDataModel over Arrow columns split in chunks (record batches or
+    Parquet row groups), read on-demand with read(chunk, positions). Only the
+    columns in use are read from each chunk, and only the most recently used
+    column chunks are kept within ARROW_CACHE bytes. Columns at the index
+    positions are shown as the row header. random_access is False when
+    reading each chunk is expensive. Slices of datetime columns are returned
+    as pandas Series (shown as pandas timestamps) when timestamps is True,
+    as NumPy arrays otherwise."""
+
+    def __init__(self, names, rows, read, index=(), random_access=True, timestamps=False):
+        super(ExtArrowModel, self).__init__()
+        self._names = names
+        self._random_access = random_access
+        self._timestamps = timestamps
+        self._index = list(index)
+        self._columns = [p for p in range(len(names)) if p not in self._index]
+        self._offsets = [0]
+        for count in rows:
+            self._offsets.append(self._offsets[-1] + count)
+        self._read = read
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return (self._offsets[-1], len(self._columns))
+
+    @property
+    def header_shape(self):
+        return (1, len(self._index))
+
+    @property
+    def random_access(self):
+        return self._random_access
+
+    def _chunk(self, chunk, pos):
+        # column at pos of chunk as a NumPy array
+        key = (chunk, pos)
+        with self._lock:
+            array = self._cache.get(key)
+            if array is not None:
+                self._cache[key] = self._cache.pop(key)
+                return array[0]
+            start = pos - pos % ARROW_COLUMNS
+            group = [p for p in range(start, min(len(self._names), start + ARROW_COLUMNS))
+                     if (chunk, p) not in self._cache and
+                     (p in self._index or p in self._columns)]
+            for p, column in zip(group, self._read(chunk, group)):
+                self._cache[(chunk, p)] = (column.to_numpy(zero_copy_only=False), column.nbytes)
+                self._size += column.nbytes
+            while self._size > ARROW_CACHE and len(self._cache) > len(group):
+                self._size -= self._cache.popitem(last=False)[1][1]
+            return self._cache[key][0]
+
+    def _slice(self, pos, y0, y1):
+        import numpy as np
+        parts = []
+        chunk = bisect.bisect_right(self._offsets, y0) - 1
+        while y0 < y1:
+            start, end = self._offsets[chunk], self._offsets[chunk + 1]
+            parts.append(self._chunk(chunk, pos)[y0 - start:min(y1, end) - start])
+            y0 = end
+            chunk += 1
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def data(self, y, x):
+        chunk = bisect.bisect_right(self._offsets, y) - 1
+        return self._chunk(chunk, self._columns[x])[y - self._offsets[chunk]]
+
+    def data_block(self, y0, y1, x0, x1):
+        columns = [list(self._slice(self._columns[x], y0, y1)) for x in range(x0, x1)]
+        if not columns:
+            return [[] for _ in range(y0, y1)]
+        return [list(row) for row in zip(*columns)]
+
+    def column_block(self, x, y0, y1):
+        values = self._slice(self._columns[x], y0, y1)
+        if values.dtype.kind == 'M' and self._timestamps:
+            # shown as pandas timestamps, without the trailing zeros
+            import pandas as pd
+            values = pd.Series(values, copy=False)
+        return values
+
+    def column_take(self, x, rows):
+        import numpy as np
+        rows = np.asarray(rows, dtype=np.int64)
+        chunks = np.searchsorted(self._offsets, rows, 'right') - 1
+        parts = []
+        for chunk in np.unique(chunks).tolist():
+            mask = chunks == chunk
+            values = self._chunk(chunk, self._columns[x])
+            parts.append((mask, values[rows[mask] - self._offsets[chunk]]))
+        if not parts:
+            return np.empty(0)
+        values = np.empty(len(rows), np.result_type(*[part[1] for part in parts]))
+        for mask, part in parts:
+            values[mask] = part
+        return values
+
+    def header(self, axis, x, level):
+        if axis == 0:
+            return self._names[self._columns[x]]
+        return self._index_block(x, x + 1, level)[0]
+
+    def header_block(self, axis, x0, x1, level):
+        if axis == 0:
+            return [self._names[p] for p in self._columns[x0:x1]]
+        return self._index_block(x0, x1, level)
+
+    def _index_block(self, y0, y1, level):
+        return list(self._slice(self._index[level], y0, y1))
+
+    def name(self, axis, level):
+        if axis == 1:
+            name = self._names[self._index[level]]
+            if not name.startswith('__index_level_'):
+                return name
+        return super(ExtArrowModel, self).name(axis, level)
+
+
+@profiling.timed('read_csv_lazy')
+def read_csv_lazy(path, enc, delimiter, background=False):
+    key = _file_key(path)
+    fmt = compressed.detect_path(path)
+    if fmt is None:
+        import mmap
+        with open(path, 'rb') as fd:
+            buf = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(buf)
+        sample = _sample_lines(buf, size)
+        index_key = None
+    else:
+        # only the head is sampled, as the size is not known yet
+        index = [index for index_key, index in _indexes.items() if index_key[0] == key]
+        buf = index[0][0] if index else compressed.SeekableBuffer(path, fmt)
+        size = buf.fill(SAMPLE_BYTES)
+        sample = _sample_lines(buf, size if buf.complete else None)
+        index_key = key
+    enc, dialect = _detect_format(sample, enc, delimiter, key)
+    rows = _IndexedRows(buf, size, enc, dialect, index_key)
+    if background:
+        while not rows.scan(SCAN_BYTES // 16) and len(rows) < SAMPLE_ROWS:
+            pass
+    else:
+        rows.scan()
+    return rows
+
+
+@profiling.timed('read_csv_follow')
+def read_csv_follow(path, enc, delimiter):
+    """Return the rows of a file being appended to. Unless delimiter is
+    given, wait for the first complete line to detect the format"""
+    buf = _FollowedFile(path)
+    size = buf.fill()
+    if delimiter is None:
+        watcher = Watcher(path)
+        try:
+            while b'\n' not in buf[:SAMPLE_BYTES]:
+                watcher.wait()
+                size = buf.fill()
+        finally:
+            watcher.close()
+    enc, dialect = _detect_format(_sample_lines(buf, size), enc, delimiter)
+    rows = _IndexedRows(buf, size, enc, dialect)
+    rows.scan()
+    return rows
+
+
+def _read_lines(fd, head, enc, wait=None):
+    """Decode and yield lines from an already-read head and the rest of fd.
+    wait is called before blocking on fd"""
+    read = getattr(fd, 'read1', fd.read)
+    tail = b''
+    while True:
+        lines = (tail + head).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield _decode(line + b'\n', enc)
+        if wait is not None:
+            wait()
+        head = read(1 << 16)
+        if not head:
+            break
+    if tail:
+        yield _decode(tail, enc)
+
+
+@profiling.timed('read_csv_stream')
+def read_csv_stream(fd, enc, delimiter, wait=None):
+    """Return the first rows read from fd, and a reader for the remaining"""
+    fd = compressed.open_stream(fd)
+    read = getattr(fd, 'read1', fd.read)
+    head = b''
+    while len(head) < SAMPLE_BYTES:
+        block = read(SAMPLE_BYTES)
+        if not block:
+            break
+        head += block
+    if not head:
+        return [], iter([])
+    enc, dialect = _detect_format(_sample_lines(head), enc, delimiter)
+    reader = _csv_lines(_read_lines(fd, head, enc, wait), dialect)
+    data = []
+    for row in reader:
+        data.append(row)
+        if len(data) == SAMPLE_ROWS:
+            break
+    return data, reader
 
 
 def read_xlrd(path, sheet_index):
     import xlrd
-    with xlrd.open_workbook(path, on_demand=True, ragged_rows=True) as wb:
-        sheet = wb.sheet_by_index(sheet_index)
-        return [sheet.row_values(row) for row in range(sheet.nrows)]
+    wb = xlrd.open_workbook(path, on_demand=True, ragged_rows=True)
+    sheet = wb.sheet_by_index(sheet_index)
+    # the sheet is loaded: rows are still available after closing the file
+    wb.release_resources()
+    return _XlsRows(sheet)
+
+
+def read_openpyxl(path, sheet_index):
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    sheet = wb.worksheets[sheet_index]
+    if sheet.max_row is None or sheet.max_column is None:
+        # no dimensions stored in the file, they need to be computed
+        sheet.reset_dimensions()
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+    return _XlsxRows(sheet)
+
+
+def _sheet_errors(module):
+    # exceptions of the reader of module for files it cannot read
+    if module == 'xlrd':
+        import xlrd
+        import xlrd.compdoc
+        return (xlrd.XLRDError, xlrd.compdoc.CompDocError)
+    import zipfile
+    from openpyxl.utils.exceptions import InvalidFileException
+    return (zipfile.BadZipfile, InvalidFileException)
+
+
+def _is_sheet(path):
+    _, ext = os.path.splitext(path)
+    return ext.lower() in ['.xls', '.xlsx', '.xlsm']
+
+
+@profiling.timed('read_sheet')
+def read_sheet(path, sheet_index):
+    """Return the rows of a spreadsheet, read on-demand when possible, or
+    None if the file cannot be read as a spreadsheet"""
+    _, ext = os.path.splitext(path)
+    readers = [('xlrd', read_xlrd)]
+    if ext.lower() != '.xls':
+        readers.insert(0, ('openpyxl', read_openpyxl))
+    missing = []
+    for module, reader in readers:
+        try:
+            errors = _sheet_errors(module)
+        except ImportError:
+            missing.append(module)
+            continue
+        try:
+            return reader(path, sheet_index)
+        except errors:
+            # not a spreadsheet, or not readable with this module
+            pass
+    if len(missing) == len(readers):
+        warnings.warn("{} module not installed".format(" or ".join(missing)))
+    return None
+
+
+def _columnar_format(path):
+    if os.path.isdir(path):
+        names = os.listdir(path)
+        return 'parquet' if any(name.endswith(PARQUET_EXT) for name in names) else None
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fd:
+        magic = fd.read(8)
+    if magic.startswith(b'PAR1'):
+        return 'parquet'
+    if magic.startswith(b'ARROW1') or magic.startswith(b'FEA1') or \
+       path.lower().endswith('.arrows'):
+        return 'arrow'
+    if magic.startswith(b'\x93NUMPY'):
+        return 'npy'
+    return None
+
+
+def _pandas_index(schema):
+    # positions of the index columns stored by pandas
+    meta = schema.pandas_metadata or {}
+    names = schema.names
+    return [names.index(name) for name in meta.get('index_columns', [])
+            if isinstance(name, basestring) and name in names]
 
 
-def read_table(fd_or_path, enc, delimiter, hdr_rows, sheet_index=0):
+def _pandas_timestamps(schema):
+    # show timestamps as pandas would for files written by pandas
+    if not schema.pandas_metadata:
+        return False
+    try:
+        import pandas
+    except ImportError:
+        return False
+    return True
+
+
+def read_parquet(path, idx_cols=None):
+    """Return a model reading the row groups of a Parquet file (or of all the
+    Parquet files in a directory) on-demand"""
+    import pyarrow.parquet as pq
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                 if name.endswith(PARQUET_EXT)]
+    else:
+        paths = [path]
+    groups = []
+    rows = []
+    for file_path in paths:
+        meta = pq.read_metadata(file_path)
+        for group in range(meta.num_row_groups):
+            groups.append((file_path, group))
+            rows.append(meta.row_group(group).num_rows)
+    schema = pq.read_schema(paths[0])
+    names = schema.names
+
+    files = {}
+    def read(chunk, positions):
+        file_path, group = groups[chunk]
+        fd = files.get(file_path)
+        if fd is None:
+            # only keep the last file open
+            files.clear()
+            fd = files[file_path] = pq.ParquetFile(file_path, memory_map=True)
+        table = fd.read_row_group(group, columns=[names[p] for p in positions])
+        return table.columns
+
+    index = range(idx_cols) if idx_cols is not None else _pandas_index(schema)
+    return ExtArrowModel(names, rows, read, index, random_access=False,
+                         timestamps=_pandas_timestamps(schema))
+
+
+def read_arrow(path, idx_cols=None):
+    """Return a model over the record batches of a memory-mapped Arrow IPC
+    (or Feather) file"""
+    import pyarrow as pa
+    source = pa.memory_map(path)
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = reader.num_record_batches
+        get_batch = reader.get_batch
+        schema = reader.schema
+    except pa.ArrowInvalid:
+        # streams and Feather V1 files have no random access to batches
+        import pyarrow.feather as feather
+        source.seek(0)
+        if path.lower().endswith('.arrows'):
+            table = pa.ipc.open_stream(source).read_all()
+        else:
+            table = feather.read_table(source)
+        table = table.to_batches()
+        batches = len(table)
+        get_batch = table.__getitem__
+        schema = table[0].schema if table else pa.schema([])
+    rows = [get_batch(batch).num_rows for batch in range(batches)]
+
+    def read(chunk, positions):
+        batch = get_batch(chunk)
+        return [batch.column(p) for p in positions]
+
+    index = range(idx_cols) if idx_cols is not None else _pandas_index(schema)
+    return ExtArrowModel(schema.names, rows, read, index,
+                         timestamps=_pandas_timestamps(schema))
+
+
+def read_npy(path):
+    """Return a memory-mapped NumPy array (or a dict of the fields of a
+    record array)"""
+    import numpy as np
+    data = np.load(path, mmap_mode='r', allow_pickle=False)
+    if data.dtype.names:
+        return OrderedDict((name, data[name]) for name in data.dtype.names)
+    return data.reshape(1) if not data.shape else data
+
+
+@profiling.timed('read_columnar')
+def read_columnar(path, idx_cols=None):
+    """Return a model (or an array) reading path on-demand, or None if the
+    format is not a supported columnar format"""
+    fmt = _columnar_format(path)
+    if fmt is None:
+        return None
+    if fmt == 'npy':
+        return read_npy(path)
+    try:
+        import pyarrow
+    except ImportError:
+        warnings.warn("pyarrow module not installed")
+        return None
+    if fmt == 'parquet':
+        return read_parquet(path, idx_cols)
+    return read_arrow(path, idx_cols)
+
+
+def read_table(fd_or_path, enc, delimiter, hdr_rows, sheet_index=0, parallel=None):
     data = None
 
     # read into a list of lists
-    if not isinstance(fd_or_path, (io.IOBase, file)):
-        _, ext = os.path.splitext(fd_or_path)
-        if ext.lower() in ['.xls', '.xlsx']:
-            try:
-                import xlrd
-                data = read_xlrd(fd_or_path, sheet_index)
-            except ImportError:
-                warnings.warn("xlrd module not installed")
-            except xlrd.XLRDError:
-                pass
+    if not isinstance(fd_or_path, (io.IOBase, file)) and _is_sheet(fd_or_path):
+        data = read_sheet(fd_or_path, sheet_index)
+        if data is not None:
+            data = [list(row) for row in data]
     if data is None:
-        data = read_csv(fd_or_path, enc, delimiter, hdr_rows)
+        data = read_csv(fd_or_path, enc, delimiter, hdr_rows, parallel)
+
+    return _fixup_table(data, hdr_rows)
 
+
+def _fixup_table(data, hdr_rows):
     if hdr_rows is None and len(data) > 1:
         hdr_rows = 1
 
@@ -100,7 +1437,7 @@ def read_table(fd_or_path, enc, delimiter, hdr_rows, sheet_index=0):
                and isinstance(data[row][0], basestring) \
                and len(data[row][0]) > 1 \
                and data[row][0][0] == '#':
-                data[0][0] = data[0][0][1:]
+                data[row] = [data[row][0][1:]] + list(data[row][1:])
 
     # skip an empty line after the header
     if hdr_rows and len(data) > hdr_rows + 1:
@@ -115,15 +1452,85 @@ def read_table(fd_or_path, enc, delimiter, hdr_rows, sheet_index=0):
     return data, hdr_rows
 
 
+def _is_lazy(path, lazy):
+    # smaller files are parsed completely
+    if lazy is False:
+        return False
+    if _is_sheet(path) or not os.path.isfile(path):
+        return False
+    size = os.path.getsize(path)
+    return size > 0 and (lazy or size > LAZY_SIZE)
+
+
+@profiling.timed('read_model')
 def read_model(data, enc=None, delimiter=None, hdr_rows=None, idx_cols=None,
-               sheet_index=0, transpose=False, sort=False):
+               sheet_index=0, transpose=False, sort=False, lazy=None,
+               background=False, parallel=None, typed=True, follow=False):
+    # growing text files are followed, indexing the lines appended
+    if follow and isinstance(data, basestring):
+        if _is_sheet(data) or compressed.detect_path(data) is not None or \
+           _columnar_format(data) is not None:
+            raise ValueError("only uncompressed text files can be followed")
+        rows = read_csv_follow(data, enc, delimiter)
+        rows, hdr_rows = _fixup_table(rows, 1 if hdr_rows is None else hdr_rows)
+        model = ExtFollowModel(rows, data, hdr_rows=hdr_rows, idx_cols=idx_cols or 0)
+        return as_model(model, transpose=transpose)
+
+    # columnar formats are memory-mapped or read by chunk, on-demand
+    if isinstance(data, basestring):
+        columnar = read_columnar(data, idx_cols)
+        if columnar is not None:
+            return as_model(columnar, transpose=transpose)
+
+    # large text files are indexed and parsed on-demand
+    if isinstance(data, basestring) and _is_lazy(data, lazy):
+        rows = read_csv_lazy(data, enc, delimiter, background)
+        data, hdr_rows = _fixup_table(rows, hdr_rows)
+        model = ExtCsvModel(data, hdr_rows=hdr_rows or 0, idx_cols=idx_cols or 0)
+        return as_model(model, transpose=transpose)
+
+    # spreadsheets are read on-demand, given their dimensions
+    if isinstance(data, basestring) and lazy is not False and _is_sheet(data):
+        rows = read_sheet(data, sheet_index)
+        if rows is None:
+            rows = read_csv(data, enc, delimiter, hdr_rows)
+        data, hdr_rows = _fixup_table(rows, hdr_rows)
+        if isinstance(data, _LazyRows):
+            model = ExtSheetModel(data, data.columns, hdr_rows=hdr_rows or 0,
+                                  idx_cols=idx_cols or 0)
+            return as_model(model, transpose=transpose)
+
+    # streams are parsed in the background while the model grows
+    if background and isinstance(data, (io.IOBase, file)):
+        model = None
+        def flush():
+            if model is not None:
+                model.flush()
+        data, reader = read_csv_stream(data, enc, delimiter, wait=flush)
+        data, hdr_rows = _fixup_table(data, hdr_rows)
+        model = ExtStreamModel(data, reader, hdr_rows=hdr_rows or 0, idx_cols=idx_cols or 0)
+        return as_model(model, transpose=transpose)
+
+    # text is parsed into typed columns
+    if typed and (isinstance(data, basestring) and not _is_sheet(data) or
+                  isinstance(data, (io.IOBase, file))) and _has_numpy():
+        model = read_csv_typed(data, enc, delimiter, hdr_rows, idx_cols, parallel)
+        if model is not None:
+            return as_model(model, transpose=transpose)
+        data = []
+
     # if data is a uri/file/path, read it
     if isinstance(data, basestring) or isinstance(data, (io.IOBase, file)):
-        data, hdr_rows = read_table(data, enc, delimiter, hdr_rows, sheet_index)
+        data, hdr_rows = read_table(data, enc, delimiter, hdr_rows, sheet_index, parallel)
 
     # only assume an header when loading from a file
     if hdr_rows is None: hdr_rows = 0
     if idx_cols is None: idx_cols = 0
 
+    if isinstance(data, _ParsedRows):
+        # the width is known from parsing
+        model = ExtListModel(data, hdr_rows=hdr_rows, idx_cols=idx_cols, columns=data.width)
+        return as_model(model, transpose=transpose)
+
     return as_model(data, hdr_rows=hdr_rows, idx_cols=idx_cols,
                     transpose=transpose, sort=sort)
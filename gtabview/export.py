@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+from .formatting import get_as_str, format_block, format_column
+
+import io
+import os
+import threading
+
+EXPORT_ROWS = 4096      # Rows formatted (or converted) at once
+PARQUET_ROWS = 1 << 16  # Rows of each Parquet row group
+
+FORMATS = ['csv', 'tsv', 'parquet']
+
+
+def export_format(path):
+    """Return the export format of path, from its extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    if ext in ('.tsv', '.tab'):
+        return 'tsv'
+    return 'csv'
+
+
+class Export(threading.Thread):
+    """Write the rows and columns of model, as [start, end) spans
+    (everything by default), to output: a path or a text file object. The
+    rows are fetched in blocks and written as they are formatted, without
+    building the whole output. Call run() directly to export synchronously"""
+
+    def __init__(self, model, output, fmt=None, rows=None, columns=None,
+                 header=True, precision=None):
+        super(Export, self).__init__()
+        self.daemon = True
+        if fmt is None:
+            fmt = export_format(output) if isinstance(output, str) else 'tsv'
+        if fmt not in FORMATS:
+            raise ValueError("unknown export format: {}".format(fmt))
+        self.model = model
+        self.output = output
+        self.format = fmt
+        shape = model.shape
+        self.row_spans = [(0, shape[0])] if rows is None else list(rows)
+        self.column_spans = [(0, shape[1])] if columns is None else list(columns)
+        self.header = header
+        self.precision = precision
+        self.total = sum(y1 - y0 for y0, y1 in self.row_spans)
+        self.rows = 0
+        self.error = None
+        self._as_str = get_as_str(precision)
+        self._cancel = threading.Event()
+
+    @property
+    def running(self):
+        return self.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _blocks(self):
+        # (y0, y1) of each block of rows to export
+        for start, end in self.row_spans:
+            for y0 in range(start, end, EXPORT_ROWS):
+                if self._cancel.is_set():
+                    return
+                yield y0, min(end, y0 + EXPORT_ROWS)
+
+    def _index(self, y0, y1):
+        levels = self.model.header_shape[1]
+        return [[self._as_str(v) for v in self.model.header_block(1, y0, y1, level)]
+                for level in range(levels)]
+
+    def _header_rows(self):
+        model = self.model
+        hdr_levels, idx_levels = model.header_shape
+        rows = []
+        for level in range(hdr_levels):
+            if level == hdr_levels - 1:
+                row = [self._as_str(model.name(1, l)) for l in range(idx_levels)]
+            else:
+                row = [''] * idx_levels
+            for x0, x1 in self.column_spans:
+                row.extend(self._as_str(v) for v in model.header_block(0, x0, x1, level))
+            rows.append(row)
+        return rows
+
+    def _write_text(self, fd):
+        import csv
+        if self.format == 'tsv':
+            writer = csv.writer(fd, delimiter='\t', lineterminator='\n')
+        else:
+            writer = csv.writer(fd)
+        if self.header:
+            writer.writerows(self._header_rows())
+        for y0, y1 in self._blocks():
+            rows = [[] for _ in range(y0, y1)]
+            for values in self._index(y0, y1):
+                for row, value in zip(rows, values):
+                    row.append(value)
+            for x0, x1 in self.column_spans:
+                block = format_block(self.model, y0, y1, x0, x1,
+                                     self._as_str, self.precision)
+                for row, values in zip(rows, block):
+                    row.extend(values)
+            writer.writerows(rows)
+            self.rows += y1 - y0
+
+    def _column_names(self):
+        model = self.model
+        hdr_levels, idx_levels = model.header_shape
+        names = [self._as_str(model.name(1, level)) for level in range(idx_levels)]
+        for x0, x1 in self.column_spans:
+            if not hdr_levels:
+                names.extend(str(x) for x in range(x0, x1))
+                continue
+            levels = [model.header_block(0, x0, x1, level) for level in range(hdr_levels)]
+            names.extend('/'.join(self._as_str(v) for v in values)
+                         for values in zip(*levels))
+        return names
+
+    def _write_parquet(self, path):
+        # columns with a native (non-object) type keep it, the index and
+        # other columns are written as their displayed strings
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = [x for x0, x1 in self.column_spans for x in range(x0, x1)]
+        types = {}
+        schema = None
+        writer = None
+        batches = []
+        try:
+            for y0, y1 in self._blocks():
+                arrays = [pa.array(values, type=pa.string()) for values in self._index(y0, y1)]
+                for x in columns:
+                    values = self.model.column_block(x, y0, y1)
+                    native = values is not None and getattr(values, 'dtype', object) != object
+                    if native and types.get(x, True):
+                        try:
+                            arrays.append(pa.array(values, from_pandas=True))
+                            types[x] = True
+                            continue
+                        except (pa.ArrowException, TypeError, ValueError):
+                            if x in types:
+                                raise
+                    types[x] = False
+                    strings = None if values is None else format_column(values, self.precision)
+                    if strings is None:
+                        block = self.model.data_block(y0, y1, x, x + 1)
+                        strings = [self._as_str(row[0]) for row in block]
+                    arrays.append(pa.array(strings, type=pa.string()))
+                if schema is None:
+                    batch = pa.RecordBatch.from_arrays(arrays, self._column_names())
+                    schema = batch.schema
+                    writer = pq.ParquetWriter(path, schema)
+                else:
+                    batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+                batches.append(batch)
+                if sum(b.num_rows for b in batches) >= PARQUET_ROWS:
+                    writer.write_table(pa.Table.from_batches(batches))
+                    batches = []
+                self.rows += y1 - y0
+            if batches:
+                writer.write_table(pa.Table.from_batches(batches))
+            elif writer is None and not self._cancel.is_set():
+                # no rows: only write the schema
+                names = self._column_names()
+                schema = pa.schema([(name, pa.string()) for name in names])
+                pq.write_table(schema.empty_table(), path)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def run(self):
+        path = self.output if isinstance(self.output, str) else None
+        try:
+            if self.format == 'parquet':
+                if path is None:
+                    raise ValueError("Parquet can only be exported to a path")
+                self._write_parquet(path)
+            elif path is None:
+                self._write_text(self.output)
+            else:
+                with io.open(path, 'w', encoding='utf-8', newline='') as fd:
+                    self._write_text(fd)
+        except Exception as e:
+            self.error = e
+        if path is not None and (self.error is not None or self._cancel.is_set()):
+            # do not leave partial files behind
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from .compat import *
+
+import math
+import sys
+
+FLOAT_PRECISION = None  # Digits after the decimal point (None for shortest repr)
+
+
+# Support any missing value from Pandas efficiently
+def as_str_py(obj):
+    if obj is None: return ''
+    if isinstance(obj, float) and math.isnan(obj): return ''
+    try:
+        # NaN/NaT from NumPy
+        if obj != obj: return ''
+    except (TypeError, ValueError):
+        pass
+    return str(obj)
+
+def get_as_str(precision=None):
+    if 'pandas' in sys.modules:
+        import pandas as pd
+        as_str = lambda x: '' if pd.isnull(x) else str(x)
+    else:
+        as_str = as_str_py
+    if precision is None:
+        return as_str
+    return lambda x: '%.*f' % (precision, x) \
+        if isinstance(x, float) and not math.isnan(x) else as_str(x)
+
+
+def _format_datetime(values, pandas):
+    import numpy as np
+    if not pandas:
+        # same as str(numpy.datetime64)
+        return np.datetime_as_string(values).tolist()
+
+    # same as str(pandas.Timestamp), which only shows the required precision
+    strings = np.empty(len(values), dtype=object)
+    seconds = values.astype('datetime64[s]') == values
+    micros = ~seconds & (values.astype('datetime64[us]') == values)
+    nanos = ~(seconds | micros)
+    for mask, unit in [(seconds, 's'), (micros, 'us'), (nanos, 'ns')]:
+        if mask.any():
+            strings[mask] = [s.replace('T', ' ', 1) for s in
+                             np.datetime_as_string(values[mask], unit=unit).tolist()]
+    return strings.tolist()
+
+
+def format_column(values, precision=None):
+    """Return the display strings of a column slice (a numpy array or pandas
+    Series) in a single vectorized pass. Missing values are shown as empty
+    strings. Return None for columns which need per-value formatting."""
+    import numpy as np
+    pandas = hasattr(values, 'iloc')
+    if pandas and str(values.dtype) == 'category':
+        categories = format_column(values.cat.categories.to_numpy(), precision)
+        if categories is None:
+            categories = [get_as_str(precision)(v) for v in values.cat.categories]
+        categories = np.array(categories + [''], dtype=object)
+        return categories[values.cat.codes.to_numpy()].tolist()
+    if pandas and values.dtype.kind == 'O' and str(values.dtype).startswith('str'):
+        # pandas string columns only hold strings and missing values
+        return values.fillna('').tolist()
+    if pandas:
+        values = values.to_numpy()
+    values = np.asarray(values)
+    kind = values.dtype.kind
+
+    if kind in 'biu':
+        return list(map(str, values.tolist()))
+    if kind in 'US':
+        return list(map(str, values.tolist()))
+    if kind == 'f':
+        if precision is not None:
+            strings = ['%.*f' % (precision, v) for v in values.tolist()]
+        elif values.dtype == np.float64:
+            # repr(float) matches str(numpy.float64), and is faster
+            strings = list(map(repr, values.tolist()))
+        else:
+            strings = values.astype(str).tolist()
+        for idx in np.flatnonzero(np.isnan(values)).tolist():
+            strings[idx] = ''
+        return strings
+    if kind == 'M':
+        strings = _format_datetime(values, pandas)
+        for idx in np.flatnonzero(np.isnat(values)).tolist():
+            strings[idx] = ''
+        return strings
+    return None
+
+
+def format_block(model, y0, y1, x0, x1, as_str, precision=None):
+    """Return the rows of display strings of a block of model. Columns are
+    formatted at once when the model provides native column slices, falling
+    back to as_str for each value otherwise. Without precision, the strings
+    of columns kept as read are shown."""
+    columns = []
+    fallback = []
+    for x in range(x0, x1):
+        strings = model.column_text(x, y0, y1) if precision is None else None
+        if strings is None:
+            values = model.column_block(x, y0, y1)
+            strings = None if values is None else format_column(values, precision)
+        if strings is None:
+            fallback.append(x)
+        columns.append(strings)
+    if fallback:
+        f0 = fallback[0]
+        block = model.data_block(y0, y1, f0, fallback[-1] + 1)
+        for x in fallback:
+            columns[x - x0] = [as_str(row[x - f0]) for row in block]
+    if not columns:
+        return [[] for _ in range(y0, y1)]
+    return [list(row) for row in zip(*columns)]
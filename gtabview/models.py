@@ -2,6 +2,14 @@
 from __future__ import print_function, unicode_literals, absolute_import, generators, division
 
 from .compat import *
+from . import profiling
+
+import bisect
+import threading
+from collections import OrderedDict
+
+PARTITION_CACHE = 1 << 29   # Memory budget (in bytes) for the partitions kept in memory
+PARTITION_BATCH = 64        # Partitions measured at once by ExtPartitionedModel
 
 
 def getitem(lst, idx, default=None):
@@ -23,15 +31,72 @@ class ExtDataModel(object):
     def data(self, y, x):
         raise Exception()
 
+    def data_block(self, y0, y1, x0, x1):
+        # rows of values in [y0, y1) x [x0, x1), which must be within shape
+        return [[self.data(y, x) for x in range(x0, x1)] for y in range(y0, y1)]
+
+    def column_block(self, x, y0, y1):
+        # native (numpy/pandas) slice of column x, when available
+        return None
+
+    def row_block(self, y, x0, x1):
+        # native (numpy/pandas) slice of row y, when available
+        return None
+
+    def column_take(self, x, rows):
+        # native (numpy/pandas) values of column x at the rows indices
+        return None
+
+    def column_text(self, x, y0, y1):
+        # strings shown for column x in [y0, y1) instead of formatting its
+        # native slice (such as numbers kept as read), when available
+        return None
+
     def header(self, axis, x, level):
         raise Exception()
 
+    def header_block(self, axis, x0, x1, level):
+        return [self.header(axis, x, level) for x in range(x0, x1)]
+
+    def header_starts(self, axis, x0, x1, level):
+        # whether each header in [x0, x1) differs from the previous one
+        if x0 == x1:
+            return []
+        values = self.header_block(axis, max(0, x0 - 1), x1, level)
+        starts = [a != b for a, b in zip(values, values[1:])]
+        return starts if x0 else [True] + starts
+
     def name(self, axis, level):
         return 'L' + str(level)
 
+    @property
+    def loading(self):
+        # True while the model is still growing in the background
+        return False
+
+    @property
+    def random_access(self):
+        # False when reading far from the last accessed rows is expensive
+        return True
+
+    @property
+    def generation(self):
+        # incremented when the data is replaced (such as a followed file
+        # being truncated or rotated)
+        return 0
+
     @property
     def chunk_size(self):
-        return max(*self.shape())
+        return max(self.shape)
+
+    def stop(self):
+        # stop growing in the background (such as when following a file)
+        pass
+
+    def close(self):
+        # stop, and release the resources (such as open files) of the model,
+        # which cannot be read afterwards
+        self.stop()
 
     def transpose(self):
         # TODO: remove from base model
@@ -56,22 +121,201 @@ class TransposedExtDataModel(ExtDataModel):
     def data(self, y, x):
         return self._model.data(x, y)
 
+    def data_block(self, y0, y1, x0, x1):
+        block = self._model.data_block(x0, x1, y0, y1)
+        if not block:
+            return [[] for _ in range(y0, y1)]
+        return [list(row) for row in zip(*block)]
+
+    def column_block(self, x, y0, y1):
+        return self._model.row_block(x, y0, y1)
+
+    def row_block(self, y, x0, x1):
+        return self._model.column_block(y, x0, x1)
+
     def header(self, axis, x, level):
         return self._model.header(not axis, x, level)
 
+    def header_block(self, axis, x0, x1, level):
+        return self._model.header_block(not axis, x0, x1, level)
+
+    def header_starts(self, axis, x0, x1, level):
+        return self._model.header_starts(not axis, x0, x1, level)
+
     def name(self, axis, level):
         return self._model.name(not axis, level)
 
+    @property
+    def loading(self):
+        return self._model.loading
+
+    @property
+    def random_access(self):
+        return self._model.random_access
+
+    @property
+    def generation(self):
+        return self._model.generation
+
+    def stop(self):
+        self._model.stop()
+
+    def close(self):
+        self._model.close()
+
     def transpose(self):
         return self._model
 
 
+class SortedExtDataModel(ExtDataModel):
+    """Rows of model reordered by order, a permutation of the row indices.
+    The data of model is not copied"""
+
+    def __init__(self, model, order):
+        super(SortedExtDataModel, self).__init__()
+        self._model = model
+        self._order = order
+
+    @property
+    def shape(self):
+        return (len(self._order), self._model.shape[1])
+
+    @property
+    def header_shape(self):
+        return self._model.header_shape
+
+    def data(self, y, x):
+        return self._model.data(self._order[y], x)
+
+    def data_block(self, y0, y1, x0, x1):
+        return [self._model.data_block(y, y + 1, x0, x1)[0] for y in self._order[y0:y1]]
+
+    def column_block(self, x, y0, y1):
+        return self._model.column_take(x, self._order[y0:y1])
+
+    def column_text(self, x, y0, y1):
+        if self._model.column_text(x, 0, 0) is None:
+            return None
+        return [self._model.column_text(x, y, y + 1)[0] for y in self._order[y0:y1]]
+
+    def row_block(self, y, x0, x1):
+        return self._model.row_block(self._order[y], x0, x1)
+
+    def header(self, axis, x, level):
+        return self._model.header(axis, self._order[x] if axis else x, level)
+
+    def header_block(self, axis, x0, x1, level):
+        if axis == 0:
+            return self._model.header_block(axis, x0, x1, level)
+        return [self._model.header(axis, y, level) for y in self._order[x0:x1]]
+
+    def name(self, axis, level):
+        return self._model.name(axis, level)
+
+    @property
+    def loading(self):
+        return self._model.loading
+
+    @property
+    def random_access(self):
+        return self._model.random_access
+
+    @property
+    def generation(self):
+        return self._model.generation
+
+    def stop(self):
+        self._model.stop()
+
+    def close(self):
+        self._model.close()
+
+
+def _sort_key(value, ascending):
+    # numbers (or numeric strings), then strings, then missing values
+    if value is None or value == '' or value != value:
+        return (3 if ascending else -1,)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, str(value))
+
+def _sort_array(values, ascending):
+    # array sorting (stably) as values, with missing values last
+    import numpy as np
+    if hasattr(values, 'iloc'):
+        if str(values.dtype) == 'category':
+            codes = values.cat.codes.to_numpy().astype(np.int64)
+            # missing values (-1) last
+            return np.where(codes < 0, np.iinfo(np.int64).max, codes if ascending else -codes)
+        values = values.to_numpy()
+    values = np.asarray(values)
+    kind = values.dtype.kind
+    if kind == 'b':
+        values = values.astype(np.int8)
+        kind = 'i'
+    if kind in 'iu':
+        return values if ascending else ~values
+    if kind == 'f':
+        return values if ascending else -values
+    if kind in 'mM':
+        missing = np.isnat(values)
+        values = values.view(np.int64)
+        if not ascending:
+            values = ~values
+        # values may be a read-only view of the data
+        return np.where(missing, np.iinfo(np.int64).max, values)
+
+    # dense ranks of any other value
+    try:
+        import pandas as pd
+        ranks, uniques = pd.factorize(values, sort=True)
+        missing = ranks < 0
+    except ImportError:
+        uniques, ranks = np.unique(values, return_inverse=True)
+        missing = values != values
+    ranks = ranks.ravel()
+    if not ascending:
+        ranks = len(uniques) - 1 - ranks
+    ranks[missing] = len(uniques)
+    return ranks
+
+def sort_order(model, keys):
+    """Return the permutation sorting the rows of model by keys, a list of
+    (column, ascending) pairs by priority. The sort is stable"""
+    rows = model.shape[0]
+    columns = [model.column_block(x, 0, rows) for x, _ in keys]
+    if all(values is not None for values in columns):
+        try:
+            import numpy as np
+            order = np.arange(rows)
+            for values, (_, ascending) in reversed(list(zip(columns, keys))):
+                values = _sort_array(values, ascending)
+                order = order[np.argsort(values[order], kind='stable')]
+            return order
+        except (ImportError, TypeError):
+            pass
+
+    # sort by the extracted keys, from the least significant
+    order = list(range(rows))
+    for x, ascending in reversed(keys):
+        values = []
+        for y in range(0, rows, 4096):
+            block = model.data_block(y, min(rows, y + 4096), x, x + 1)
+            values.extend(_sort_key(row[0], ascending) for row in block)
+        order.sort(key=values.__getitem__, reverse=not ascending)
+    return order
+
 
 class ExtListModel(ExtDataModel):
-    def __init__(self, data, hdr_rows=0, idx_cols=0):
+    def __init__(self, data, hdr_rows=0, idx_cols=0, columns=None):
         super(ExtListModel, self).__init__()
+        if columns is None:
+            columns = max(map(len, data))
         self._header_shape = (hdr_rows, idx_cols)
-        self._shape = (len(data) - hdr_rows, max(map(len, data)) - idx_cols)
+        self._shape = (len(data) - hdr_rows, columns - idx_cols)
         self._data = data
 
     @property
@@ -92,6 +336,18 @@ class ExtListModel(ExtDataModel):
         return getitem2(self._data, y + self._header_shape[0],
                         x + self._header_shape[1])
 
+    def data_block(self, y0, y1, x0, x1):
+        hdr_rows, idx_cols = self._header_shape
+        x0 += idx_cols
+        x1 += idx_cols
+        block = []
+        for y in range(y0 + hdr_rows, y1 + hdr_rows):
+            row = list(getitem(self._data, y, [])[x0:x1])
+            if len(row) < x1 - x0:
+                row.extend([None] * (x1 - x0 - len(row)))
+            block.append(row)
+        return block
+
 
 class ExtMapModel(ExtDataModel):
     def __init__(self, data, sort=False):
@@ -112,6 +368,20 @@ class ExtMapModel(ExtDataModel):
     def data(self, y, x):
         return getitem(self._data[self._keys[x]], y)
 
+    def data_block(self, y0, y1, x0, x1):
+        columns = []
+        for x in range(x0, x1):
+            column = self._data[self._keys[x]]
+            try:
+                column = list(column[y0:y1])
+            except (TypeError, KeyError):
+                column = [getitem(column, y) for y in range(y0, min(y1, len(column)))]
+            column.extend([None] * (y1 - y0 - len(column)))
+            columns.append(column)
+        if not columns:
+            return [[] for _ in range(y0, y1)]
+        return [list(row) for row in zip(*columns)]
+
     def header(self, axis, x, level):
         return self._keys[x]
 
@@ -132,6 +402,11 @@ class ExtVectorModel(ExtDataModel):
     def data(self, y, x):
         return self._data[y]
 
+    def data_block(self, y0, y1, x0, x1):
+        if x0 == x1:
+            return [[] for _ in range(y0, y1)]
+        return [[value] for value in self._data[y0:y1]]
+
 
 class ExtMatrixModel(ExtDataModel):
     def __init__(self, data):
@@ -149,11 +424,29 @@ class ExtMatrixModel(ExtDataModel):
     def data(self, y, x):
         return self._data[y, x]
 
+    def data_block(self, y0, y1, x0, x1):
+        # iterate over plain arrays to return the same scalars as data()
+        import numpy as np
+        return [list(row) for row in np.asarray(self._data[y0:y1, x0:x1])]
+
+    def column_block(self, x, y0, y1):
+        import numpy as np
+        return np.asarray(self._data[y0:y1, x]).ravel()
+
+    def row_block(self, y, x0, x1):
+        import numpy as np
+        return np.asarray(self._data[y, x0:x1]).ravel()
+
+    def column_take(self, x, rows):
+        import numpy as np
+        return np.asarray(self._data[rows, x]).ravel()
+
 
 class ExtFrameModel(ExtDataModel):
     def __init__(self, data):
         super(ExtFrameModel, self).__init__()
         self._data = data
+        self._levels = {}
 
     def _axis(self, axis):
         return self._data.columns if axis == 0 else self._data.index
@@ -174,10 +467,63 @@ class ExtFrameModel(ExtDataModel):
     def data(self, y, x):
         return self._data.iat[y, x]
 
+    def data_block(self, y0, y1, x0, x1):
+        # iterate over the column arrays to return the same scalars as iat
+        block = self._data.iloc[y0:y1, x0:x1]
+        columns = [list(_array(block.iloc[:, x])) for x in range(block.shape[1])]
+        if not columns:
+            return [[] for _ in range(y0, y1)]
+        return [list(row) for row in zip(*columns)]
+
+    def column_block(self, x, y0, y1):
+        return self._data.iloc[y0:y1, x]
+
+    def row_block(self, y, x0, x1):
+        # only homogeneous rows can be formatted at once
+        dtypes = self._data.dtypes.iloc[x0:x1]
+        if any(dtype != dtypes.iloc[0] for dtype in dtypes):
+            return None
+        return self._data.iloc[y, x0:x1]
+
+    def column_take(self, x, rows):
+        return self._data.iloc[rows, x]
+
+    def _codes(self, axis, level):
+        # (values, codes, group starts) of a MultiIndex level, built once
+        key = (axis, level)
+        codes = self._levels.get(key)
+        if codes is None:
+            import numpy as np
+            ax = self._axis(axis)
+            # missing values have code -1
+            values = list(ax.levels[level]) + [float('nan')]
+            codes = np.asarray(_index_codes(ax)[level])
+            starts = np.empty(len(codes), dtype=bool)
+            starts[:1] = True
+            np.not_equal(codes[1:], codes[:-1], out=starts[1:])
+            # missing labels never compare equal, so each one starts a group
+            starts |= codes == -1
+            codes = self._levels[key] = (values, codes, starts)
+        return codes
+
     def header(self, axis, x, level=0):
         ax = self._axis(axis)
-        return ax.values[x] if not hasattr(ax, 'levels') \
-            else ax.values[x][level]
+        if not hasattr(ax, 'levels'):
+            return ax.values[x]
+        values, codes, _ = self._codes(axis, level)
+        return values[codes[x]]
+
+    def header_block(self, axis, x0, x1, level=0):
+        ax = self._axis(axis)
+        if not hasattr(ax, 'levels'):
+            return list(ax.values[x0:x1])
+        values, codes, _ = self._codes(axis, level)
+        return [values[c] for c in codes[x0:x1].tolist()]
+
+    def header_starts(self, axis, x0, x1, level=0):
+        if not hasattr(self._axis(axis), 'levels'):
+            return super(ExtFrameModel, self).header_starts(axis, x0, x1, level)
+        return self._codes(axis, level)[2][x0:x1].tolist()
 
     def name(self, axis, level):
         ax = self._axis(axis)
@@ -188,6 +534,190 @@ class ExtFrameModel(ExtDataModel):
         return super(ExtFrameModel, self).name(axis, level)
 
 
+class ExtPartitionedModel(ExtDataModel):
+    """ExtDataModel over a partitioned, lazily evaluated frame (such as a
+    Dask DataFrame). The length of each partition is computed once, in the
+    background: the shape grows until `loading` is False. Only the partitions
+    in use are materialized (as Pandas frames), keeping the most recently used
+    within PARTITION_CACHE bytes. The partition following the one accessed
+    is materialized ahead by a worker thread. Errors are stored in `error`."""
+
+    def __init__(self, frame):
+        super(ExtPartitionedModel, self).__init__()
+        self._frame = frame
+        meta = getattr(frame, '_meta', None)
+        if meta is None:
+            meta = frame.get_partition(0).compute()
+        self._meta = ExtFrameModel(meta)
+        self._offsets = [0]
+        self._cache = OrderedDict()
+        self._size = 0
+        self._pending = {}
+        self._prefetcher = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(target=self._load)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def shape(self):
+        return (self._offsets[-1], self._meta.shape[1])
+
+    @property
+    def header_shape(self):
+        return self._meta.header_shape
+
+    @property
+    def loading(self):
+        return self._thread.is_alive()
+
+    @property
+    def random_access(self):
+        return False
+
+    def stop(self):
+        self._stopped.set()
+
+    def _load(self):
+        # lengths of the partitions, measured a batch at a time
+        count = self._frame.npartitions
+        try:
+            for start in range(0, count, PARTITION_BATCH):
+                if self._stopped.is_set():
+                    break
+                batch = self._frame.partitions[start:min(count, start + PARTITION_BATCH)]
+                offsets = list(self._offsets)
+                for length in batch.map_partitions(len).compute().tolist():
+                    offsets.append(offsets[-1] + int(length))
+                self._offsets = offsets
+        except Exception as e:
+            self.error = e
+
+    def _partition(self, part, prefetch=True):
+        # model of the materialized partition
+        with self._lock:
+            entry = self._cache.get(part)
+            if entry is not None:
+                self._cache[part] = self._cache.pop(part)
+            else:
+                event = self._pending.get(part)
+                owner = event is None
+                if owner:
+                    event = self._pending[part] = threading.Event()
+        if entry is None:
+            if not owner:
+                # being materialized by another thread
+                event.wait()
+                return self._partition(part, prefetch)
+            try:
+                frame = self._frame.get_partition(part).compute()
+                entry = (ExtFrameModel(frame), int(frame.memory_usage(deep=True).sum()))
+                with self._lock:
+                    self._cache[part] = entry
+                    self._size += entry[1]
+                    # always keep the partitions in use and ahead
+                    while self._size > PARTITION_CACHE and len(self._cache) > 2:
+                        self._size -= self._cache.popitem(last=False)[1][1]
+            finally:
+                with self._lock:
+                    del self._pending[part]
+                event.set()
+        if prefetch:
+            self._prefetch(part + 1)
+        return entry[0]
+
+    def _prefetch(self, part):
+        with self._lock:
+            if part >= len(self._offsets) - 1 or part in self._cache or part in self._pending \
+               or (self._prefetcher is not None and self._prefetcher.is_alive()):
+                return
+            self._prefetcher = threading.Thread(target=self._fetch_ahead, args=(part,))
+            self._prefetcher.daemon = True
+        self._prefetcher.start()
+
+    def _fetch_ahead(self, part):
+        try:
+            self._partition(part, prefetch=False)
+        except Exception:
+            # raised again when accessed
+            pass
+
+    def _spans(self, y0, y1):
+        # (partition model, start, end) covering rows [y0, y1)
+        offsets = self._offsets
+        part = bisect.bisect_right(offsets, y0) - 1
+        while y0 < y1:
+            end = min(y1, offsets[part + 1])
+            yield self._partition(part), y0 - offsets[part], end - offsets[part]
+            y0 = end
+            part += 1
+
+    def data(self, y, x):
+        part = bisect.bisect_right(self._offsets, y) - 1
+        return self._partition(part).data(y - self._offsets[part], x)
+
+    def data_block(self, y0, y1, x0, x1):
+        block = []
+        for model, start, end in self._spans(y0, y1):
+            block.extend(model.data_block(start, end, x0, x1))
+        return block
+
+    def column_block(self, x, y0, y1):
+        parts = [model.column_block(x, start, end) for model, start, end in self._spans(y0, y1)]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return self._meta.column_block(x, 0, 0)
+        import pandas as pd
+        return pd.concat(parts)
+
+    def row_block(self, y, x0, x1):
+        part = bisect.bisect_right(self._offsets, y) - 1
+        return self._partition(part).row_block(y - self._offsets[part], x0, x1)
+
+    def column_take(self, x, rows):
+        import numpy as np
+        rows = np.asarray(rows, dtype=np.int64)
+        chunks = np.searchsorted(self._offsets, rows, 'right') - 1
+        parts = []
+        for part in np.unique(chunks).tolist():
+            mask = chunks == part
+            values = self._partition(part).column_take(x, rows[mask] - self._offsets[part])
+            parts.append((mask, values.to_numpy()))
+        if not parts:
+            return np.empty(0)
+        values = np.empty(len(rows), np.result_type(*[part[1] for part in parts]))
+        for mask, part in parts:
+            values[mask] = part
+        return values
+
+    def header(self, axis, x, level):
+        if axis == 0:
+            return self._meta.header(axis, x, level)
+        part = bisect.bisect_right(self._offsets, x) - 1
+        return self._partition(part).header(axis, x - self._offsets[part], level)
+
+    def header_block(self, axis, x0, x1, level):
+        if axis == 0:
+            return self._meta.header_block(axis, x0, x1, level)
+        block = []
+        for model, start, end in self._spans(x0, x1):
+            block.extend(model.header_block(axis, start, end, level))
+        return block
+
+    def name(self, axis, level):
+        return self._meta.name(axis, level)
+
+
+def _array(series):
+    return series.array if hasattr(series, 'array') else series.values
+
+def _index_codes(index):
+    return index.codes if hasattr(index, 'codes') else index.labels
+
+
 def _data_lower(data, sort):
     if data.__class__.__name__ in ['Series', 'Panel']:
         # handle panels and series as frames
@@ -202,6 +732,7 @@ def _data_lower(data, sort):
     return data
 
 
+@profiling.timed('as_model')
 def as_model(data, hdr_rows=0, idx_cols=0, transpose=False, sort=False):
     model = None
     if isinstance(data, ExtDataModel):
@@ -209,8 +740,11 @@ def as_model(data, hdr_rows=0, idx_cols=0, transpose=False, sort=False):
     else:
         data = _data_lower(data, sort)
 
-        if hasattr(data, '__array__') and hasattr(data, 'iat') and \
-           hasattr(data, 'index') and hasattr(data, 'columns'):
+        if hasattr(data, 'npartitions') and hasattr(data, 'get_partition') and \
+           hasattr(data, 'columns'):
+            model = ExtPartitionedModel(data)
+        elif hasattr(data, '__array__') and hasattr(data, 'iat') and \
+             hasattr(data, 'index') and hasattr(data, 'columns'):
             model = ExtFrameModel(data)
         elif hasattr(data, '__array__') and len(data.shape) >= 2:
             model = ExtMatrixModel(data)
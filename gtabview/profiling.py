@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Timing of the loading stages (reading, modeling, layout and first paint),
+# reported as JSON and optionally as a Chrome trace. See gtabview.view.
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+
+import functools
+import os
+import sys
+import threading
+import time
+
+TRACE = None            # Path of the Chrome trace written along each report
+TRACE_MEMORY = True     # Trace the peak allocation of each stage (slower)
+
+PROFILER = None         # Active Profiler, if any
+_atexit = []
+
+try:
+    _clock = time.perf_counter
+except AttributeError:
+    _clock = time.time
+
+try:
+    _cpu_clock = time.thread_time
+except AttributeError:
+    try:
+        _cpu_clock = time.process_time
+    except AttributeError:
+        _cpu_clock = time.clock
+
+
+class _Stage(object):
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.profiler._begin(self)
+        return self
+
+    def set(self, **args):
+        """Add args to the stage record"""
+        self.args.update(args)
+
+    def __exit__(self, *exc):
+        self.profiler._end(self)
+
+
+class Profiler(object):
+    """Records nested stages, from any thread"""
+
+    def __init__(self, memory=TRACE_MEMORY):
+        self.stages = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._main = threading.current_thread()
+        self._memory = None
+        if memory:
+            try:
+                import tracemalloc
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._memory = tracemalloc
+            except ImportError:
+                pass
+        self._start = _clock()
+        self._cpu_start = _cpu_clock()
+
+    def stage(self, name, **args):
+        """Context manager recording the stage name, with optional args"""
+        return _Stage(self, name, args)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _traced(self):
+        return self._memory is not None and threading.current_thread() is self._main
+
+    def _begin(self, stage):
+        stack = self._stack()
+        stage.depth = len(stack)
+        stage.peak = None
+        if self._traced():
+            # track the peak of each stage by resetting it, while keeping
+            # the peak of the enclosing stages
+            current, peak = self._memory.get_traced_memory()
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            stage.base = current
+            stage.child_peak = 0
+            if hasattr(self._memory, 'reset_peak'):
+                self._memory.reset_peak()
+        stack.append(stage)
+        stage.start = _clock()
+        stage.cpu = _cpu_clock()
+
+    def _end(self, stage):
+        end = _clock()
+        cpu = _cpu_clock() - stage.cpu
+        stack = self._stack()
+        # stages spanning events might not be closed in order
+        stack.remove(stage)
+        if self._traced():
+            peak = max(self._memory.get_traced_memory()[1], stage.child_peak)
+            stage.peak = max(0, peak - stage.base)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        thread = threading.current_thread()
+        record = {'name': stage.name, 'start': stage.start - self._start,
+                  'wall': end - stage.start, 'cpu': cpu, 'peak_bytes': stage.peak,
+                  'depth': stage.depth, 'thread': thread.name, 'tid': thread.ident}
+        if stage.args:
+            record['args'] = stage.args
+        with self._lock:
+            self.stages.append(record)
+
+    def report(self):
+        """Return the report as a dict"""
+        with self._lock:
+            stages = sorted(self.stages, key=lambda stage: stage['start'])
+        return {'wall': _clock() - self._start,
+                'cpu': _cpu_clock() - self._cpu_start,
+                'stages': stages}
+
+    def trace(self):
+        """Return the stages as a Chrome trace (Trace Event Format)"""
+        pid = os.getpid()
+        events = []
+        for stage in self.report()['stages']:
+            args = dict(stage.get('args', {}))
+            args['cpu_ms'] = stage['cpu'] * 1e3
+            if stage['peak_bytes'] is not None:
+                args['peak_kb'] = stage['peak_bytes'] / 1024.
+            events.append({'name': stage['name'], 'cat': 'gtabview', 'ph': 'X',
+                           'ts': stage['start'] * 1e6, 'dur': stage['wall'] * 1e6,
+                           'pid': pid, 'tid': stage['tid'], 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def stop(self):
+        if self._memory is not None:
+            self._memory.stop()
+            self._memory = None
+
+
+def _env_report():
+    value = os.environ.get('GTABVIEW_PROFILE')
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    return True if value.lower() in ('1', 'true', 'yes') else value
+
+
+def start(report=None, trace=None):
+    """Start profiling (unless already active). report is True (for stderr)
+    or the path of the JSON report, defaulting to GTABVIEW_PROFILE. Return
+    True when a new profile was started"""
+    global PROFILER
+    if report is None:
+        report = _env_report()
+    if not report or PROFILER is not None:
+        return False
+    if not _atexit:
+        import atexit
+        atexit.register(finish)
+        _atexit.append(True)
+    PROFILER = Profiler()
+    PROFILER.report_path = report
+    PROFILER.trace_path = trace or TRACE or os.environ.get('GTABVIEW_PROFILE_TRACE')
+    return True
+
+
+def active():
+    return PROFILER is not None
+
+
+def finish():
+    """Stop profiling, writing the report (and trace). Return the report"""
+    global PROFILER
+    profiler, PROFILER = PROFILER, None
+    if profiler is None:
+        return None
+    import json
+    profiler.stop()
+    report = profiler.report()
+    if profiler.report_path is True:
+        json.dump(report, sys.stderr, indent=2)
+        print(file=sys.stderr)
+    else:
+        with open(profiler.report_path, 'w') as fd:
+            json.dump(report, fd, indent=2)
+    if profiler.trace_path:
+        with open(profiler.trace_path, 'w') as fd:
+            json.dump(profiler.trace(), fd)
+    return report
+
+
+class _NoStage(object):
+    def __enter__(self):
+        return self
+
+    def set(self, **args):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name, **args):
+    """Context manager recording a stage when profiling"""
+    profiler = PROFILER
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.stage(name, **args)
+
+
+def timed(name):
+    """Decorator recording each call as a stage when profiling"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = PROFILER
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -12,25 +12,24 @@ if 'QT_API' not in os.environ:
     elif 'PySide' in sys.modules:
         os.environ['QT_API'] = 'pyside'
 
-# Autodetect what's available
-if 'QT_API' not in os.environ:
-    try:
-        import PyQt5
-        os.environ['QT_API'] = 'pyqt5'
-    except ImportError:
-        pass
-if 'QT_API' not in os.environ:
+# Autodetect what's available, without importing
+def _available(module):
     try:
-        import PyQt4
-        os.environ['QT_API'] = 'pyqt4'
+        from importlib.util import find_spec
     except ImportError:
-        pass
+        import imp
+        try:
+            imp.find_module(module)
+            return True
+        except ImportError:
+            return False
+    return find_spec(module) is not None
+
 if 'QT_API' not in os.environ:
-    try:
-        import PySide
-        os.environ['QT_API'] = 'pyside'
-    except ImportError:
-        pass
+    for module, api in [('PyQt5', 'pyqt5'), ('PyQt4', 'pyqt4'), ('PySide', 'pyside')]:
+        if _available(module):
+            os.environ['QT_API'] = api
+            break
 
 # Actual module import
 if os.environ['QT_API'] == 'pyqt5':
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+from .formatting import get_as_str, format_column
+
+import array
+import bisect
+import re
+import sys
+import threading
+import time
+
+SEARCH_ROWS = 4096      # Rows scanned at once by each search
+SEARCH_WAIT = 0.1       # Seconds waited for more rows of models still loading
+
+MODES = ['text', 'regex', 'number']
+
+try:
+    array.array('q')
+    _TYPECODE = 'q'
+except (ValueError, TypeError):
+    # Python 2 lacks 'q', and takes native strings only
+    _TYPECODE = b'l'
+
+
+class Query(object):
+    """Match values with a case-insensitive (unless case) substring, a
+    regular expression, or a numeric value. Text is matched against the
+    displayed strings."""
+
+    def __init__(self, text, mode='text', case=False, precision=None):
+        if mode not in MODES:
+            raise ValueError("unknown search mode: {}".format(mode))
+        self.text = text
+        self.mode = mode
+        self.case = case
+        self.as_str = get_as_str(precision)
+        self.precision = precision
+        if mode == 'number':
+            self.number = float(text)
+        else:
+            pattern = text if mode == 'regex' else re.escape(text)
+            self.regex = re.compile(pattern, 0 if case else re.IGNORECASE)
+
+    def match(self, value):
+        if self.mode == 'number':
+            try:
+                return float(value) == self.number
+            except (TypeError, ValueError):
+                return False
+        return self.regex.search(self.as_str(value)) is not None
+
+    def _match_numbers(self, values):
+        import numpy as np
+        if values.dtype.kind in 'biuf':
+            return values == self.number
+        if values.dtype.kind in 'mM':
+            return np.zeros(len(values), dtype=bool)
+        if 'pandas' in sys.modules:
+            import pandas as pd
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+            return values.to_numpy() == self.number
+        return np.fromiter(map(self.match, values.tolist()), dtype=bool, count=len(values))
+
+    def _match_series(self, values):
+        # vectorized matching of pandas string columns
+        import numpy as np
+        import pandas as pd
+        if self.mode == 'number':
+            # only convert the values which may be numbers
+            mask = np.array(values.str.match(r'\s*[-+]?[0-9.iInN]', na=False), dtype=bool)
+            numbers = pd.to_numeric(values[mask], errors='coerce').to_numpy()
+            mask[mask] = numbers == self.number
+            return mask
+        try:
+            if self.mode == 'text':
+                mask = values.str.contains(self.text, case=self.case, regex=False, na=False)
+            else:
+                mask = values.str.contains(self.regex.pattern, case=self.case, na=False)
+            return mask.to_numpy(dtype=bool)
+        except Exception:
+            # pattern not supported by the string backend
+            return None
+
+    def match_column(self, values):
+        """Return a boolean array of the matches in a column slice (a numpy
+        array or pandas Series)"""
+        import numpy as np
+        if hasattr(values, 'iloc'):
+            import pandas as pd
+            if isinstance(values.dtype, pd.StringDtype):
+                mask = self._match_series(values)
+                if mask is not None:
+                    return mask
+        if self.mode == 'number':
+            if hasattr(values, 'iloc'):
+                values = values.to_numpy()
+            return self._match_numbers(np.asarray(values))
+        strings = format_column(values, self.precision)
+        if strings is None:
+            strings = [self.as_str(v) for v in values]
+        search = self.regex.search
+        return np.fromiter((search(s) is not None for s in strings),
+                           dtype=bool, count=len(strings))
+
+
+class Matches(object):
+    """Sorted (row, column) positions of the matches, stored compactly as
+    row-major offsets"""
+
+    def __init__(self, columns):
+        self.columns = max(1, columns)
+        self._positions = array.array(_TYPECODE)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, idx):
+        return divmod(self._positions[idx], self.columns)
+
+    def extend(self, positions):
+        # positions must follow the last one
+        with self._lock:
+            self._positions.extend(positions)
+
+    def next(self, y, x, backward=False):
+        """Return the match following (or preceding) y, x, wrapping
+        around, or None"""
+        with self._lock:
+            if not self._positions:
+                return None
+            pos = y * self.columns + x
+            if backward:
+                idx = bisect.bisect_left(self._positions, pos) - 1
+            else:
+                idx = bisect.bisect_right(self._positions, pos)
+            return divmod(self._positions[idx % len(self._positions)], self.columns)
+
+
+class Search(threading.Thread):
+    """Scan model for query in the background, restricted to columns when
+    given. Matches are available while scanning."""
+
+    def __init__(self, model, query, columns=None):
+        super(Search, self).__init__()
+        self.daemon = True
+        self.model = model
+        self.query = query
+        self.columns = sorted(columns) if columns is not None else None
+        self.matches = Matches(model.shape[1])
+        self.rows = 0
+        self.error = None
+        self._cancel = threading.Event()
+
+    @property
+    def running(self):
+        return self.is_alive()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _scan_columns(self, y0, y1, columns):
+        import numpy as np
+        mask = np.zeros((y1 - y0, len(columns)), dtype=bool)
+        for idx, x in enumerate(columns):
+            values = None
+            if self.query.mode != 'number' and self.query.precision is None:
+                # match the strings shown
+                values = self.model.column_text(x, y0, y1)
+            if values is None:
+                values = self.model.column_block(x, y0, y1)
+            if values is not None:
+                mask[:, idx] = self.query.match_column(values)
+            else:
+                block = self.model.data_block(y0, y1, x, x + 1)
+                mask[:, idx] = [self.query.match(row[0]) for row in block]
+        rows, idx = np.nonzero(mask)
+        return ((rows + y0) * self.matches.columns + np.asarray(columns)[idx]).tolist()
+
+    def _scan_rows(self, y0, y1, columns):
+        match = self.query.match
+        x0, x1 = columns[0], columns[-1] + 1
+        positions = []
+        for y, row in enumerate(self.model.data_block(y0, y1, x0, x1), y0):
+            base = y * self.matches.columns
+            positions.extend(base + x for x in columns if match(row[x - x0]))
+        return positions
+
+    def _scan(self, y0, y1):
+        columns = self.columns
+        if columns is None:
+            columns = list(range(self.model.shape[1]))
+        columns = [x for x in columns if x < self.matches.columns]
+        if not columns:
+            return []
+        if self.model.column_block(columns[0], y0, y0 + 1) is not None:
+            return self._scan_columns(y0, y1, columns)
+        return self._scan_rows(y0, y1, columns)
+
+    def run(self):
+        try:
+            while not self._cancel.is_set():
+                rows = self.model.shape[0]
+                if self.rows >= rows:
+                    if not self.model.loading:
+                        break
+                    time.sleep(SEARCH_WAIT)
+                    continue
+                y1 = min(rows, self.rows + SEARCH_ROWS)
+                self.matches.extend(self._scan(self.rows, y1))
+                self.rows = y1
+        except Exception as e:
+            self.error = e
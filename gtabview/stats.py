@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+
+import math
+import sys
+import threading
+import time
+
+STATS_ROWS = 1 << 16    # Rows of column slices reduced at once
+STATS_ROW_BLOCK = 4096  # Rows read at once from models without column slices
+STATS_WAIT = 0.1        # Seconds waited for more rows of models still loading
+HLL_BITS = 12           # Index bits of the HyperLogLog registers (~1.6% error)
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(h):
+    # splitmix64 finalizer, spreading the bits of Python hashes
+    h = (h ^ (h >> 30)) * 0xbf58476d1ce4e5b9 & _MASK64
+    h = (h ^ (h >> 27)) * 0x94d049bb133111eb & _MASK64
+    return h ^ (h >> 31)
+
+
+def _mix_array(h):
+    import numpy as np
+    with np.errstate(over='ignore'):
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return h ^ (h >> np.uint64(31))
+
+
+class HyperLogLog(object):
+    """Approximate distinct count of 64-bit hashes"""
+
+    def __init__(self, bits=HLL_BITS):
+        self.bits = bits
+        self.registers = [0] * (1 << bits)
+
+    def add(self, h):
+        idx = h >> (64 - self.bits)
+        rest = (h << self.bits) & _MASK64
+        rank = min(64 - rest.bit_length(), 64 - self.bits) + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add_array(self, h):
+        import numpy as np
+        if not len(h):
+            return
+        if not isinstance(self.registers, np.ndarray):
+            self.registers = np.array(self.registers, dtype=np.uint8)
+        idx = (h >> np.uint64(64 - self.bits)).astype(np.intp)
+        # the leading zeros from the exponent of the top 53 (exact) bits
+        rest = (h << np.uint64(self.bits)) >> np.uint64(11)
+        _, exp = np.frexp(rest.astype(np.float64))
+        rank = np.minimum(53 - exp, 64 - self.bits) + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other):
+        """Add the hashes counted by other (with the same bits)"""
+        if isinstance(self.registers, list) and isinstance(other.registers, list):
+            self.registers = list(map(max, self.registers, other.registers))
+        else:
+            import numpy as np
+            self.registers = np.maximum(np.asarray(self.registers, dtype=np.uint8),
+                                        np.asarray(other.registers, dtype=np.uint8))
+
+    def estimate(self):
+        m = len(self.registers)
+        registers = [int(r) for r in self.registers]
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if est <= 2.5 * m and zeros:
+            # linear counting for small cardinalities
+            est = m * math.log(m / zeros)
+        return int(round(est))
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isinf(value) or value != value else value
+
+
+class ColumnStats(object):
+    """Streaming statistics of a column: counts, range, mean/deviation of the
+    numeric values (Welford, merged per block) and approximate distinct
+    values (HyperLogLog). Other values only contribute to the range when no
+    number is present."""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.numbers = 0
+        self.mean = None
+        self._m2 = 0.
+        self._range = [None, None]
+        self._other = [None, None]
+        self._hll = HyperLogLog()
+
+    @property
+    def min(self):
+        return self._range[0] if self.numbers else self._other[0]
+
+    @property
+    def max(self):
+        return self._range[1] if self.numbers else self._other[1]
+
+    @property
+    def std(self):
+        if self.numbers < 2:
+            return None
+        return math.sqrt(self._m2 / (self.numbers - 1))
+
+    @property
+    def distinct(self):
+        return min(self._hll.estimate(), self.count)
+
+    def _update_range(self, rng, lo, hi):
+        try:
+            if rng[0] is None or lo < rng[0]:
+                rng[0] = lo
+            if rng[1] is None or hi > rng[1]:
+                rng[1] = hi
+        except TypeError:
+            # unorderable values
+            pass
+
+    def _merge(self, n, mean, m2):
+        total = self.numbers + n
+        if self.mean is None:
+            self.mean, self._m2 = mean, m2
+        else:
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self._m2 += m2 + delta * delta * self.numbers * n / total
+        self.numbers = total
+
+    def merge(self, other):
+        """Add the values counted by another ColumnStats"""
+        self.count += other.count
+        self.missing += other.missing
+        self._hll.merge(other._hll)
+        for rng, (lo, hi) in [(self._range, other._range), (self._other, other._other)]:
+            if lo is not None and hi is not None:
+                self._update_range(rng, lo, hi)
+        if other.numbers:
+            self._merge(other.numbers, other.mean, other._m2)
+
+    def add(self, value):
+        """Add a single value"""
+        if value is None or value == '' or value != value:
+            self.missing += 1
+            return
+        self.count += 1
+        try:
+            h = hash(value)
+        except TypeError:
+            h = hash(repr(value))
+        self._hll.add(_mix(h & _MASK64))
+        number = _number(value)
+        if number is None:
+            self._update_range(self._other, value, value)
+            return
+        self.numbers += 1
+        if self.mean is None:
+            self.mean = float(number)
+        else:
+            delta = number - self.mean
+            self.mean += delta / self.numbers
+            self._m2 += delta * (number - self.mean)
+        self._update_range(self._range, number, number)
+
+    def add_values(self, values):
+        """Add a column slice (a numpy array or pandas Series) at once"""
+        import numpy as np
+        series = None
+        if hasattr(values, 'iloc'):
+            series = values
+            values = values.to_numpy()
+        values = np.asarray(values)
+        kind = values.dtype.kind
+        if kind == 'b':
+            values = values.astype(np.int64)
+            kind = 'i'
+
+        if kind in 'iuf':
+            present = values[~np.isnan(values)] if kind == 'f' else values
+            numbers = present[np.isfinite(present)] if kind == 'f' else present
+            hashes = present.astype(np.float64 if kind == 'f' else np.int64).view(np.uint64)
+            hashes = _mix_array(hashes)
+        elif kind in 'mM':
+            present = values[~np.isnat(values)]
+            numbers = None
+            hashes = _mix_array(present.view(np.int64).view(np.uint64))
+            if len(present):
+                lo, hi = present.min(), present.max()
+                if series is not None:
+                    import pandas as pd
+                    lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+                self._update_range(self._other, lo, hi)
+        elif 'pandas' in sys.modules:
+            import pandas as pd
+            series = pd.Series(values) if series is None else series
+            present = series[~(series.isnull() | (series == '')).to_numpy(dtype=bool)]
+            numeric = np.full(len(present), np.nan)
+            try:
+                # only convert the values which may be numbers
+                maybe = present.str.match(r'\s*[-+]?[0-9.]', na=True).to_numpy(dtype=bool)
+            except AttributeError:
+                maybe = np.ones(len(present), dtype=bool)
+            if maybe.any():
+                numeric[maybe] = pd.to_numeric(present[maybe], errors='coerce').astype(np.float64)
+            is_number = np.isfinite(numeric)
+            numbers = numeric[is_number]
+            present = present.to_numpy(dtype=object)
+            try:
+                hashes = pd.util.hash_array(present)
+            except TypeError:
+                hashes = pd.util.hash_array(present.astype(str).astype(object))
+            others = present[~is_number]
+            if len(others):
+                try:
+                    self._update_range(self._other, others.min(), others.max())
+                except TypeError:
+                    pass
+        else:
+            for value in values.tolist():
+                self.add(value)
+            return
+
+        self.missing += len(values) - len(present)
+        self.count += len(present)
+        self._hll.add_array(hashes)
+        if numbers is not None and len(numbers):
+            self._update_range(self._range, numbers.min().item(), numbers.max().item())
+            numbers = numbers.astype(np.float64)
+            mean = numbers.mean()
+            self._merge(len(numbers), float(mean), float(((numbers - mean) ** 2).sum()))
+
+
+class Stats(threading.Thread):
+    """Compute the ColumnStats of each column of model in the background.
+    Partial statistics are available while running."""
+
+    def __init__(self, model):
+        super(Stats, self).__init__()
+        self.daemon = True
+        self.model = model
+        self.columns = [ColumnStats() for _ in range(model.shape[1])]
+        self.rows = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def running(self):
+        return self.is_alive()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def column(self, x):
+        """Return a summary dict of column x"""
+        with self._lock:
+            stats = self.columns[x]
+            return {'count': stats.count, 'missing': stats.missing,
+                    'distinct': stats.distinct, 'min': stats.min, 'max': stats.max,
+                    'mean': stats.mean, 'std': stats.std}
+
+    def _scan(self, y0):
+        # each block is reduced apart, only merging the result under the lock
+        # so that column() does not wait for it
+        rows = self.model.shape[0]
+        if self.model.column_block(0, y0, min(rows, y0 + 1)) is not None:
+            y1 = min(rows, y0 + STATS_ROWS)
+            for x, stats in enumerate(self.columns):
+                block = ColumnStats()
+                block.add_values(self.model.column_block(x, y0, y1))
+                with self._lock:
+                    stats.merge(block)
+                if self._cancel.is_set():
+                    break
+            return y1
+
+        y1 = min(rows, y0 + STATS_ROW_BLOCK)
+        block = self.model.data_block(y0, y1, 0, len(self.columns))
+        vectorize = 'pandas' in sys.modules
+        if vectorize:
+            import numpy as np
+        for x, stats in enumerate(self.columns):
+            values = [row[x] for row in block]
+            reduced = ColumnStats()
+            if vectorize:
+                array = np.empty(len(values), dtype=object)
+                array[:] = values
+                reduced.add_values(array)
+            else:
+                for value in values:
+                    reduced.add(value)
+            with self._lock:
+                stats.merge(reduced)
+        return y1
+
+    def run(self):
+        try:
+            while not self._cancel.is_set() and self.columns:
+                if self.rows >= self.model.shape[0]:
+                    if not self.model.loading:
+                        break
+                    time.sleep(STATS_WAIT)
+                    continue
+                self.rows = self._scan(self.rows)
+        except Exception as e:
+            self.error = e
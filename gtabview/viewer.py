@@ -2,15 +2,37 @@
 from __future__ import print_function, unicode_literals, absolute_import, generators
 
 from .compat import *
+from . import profiling
+from .export import Export, EXPORT_ROWS
+from .formatting import get_as_str, format_block, FLOAT_PRECISION
+from .models import SortedExtDataModel, sort_order
+from .search import Query, Search, MODES
+from .stats import Stats
 from .qtpy import QtCore, QtGui, QtWidgets
 
-import math
+import heapq
+import io
+import re
+import threading
 import time
 import sys
+import warnings
+from collections import OrderedDict
 
 MAX_AUTOSIZE_MS = 150   # Milliseconds given (at most) to perform column auto-sizing
 MIN_TRUNC_CHARS = 8     # Minimum size (in characters) given to columns
 MAX_WIDTH_CHARS = 64    # Maximum size (in characters) given to columns
+LOAD_POLL_MS = 100      # Refresh interval (in milliseconds) of models still loading
+WINDOW_ROWS = 64        # Initial number of rows fetched around a cell
+WINDOW_COLS = 16        # Initial number of columns fetched around a cell
+TILE_ROWS = 64          # Rows (or header entries) in each tile of cached strings
+TILE_COLS = 16          # Columns in each tile of cached strings
+CACHE_BYTES = 32 << 20  # Memory budget (in bytes) for cached strings of each view
+CELL_BYTES = 64         # Estimated overhead (in bytes) of each cached string
+AUTOSIZE_ROWS = 512     # Rows sampled (evenly across each column) for auto-sizing
+AUTOSIZE_BLOCKS = 8     # Contiguous blocks the auto-sizing sample is split into
+AUTOSIZE_PERCENTILE = 99 # Percentile of the text lengths used for auto-sizing
+AUTOSIZE_MEASURE = 8    # Longest strings measured in pixels for auto-sizing
 
 
 # Clock source
@@ -20,58 +42,392 @@ except AttributeError:
     clock = time.clock
 
 
-# Support any missing value from Pandas efficiently
-def as_str_py(obj):
-    if obj is None: return ''
-    if isinstance(obj, float) and math.isnan(obj): return ''
-    return str(obj)
+class TileCache(object):
+    """LRU cache of tiles (blocks of formatted values), bounded by an
+    estimate of the memory they use"""
 
-def get_as_str():
-    if 'pandas' in sys.modules:
-        import pandas as pd
-        return lambda x: '' if pd.isnull(x) else str(x)
-    else:
-        return as_str_py
+    def __init__(self, limit=CACHE_BYTES):
+        self.limit = limit
+        self.size = 0
+        self._tiles = OrderedDict()
 
+    def __contains__(self, key):
+        return key in self._tiles
 
-class Data4ExtModel(QtCore.QAbstractTableModel):
-    def __init__(self, model):
-        super(Data4ExtModel, self).__init__()
+    def get(self, key):
+        tile = self._tiles.get(key)
+        if tile is None:
+            return None
+        self._tiles[key] = self._tiles.pop(key)
+        return tile[0]
+
+    def put(self, key, tile, size):
+        if key in self._tiles:
+            self.size -= self._tiles.pop(key)[1]
+        self._tiles[key] = (tile, size)
+        self.size += size
+        # always keep the last tile
+        while self.size > self.limit and len(self._tiles) > 1:
+            self.size -= self._tiles.popitem(last=False)[1][1]
+
+    def discard(self, match):
+        for key in [key for key in self._tiles if match(key)]:
+            self.size -= self._tiles.pop(key)[1]
+
+    def keys(self):
+        return list(self._tiles)
+
+    def clear(self):
+        self._tiles.clear()
+        self.size = 0
+
+
+def _span(pos, size, count, tile):
+    # range of tiles covering size elements around pos
+    return (max(0, pos - size) // tile, (min(count, pos + size + 1) - 1) // tile + 1)
+
+
+def _sample_spans(count, size, blocks=AUTOSIZE_BLOCKS):
+    # blocks of rows covering size elements spread evenly over count
+    if count <= size:
+        return [(0, count)]
+    step = size // blocks
+    last = count - step
+    return [(last * i // (blocks - 1), last * i // (blocks - 1) + step)
+            for i in range(blocks)]
+
+
+def _tile_span(start, end, tile):
+    # range of tiles covering [start, end)
+    return (start // tile, (end - 1) // tile + 1) if end > start else (0, 0)
+
+
+def _extend_order(order, rows):
+    # a sort order restricted to rows, with the rows added since last
+    if hasattr(order, 'dtype'):
+        import numpy as np
+        return np.concatenate([order[order < rows],
+                               np.arange(len(order), rows, dtype=order.dtype)])
+    return [y for y in order if y < rows] + list(range(len(order), rows))
+
+
+def _covers_spans(ranges):
+    # whether the inclusive (top, bottom, left, right) ranges cover all the
+    # cells at the intersection of their rows and columns
+    ys = sorted(set(y for r in ranges for y in (r[0], r[1] + 1)))
+    xs = sorted(set(x for r in ranges for x in (r[2], r[3] + 1)))
+    ys = dict((y, i) for i, y in enumerate(ys))
+    xs = dict((x, i) for i, x in enumerate(xs))
+    rows, cols, cells = set(), set(), set()
+    for top, bottom, left, right in ranges:
+        iy = range(ys[top], ys[bottom + 1])
+        ix = range(xs[left], xs[right + 1])
+        rows.update(iy)
+        cols.update(ix)
+        cells.update((y, x) for y in iy for x in ix)
+    return len(cells) == len(rows) * len(cols)
+
+
+def _merge_spans(spans):
+    # merge overlapping or adjacent inclusive (start, end) spans
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(span) for span in merged]
+
+
+class Shape4ExtModel(QtCore.QAbstractTableModel):
+    # Base for table models tracking the shape of a growing ExtDataModel
+    def __init__(self, model, cache=None):
+        super(Shape4ExtModel, self).__init__()
         self.model = model
-        self._as_str = get_as_str()
+        self._shape = self._model_shape()
+        self._generation = model.generation
+        self._window_size = (WINDOW_ROWS, WINDOW_COLS)
+        self._cache = TileCache() if cache is None else cache
+
+    def _model_shape(self):
+        return self.model.shape
+
+    def _invalidate(self, old):
+        pass
+
+    def _discard(self):
+        pass
+
+    def swapModel(self, model):
+        """Replace the model with another of the same shape (such as a sorted
+        view of it), keeping the state of the views"""
+        old = self.model
+        self.model = model
+        self._generation = model.generation
+        if self._model_shape() != self._shape:
+            # the model grew in the meantime
+            self.beginResetModel()
+            self._discard()
+            self._shape = self._model_shape()
+            self.endResetModel()
+            return
+        self.model = old
+        self.layoutAboutToBeChanged.emit()
+        self.model = model
+        self._discard()
+        self.layoutChanged.emit()
+
+    def update(self, model, rows, cols):
+        """Replace the model with an updated version of it, notifying the
+        views of the rows/columns added or removed and of the values which
+        changed within the visible [start, end) rows and cols. Other cached
+        values are dropped"""
+        self.model = model
+        self._generation = model.generation
+        old = self._shape
+        new = self._model_shape()
+        if not all(old) or not all(new):
+            # the views show a placeholder cell instead
+            self.beginResetModel()
+            self._discard()
+            self._shape = new
+            self.endResetModel()
+            return
+        parent = QtCore.QModelIndex()
+        if new[1] < old[1]:
+            self.beginRemoveColumns(parent, new[1], old[1] - 1)
+            self._shape = (old[0], new[1])
+            self.endRemoveColumns()
+        elif new[1] > old[1]:
+            self.beginInsertColumns(parent, old[1], new[1] - 1)
+            self._shape = (old[0], new[1])
+            self.endInsertColumns()
+        if new[0] < old[0]:
+            self.beginRemoveRows(parent, new[0], old[0] - 1)
+            self._shape = new
+            self.endRemoveRows()
+        elif new[0] > old[0]:
+            self.beginInsertRows(parent, old[0], new[0] - 1)
+            self._shape = new
+            self.endInsertRows()
+        self._refresh(rows, cols)
+
+    def _refresh(self, rows, cols):
+        pass
+
+    def setWindowSize(self, rows, cols):
+        """Set the number of rows/columns which are visible at once. Values
+        are fetched in blocks large enough to cover the visible area"""
+        self._window_size = (max(1, rows), max(1, cols))
 
     def rowCount(self, index=None):
-        return max(1, self.model.shape[0])
+        return max(1, self._shape[0])
 
     def columnCount(self, index=None):
-        return max(1, self.model.shape[1])
+        return max(1, self._shape[1])
+
+    def sync(self, model=None):
+        """Notify the views of rows/columns added to the model (or to model
+        replacing it, such as a longer sorted view), or reset them when its
+        data was replaced"""
+        if model is not None:
+            self.model = model
+        old = self._shape
+        new = self._model_shape()
+        if self.model.generation != self._generation:
+            self.beginResetModel()
+            self._discard()
+            self._shape = new
+            self._generation = self.model.generation
+            self.endResetModel()
+            return
+        if new == old:
+            return
+        self._invalidate(old)
+        if not old[0] or not old[1] or new[0] < old[0] or new[1] < old[1]:
+            self.beginResetModel()
+            self._shape = new
+            self.endResetModel()
+            return
+        if new[1] > old[1]:
+            self.beginInsertColumns(QtCore.QModelIndex(), old[1], new[1] - 1)
+            self._shape = (old[0], new[1])
+            self.endInsertColumns()
+        if new[0] > old[0]:
+            self.beginInsertRows(QtCore.QModelIndex(), old[0], new[0] - 1)
+            self._shape = new
+            self.endInsertRows()
+
+
+class Data4ExtModel(Shape4ExtModel):
+    def __init__(self, model, cache=None, precision=FLOAT_PRECISION):
+        super(Data4ExtModel, self).__init__(model, cache)
+        self._precision = precision
+        self._as_str = get_as_str(precision)
+
+    def setFloatPrecision(self, precision):
+        self._precision = precision
+        self._as_str = get_as_str(precision)
+        self._cache.discard(lambda key: key[0] == 'data')
+        self.dataChanged.emit(self.index(0, 0),
+                              self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+    def _invalidate(self, old):
+        # drop the tiles on the old boundary, which might have been clipped
+        ty, tx = old[0] // TILE_ROWS, old[1] // TILE_COLS
+        self._cache.discard(lambda key: key[0] == 'data' and (key[1] >= ty or key[2] >= tx))
+
+    def _discard(self):
+        self._cache.discard(lambda key: key[0] == 'data')
+
+    def _fetch(self, y, x):
+        # fetch the missing tiles covering the visible area around y, x
+        rows, cols = self._window_size
+        ty0, ty1 = _span(y, rows, self._shape[0], TILE_ROWS)
+        tx0, tx1 = _span(x, cols, self._shape[1], TILE_COLS)
+        missing = [(ty, tx) for ty in range(ty0, ty1) for tx in range(tx0, tx1)
+                   if ('data', ty, tx) not in self._cache]
+        ty0, ty1 = min(t[0] for t in missing), max(t[0] for t in missing) + 1
+        tx0, tx1 = min(t[1] for t in missing), max(t[1] for t in missing) + 1
+        y0, y1 = ty0 * TILE_ROWS, min(self._shape[0], ty1 * TILE_ROWS)
+        x0, x1 = tx0 * TILE_COLS, min(self._shape[1], tx1 * TILE_COLS)
+        block = format_block(self.model, y0, y1, x0, x1, self._as_str, self._precision)
+
+        # insert the requested tile last, so that it's never evicted
+        current = (y // TILE_ROWS, x // TILE_COLS)
+        missing.remove(current)
+        for ty, tx in missing + [current]:
+            r0, c0 = ty * TILE_ROWS - y0, tx * TILE_COLS - x0
+            self._put(ty, tx, [row[c0:c0 + TILE_COLS] for row in block[r0:r0 + TILE_ROWS]])
+
+    def _put(self, ty, tx, tile):
+        size = sum(sum(map(len, row)) + CELL_BYTES * len(row) for row in tile)
+        self._cache.put(('data', ty, tx), tile, size)
+
+    def _refresh(self, rows, cols):
+        # compare the visible tiles with the updated model
+        ty0, ty1 = _tile_span(rows[0], min(rows[1], self._shape[0]), TILE_ROWS)
+        tx0, tx1 = _tile_span(cols[0], min(cols[1], self._shape[1]), TILE_COLS)
+        visible = lambda key: ty0 <= key[1] < ty1 and tx0 <= key[2] < tx1
+        self._cache.discard(lambda key: key[0] == 'data' and not visible(key))
+        for key in self._cache.keys():
+            if key[0] != 'data':
+                continue
+            _, ty, tx = key
+            y0, y1 = ty * TILE_ROWS, min(self._shape[0], (ty + 1) * TILE_ROWS)
+            x0, x1 = tx * TILE_COLS, min(self._shape[1], (tx + 1) * TILE_COLS)
+            tile = format_block(self.model, y0, y1, x0, x1, self._as_str, self._precision)
+            if tile != self._cache.get(key):
+                self._put(ty, tx, tile)
+                self.dataChanged.emit(self.index(y0, x0), self.index(y1 - 1, x1 - 1))
+
+    def _text(self, y, x):
+        key = ('data', y // TILE_ROWS, x // TILE_COLS)
+        tile = self._cache.get(key)
+        if tile is None:
+            self._fetch(y, x)
+            tile = self._cache.get(key)
+        return tile[y % TILE_ROWS][x % TILE_COLS]
+
+    def columnText(self, col, y0, y1):
+        """Return the display strings of rows [y0, y1) of col"""
+        y1 = min(y1, self._shape[0])
+        if not 0 <= col < self._shape[1] or y0 >= y1:
+            return []
+        block = format_block(self.model, y0, y1, col, col + 1, self._as_str, self._precision)
+        return [row[0] for row in block]
 
     def data(self, index, role):
         if role != QtCore.Qt.DisplayRole:
             return None
-        if index.row() >= self.model.shape[0] or \
-           index.column() >= self.model.shape[1]:
+        if index.row() >= self._shape[0] or \
+           index.column() >= self._shape[1]:
             return None
-        return self._as_str(self.model.data(index.row(), index.column()))
+        return self._text(index.row(), index.column())
 
 
-class Header4ExtModel(QtCore.QAbstractTableModel):
-    def __init__(self, model, axis, palette):
-        super(Header4ExtModel, self).__init__()
-        self.model = model
+class Header4ExtModel(Shape4ExtModel):
+    def __init__(self, model, axis, palette, cache=None):
         self.axis = axis
+        super(Header4ExtModel, self).__init__(model, cache)
         self._palette = palette
-        if self.axis == 0:
-            self._shape = (self.model.header_shape[0], self.model.shape[1])
-        else:
-            self._shape = (self.model.shape[0], self.model.header_shape[1])
         self._as_str = get_as_str()
+        self.tooltip = None
 
-    def rowCount(self, index=None):
-        return max(1, self._shape[0])
-
-    def columnCount(self, index=None):
-        return max(1, self._shape[1])
+    def _model_shape(self):
+        if self.axis == 0:
+            return (self.model.header_shape[0], self.model.shape[1])
+        else:
+            return (self.model.shape[0], self.model.header_shape[1])
+
+    def _invalidate(self, old):
+        tx = old[not self.axis] // TILE_ROWS
+        self._cache.discard(lambda key: key[:2] == ('header', self.axis) and key[3] >= tx)
+
+    def _discard(self):
+        self._cache.discard(lambda key: key[:2] == ('header', self.axis))
+
+    def _fetch(self, x, level):
+        size = self._window_size[not self.axis]
+        count = self._shape[not self.axis]
+        tx0, tx1 = _span(x, size, count, TILE_ROWS)
+        missing = [tx for tx in range(tx0, tx1)
+                   if ('header', self.axis, level, tx) not in self._cache]
+        x0, x1 = missing[0] * TILE_ROWS, min(count, (missing[-1] + 1) * TILE_ROWS)
+        block = self._block(x0, x1, level)
+        current = x // TILE_ROWS
+        missing.remove(current)
+        for tx in missing + [current]:
+            c0 = tx * TILE_ROWS - x0
+            self._put(level, tx, block[c0:c0 + TILE_ROWS])
+
+    def _block(self, x0, x1, level):
+        # (group start, text) of the headers [x0, x1) at level
+        block = self.model.header_block(self.axis, x0, x1, level)
+        starts = self.model.header_starts(self.axis, x0, x1, level)
+        return [(start, self._as_str(v)) for start, v in zip(starts, block)]
+
+    def _put(self, level, tx, tile):
+        size = sum(len(t[1]) for t in tile) + CELL_BYTES * len(tile)
+        self._cache.put(('header', self.axis, level, tx), tile, size)
+
+    def _refresh(self, rows, cols):
+        # compare the visible tiles with the updated model
+        if self.axis == 1:
+            rows, cols = cols, rows
+        count = self._shape[not self.axis]
+        tx0, tx1 = _tile_span(cols[0], min(cols[1], count), TILE_ROWS)
+        visible = lambda key: rows[0] <= key[2] < rows[1] and tx0 <= key[3] < tx1
+        self._cache.discard(lambda key: key[:2] == ('header', self.axis) and not visible(key))
+        for key in self._cache.keys():
+            if key[:2] != ('header', self.axis):
+                continue
+            _, _, level, tx = key
+            x0, x1 = tx * TILE_ROWS, min(count, (tx + 1) * TILE_ROWS)
+            tile = self._block(x0, x1, level)
+            if tile != self._cache.get(key):
+                self._put(level, tx, tile)
+                if self.axis == 0:
+                    self.dataChanged.emit(self.index(level, x0), self.index(level, x1 - 1))
+                else:
+                    self.dataChanged.emit(self.index(x0, level), self.index(x1 - 1, level))
+
+    def _value(self, x, level):
+        # (group start, text) of the header at x, level
+        key = ('header', self.axis, level, x // TILE_ROWS)
+        tile = self._cache.get(key)
+        if tile is None:
+            self._fetch(x, level)
+            tile = self._cache.get(key)
+        return tile[x % TILE_ROWS]
+
+    def columnText(self, col, y0, y1):
+        y1 = min(y1, self._shape[0])
+        if not 0 <= col < self._shape[1] or y0 >= y1:
+            return []
+        if self.axis == 0:
+            return [self._value(col, level)[1] for level in range(y0, y1)]
+        return [self._as_str(v) for v in self.model.header_block(1, y0, y1, col)]
 
     def headerData(self, section, orientation, role):
         if role == QtCore.Qt.TextAlignmentRole:
@@ -79,9 +435,12 @@ class Header4ExtModel(QtCore.QAbstractTableModel):
                 return QtCore.Qt.AlignCenter | QtCore.Qt.AlignBottom
             else:
                 return QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter
+        orient_axis = 0 if orientation == QtCore.Qt.Horizontal else 1
+        if role == QtCore.Qt.ToolTipRole and self.tooltip is not None \
+           and self.axis == orient_axis == 0:
+            return self.tooltip(section)
         if role != QtCore.Qt.DisplayRole:
             return None
-        orient_axis = 0 if orientation == QtCore.Qt.Horizontal else 1
         return section if self.axis == orient_axis else \
             self.model.name(self.axis, section)
 
@@ -93,12 +452,12 @@ class Header4ExtModel(QtCore.QAbstractTableModel):
         row, col = (index.row(), index.column()) if self.axis == 0 \
             else (index.column(), index.row())
         if role == QtCore.Qt.BackgroundRole:
-            prev = self.model.header(self.axis, col - 1, row) if col else None
-            cur = self.model.header(self.axis, col, row)
-            return self._palette.midlight() if prev != cur else None
+            return self._palette.midlight() if self._value(col, row)[0] else None
+        if role == QtCore.Qt.ToolTipRole and self.tooltip is not None and self.axis == 0:
+            return self.tooltip(col)
         if role != QtCore.Qt.DisplayRole:
             return None
-        return self._as_str(self.model.header(self.axis, col, row))
+        return self._value(col, row)[1]
 
 
 class Level4ExtModel(QtCore.QAbstractTableModel):
@@ -129,6 +488,19 @@ class Level4ExtModel(QtCore.QAbstractTableModel):
         if role != QtCore.Qt.DisplayRole: return None
         return 'L' + str(section)
 
+    def columnText(self, col, y0, y1):
+        return [self.data(self.index(y, col), QtCore.Qt.DisplayRole) or ''
+                for y in range(y0, y1)]
+
+    def swapModel(self, model):
+        self.model = model
+
+    def update(self, model):
+        # the level names might have changed, but not their number
+        self.model = model
+        self.dataChanged.emit(self.index(0, 0),
+                              self.index(self.rowCount() - 1, self.columnCount() - 1))
+
     def data(self, index, role):
         if not index.isValid():
             return None
@@ -153,11 +525,30 @@ class Level4ExtModel(QtCore.QAbstractTableModel):
         return None
 
 
+class _SortJob(threading.Thread):
+    # computes the sort order of model in the background
+    def __init__(self, model, keys):
+        super(_SortJob, self).__init__()
+        self.daemon = True
+        self.model = model
+        self.keys = keys
+        self.order = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.order = sort_order(self.model, self.keys)
+        except Exception as e:
+            self.error = e
+
+
 class ExtTableView(QtWidgets.QWidget):
     def __init__(self):
         super(ExtTableView, self).__init__()
         self._selection_rec = False
         self._model = None
+        self._cache = TileCache()
+        self._precision = FLOAT_PRECISION
 
         # We manually set the inactive highlight color to differentiate the
         # selection between the data/index/header. To actually make use of the
@@ -231,38 +622,63 @@ class ExtTableView(QtWidgets.QWidget):
         # autosize columns on-demand
         self._autosized_cols = set()
         self._max_autosize_ms = None
+        self._glyphs = {}
         self.hscroll.sliderMoved.connect(self._resizeVisibleColumnsToContents)
+        self.hscroll.valueChanged.connect(self._update_window_size)
         self.table_data.installEventFilter(self)
 
+        # sort on header clicks
+        self._source = None
+        self._generation = 0
+        self._sort_keys = []
+        self._sort_order = None
+        self._sort_job = None
+        self._sort_timer = QtCore.QTimer(self)
+        self._sort_timer.setInterval(LOAD_POLL_MS)
+        self._sort_timer.timeout.connect(self._poll_sort)
+        self.table_header.horizontalHeader().sectionClicked.connect(self._sort_clicked)
+
+        # column statistics, computed on-demand
+        self._stats = None
+
         avg_width = self.fontMetrics().averageCharWidth()
         self.min_trunc = avg_width * MIN_TRUNC_CHARS
         self.max_width = avg_width * MAX_WIDTH_CHARS
 
 
-    def _select_columns(self, source, dest, deselect):
+    def _select_spans(self, source, dest, deselect, axis):
+        # propagate the rows (axis 0) or columns (axis 1) selected in source
+        # as merged ranges, independently of the number of selected cells
         if self._selection_rec: return
         self._selection_rec = True
-        dsm = dest.selectionModel()
-        ssm = source.selectionModel()
-        dsm.clear()
-        for col in (index.column() for index in ssm.selectedIndexes()):
-            dsm.select(dest.model().index(0, col),
-                       QtCore.QItemSelectionModel.Select | QtCore.QItemSelectionModel.Columns)
+        model = dest.model()
+        ranges = source.selectionModel().selection()
+        if axis == 0:
+            flags = QtCore.QItemSelectionModel.Rows
+            spans = _merge_spans((r.top(), r.bottom()) for r in ranges)
+            count = model.columnCount()
+            corners = [((a, 0), (b, count - 1)) for a, b in spans]
+        else:
+            flags = QtCore.QItemSelectionModel.Columns
+            spans = _merge_spans((r.left(), r.right()) for r in ranges)
+            count = model.rowCount()
+            corners = [((0, a), (count - 1, b)) for a, b in spans]
+        selection = QtCore.QItemSelection()
+        if count:
+            for top_left, bottom_right in corners:
+                selection.select(model.index(*top_left), model.index(*bottom_right))
+        dest.selectionModel().select(
+            selection, QtCore.QItemSelectionModel.ClearAndSelect | flags)
         deselect.selectionModel().clear()
         self._selection_rec = False
 
 
+    def _select_columns(self, source, dest, deselect):
+        self._select_spans(source, dest, deselect, 1)
+
+
     def _select_rows(self, source, dest, deselect):
-        if self._selection_rec: return
-        self._selection_rec = True
-        dsm = dest.selectionModel()
-        ssm = source.selectionModel()
-        dsm.clear()
-        for row in (index.row() for index in ssm.selectedIndexes()):
-            dsm.select(dest.model().index(row, 0),
-                       QtCore.QItemSelectionModel.Select | QtCore.QItemSelectionModel.Rows)
-        deselect.selectionModel().clear()
-        self._selection_rec = False
+        self._select_spans(source, dest, deselect, 0)
 
 
     def model(self):
@@ -310,6 +726,19 @@ class ExtTableView(QtWidgets.QWidget):
         self.table_index.setFixedWidth(idx_width)
         self.table_level.setFixedWidth(idx_width)
         self._resizeVisibleColumnsToContents()
+        self._update_window_size()
+
+    def _update_window_size(self):
+        if self._model is None:
+            return
+        view = self.table_data
+        rect = view.viewport().rect()
+        rows = rect.height() // max(1, view.verticalHeader().defaultSectionSize()) + 1
+        start = max(0, view.columnAt(0))
+        end = view.columnAt(rect.width() - 1)
+        end = view.model().columnCount() if end == -1 else end + 1
+        for table in [self.table_data, self.table_header, self.table_index]:
+            table.model().setWindowSize(rows, end - start)
 
 
     def _reset_model(self, table, model):
@@ -323,9 +752,28 @@ class ExtTableView(QtWidgets.QWidget):
         self._max_autosize_ms = limit_ms
 
 
+    def setCacheLimit(self, limit_bytes):
+        self._cache.limit = limit_bytes
+
+
+    def setFloatPrecision(self, precision):
+        """Set the digits shown after the decimal point (None for all)"""
+        self._precision = precision
+        if self._model is not None:
+            self.table_data.model().setFloatPrecision(precision)
+
+
+    @profiling.timed('ExtTableView.setModel')
     def setModel(self, model, relayout=True):
         self._model = model
-        self._reset_model(self.table_data, Data4ExtModel(model))
+        self._source = model
+        self._generation = model.generation
+        self._sort_keys = []
+        self._sort_order = None
+        self._sort_job = None
+        self.cancelStats()
+        self._cache.clear()
+        self._reset_model(self.table_data, Data4ExtModel(model, self._cache, self._precision))
         sel_model = self.table_data.selectionModel()
         sel_model.selectionChanged.connect(
             lambda *_: self._select_columns(self.table_data, self.table_header, self.table_level))
@@ -340,14 +788,15 @@ class ExtTableView(QtWidgets.QWidget):
         sel_model.selectionChanged.connect(
             lambda *_: self._select_rows(self.table_level, self.table_header, self.table_data))
 
-        self._reset_model(self.table_header, Header4ExtModel(model, 0, self.palette()))
+        self._reset_model(self.table_header, Header4ExtModel(model, 0, self.palette(), self._cache))
+        self.table_header.model().tooltip = self._stats_tooltip
         sel_model = self.table_header.selectionModel()
         sel_model.selectionChanged.connect(
             lambda *_: self._select_columns(self.table_header, self.table_data, self.table_index))
         sel_model.selectionChanged.connect(
             lambda *_: self._select_rows(self.table_header, self.table_level, self.table_index))
 
-        self._reset_model(self.table_index, Header4ExtModel(model, 1, self.palette()))
+        self._reset_model(self.table_index, Header4ExtModel(model, 1, self.palette(), self._cache))
         sel_model = self.table_index.selectionModel()
         sel_model.selectionChanged.connect(
             lambda *_: self._select_rows(self.table_index, self.table_data, self.table_header))
@@ -358,30 +807,267 @@ class ExtTableView(QtWidgets.QWidget):
         if relayout: self._update_layout()
 
 
+    def _swapModel(self, model):
+        self._model = model
+        for table in [self.table_data, self.table_header, self.table_index, self.table_level]:
+            table.model().swapModel(model)
+        self._update_layout()
+
+
+    def _visible_spans(self, table):
+        # [start, end) of the rows and columns shown by table
+        rect = table.viewport().rect()
+        model = table.model()
+        y1 = table.rowAt(rect.height() - 1)
+        x1 = table.columnAt(rect.width() - 1)
+        return ((max(0, table.rowAt(0)), model.rowCount() if y1 == -1 else y1 + 1),
+                (max(0, table.columnAt(0)), model.columnCount() if x1 == -1 else x1 + 1))
+
+
+    @profiling.timed('ExtTableView.updateModel')
+    def updateModel(self, model):
+        """Replace the model with an updated version of it (such as a
+        DataFrame after appending rows), keeping the selection, current
+        cell, scroll position and column widths. The views are only notified
+        of the added or removed rows/columns and of the visible values which
+        changed. Return False when the model was reset instead, as the
+        number of header levels differs"""
+        if self._model is None or model.header_shape != self._source.header_shape:
+            self.setModel(model)
+            return False
+        self.cancelStats()
+        self._source = model
+        self._generation = model.generation
+        keys = [key for key in self._sort_keys if key[0] < model.shape[1]]
+        if keys and self._sort_order is not None:
+            # keep the previous order until the rows are sorted again
+            self._sort_order = _extend_order(self._sort_order, model.shape[0])
+            model = SortedExtDataModel(model, self._sort_order)
+        self._model = model
+        for table in [self.table_data, self.table_header, self.table_index]:
+            table.model().update(model, *self._visible_spans(table))
+        self.table_level.model().update(model)
+        self._autosized_cols = set(x for x in self._autosized_cols if x < model.shape[1])
+        self._update_layout()
+        if self._sort_keys:
+            self.sortByColumns(keys)
+        return True
+
+
+    def sortKeys(self):
+        return list(self._sort_keys)
+
+
+    def sortByColumns(self, keys):
+        """Sort the rows by keys, a list of (column, ascending) pairs by
+        priority. The sort is performed in the background: the rows are
+        reordered when done. An empty list restores the original order"""
+        self._sort_keys = list(keys)
+        header = self.table_header.horizontalHeader()
+        header.setSortIndicatorShown(bool(keys))
+        if keys:
+            header.setSortIndicator(keys[0][0], QtCore.Qt.AscendingOrder if keys[0][1]
+                                    else QtCore.Qt.DescendingOrder)
+            self._sort_job = _SortJob(self._source, self._sort_keys)
+            self._sort_job.start()
+            if not self._sort_timer.isActive():
+                QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.BusyCursor)
+                self._sort_timer.start()
+        else:
+            self._sort_job = None
+            self._sort_order = None
+            if self._model is not self._source:
+                self._swapModel(self._source)
+
+
+    def _poll_sort(self):
+        job = self._sort_job
+        if job is not None and job.is_alive():
+            return
+        self._sort_timer.stop()
+        QtWidgets.QApplication.restoreOverrideCursor()
+        if job is None:
+            return
+        self._sort_job = None
+        if job.error is not None:
+            warnings.warn("cannot sort: {}".format(job.error), category=RuntimeWarning)
+            self.sortByColumns([])
+        else:
+            # rows added while sorting are shown last, and sorted next
+            rows = job.model.shape[0]
+            self._sort_order = _extend_order(job.order, rows)
+            self._swapModel(SortedExtDataModel(job.model, self._sort_order))
+            if len(job.order) < rows:
+                self.sortByColumns(self._sort_keys)
+
+
+    def _sort_clicked(self, col):
+        # click: sort by col (ascending, descending, then unsorted)
+        # shift/control+click: add col as a secondary key
+        keys = list(self._sort_keys)
+        order = dict(keys)
+        modifiers = QtWidgets.QApplication.keyboardModifiers()
+        if not modifiers & (QtCore.Qt.ShiftModifier | QtCore.Qt.ControlModifier):
+            keys = [key for key in keys if key[0] == col]
+        if col not in order:
+            keys.append((col, True))
+        elif order[col]:
+            keys = [(x, False if x == col else asc) for x, asc in keys]
+        else:
+            keys = [key for key in keys if key[0] != col]
+        self.sortByColumns(keys)
+
+
+    def columnStats(self, x):
+        """Return a dict of the statistics of column x, starting their
+        computation in the background when needed. The statistics are partial
+        until statsRunning() returns False"""
+        if self._stats is None:
+            self._stats = Stats(self._source)
+            self._stats.start()
+        return self._stats.column(x)
+
+
+    def statsRunning(self):
+        return self._stats is not None and self._stats.running
+
+
+    def cancelStats(self):
+        if self._stats is not None:
+            self._stats.cancel()
+            self._stats = None
+
+
+    def _stats_tooltip(self, x):
+        if not 0 <= x < self._source.shape[1]:
+            return None
+        stats = self.columnStats(x)
+        as_str = get_as_str(self._precision)
+        lines = ["count: {} ({} missing)".format(stats['count'], stats['missing']),
+                 "distinct: ~{}".format(stats['distinct'])]
+        for key in ['min', 'max']:
+            if stats[key] is not None:
+                lines.append("{}: {}".format(key, as_str(stats[key])))
+        for key in ['mean', 'std']:
+            if stats[key] is not None:
+                lines.append("{}: {:.6g}".format(key, stats[key]))
+        if self._stats.error is not None:
+            lines.append("(incomplete: {})".format(self._stats.error))
+        elif self._stats.running:
+            rows = float(max(1, self._source.shape[0]))
+            lines.append("(computing: {:.0%} of rows)".format(self._stats.rows / rows))
+        return '\n'.join(lines)
+
+
+    def syncModel(self):
+        """Update the views after the model has grown, or after its data was
+        replaced. While sorted, the rows added are shown last until sorted
+        again"""
+        source = self._source
+        if source is not None and source.generation != self._generation:
+            # the sort order and statistics are for the previous data
+            self._generation = source.generation
+            self.cancelStats()
+            if self._sort_keys:
+                self._sort_order = None
+                if self._model is not source:
+                    self._swapModel(source)
+                self.sortByColumns(self._sort_keys)
+        elif self._sort_order is not None and len(self._sort_order) < source.shape[0]:
+            self._sort_order = _extend_order(self._sort_order, source.shape[0])
+            self._model = SortedExtDataModel(source, self._sort_order)
+            self.table_level.model().swapModel(self._model)
+            if self._sort_job is None:
+                self.sortByColumns(self._sort_keys)
+        for table in [self.table_data, self.table_header, self.table_index]:
+            table.model().sync(self._model)
+        self._update_layout()
+
+
     def setCurrentIndex(self, y, x):
         self.table_data.selectionModel().setCurrentIndex(
             self.table_data.model().index(y, x),
             QtCore.QItemSelectionModel.ClearAndSelect)
 
+
+    def selectedSpans(self):
+        """Return the [start, end) spans of the selected rows and columns
+        (or of the current cell when nothing is selected). Raise ValueError
+        when the selection is not made of all the cells of these rows and
+        columns (such as two cells in different rows and columns)"""
+        selection = self.table_data.selectionModel().selection()
+        ranges = [(r.top(), r.bottom(), r.left(), r.right()) for r in selection]
+        if not _covers_spans(ranges):
+            raise ValueError("the selection is not rectangular")
+        rows = _merge_spans(r[:2] for r in ranges)
+        cols = _merge_spans(r[2:] for r in ranges)
+        if not rows:
+            index = self.table_data.currentIndex()
+            if not index.isValid():
+                return [], []
+            rows = [(index.row(), index.row())]
+            cols = [(index.column(), index.column())]
+        # the views always show at least one (empty) cell
+        shape = self._model.shape
+        rows = [(a, min(b + 1, shape[0])) for a, b in rows if a < shape[0]]
+        cols = [(a, min(b + 1, shape[1])) for a, b in cols if a < shape[1]]
+        if not rows or not cols:
+            return [], []
+        return rows, cols
+
+    def _glyphWidths(self, font):
+        # cached advance of each character, per font
+        key = font.key()
+        glyphs = self._glyphs.get(key)
+        if glyphs is None:
+            glyphs = self._glyphs[key] = {}
+        return glyphs
+
+    def _textWidth(self, table, strings):
+        # width of the cells holding strings, truncating outliers longer than
+        # twice the length percentile. Only the longest strings are measured
+        if not strings:
+            return 0
+        lengths = sorted(map(len, strings))
+        cutoff = lengths[min(len(lengths) - 1, len(lengths) * AUTOSIZE_PERCENTILE // 100)]
+        cutoff = min(lengths[-1], max(MIN_TRUNC_CHARS, cutoff * 2), MAX_WIDTH_CHARS * 4)
+        longest = heapq.nlargest(AUTOSIZE_MEASURE, set(s[:cutoff] for s in strings), key=len)
+
+        model = table.model()
+        font = model.data(model.index(0, 0), QtCore.Qt.FontRole) or table.font()
+        metrics = QtGui.QFontMetrics(font)
+        advance = getattr(metrics, 'horizontalAdvance', metrics.width)
+        glyphs = self._glyphWidths(font)
+        width = 0
+        for text in longest:
+            text_width = 0
+            for char in text:
+                char_width = glyphs.get(char)
+                if char_width is None:
+                    char_width = glyphs[char] = advance(char)
+                text_width += char_width
+            width = max(width, text_width)
+
+        # text margins of the delegate, measured on the first cell
+        index = model.index(0, 0)
+        text = model.data(index, QtCore.Qt.DisplayRole) or ''
+        margin = table.sizeHintForIndex(index).width() - advance(text)
+        return width + margin
+
     def _sizeHintForColumn(self, table, col, limit_ms=None):
-        # TODO: use current chunk boundaries, do not start from the beginning
-        max_row = table.model().rowCount()
+        # sample the column evenly, block by block, within limit_ms
+        model = table.model()
+        rows = model.rowCount()
+        if not model.model.random_access:
+            # only sample the head of streamed models
+            rows = min(rows, AUTOSIZE_ROWS)
         lm_start = clock()
-        lm_row = 64 if limit_ms else max_row
-        max_width = 0
-        for row in range(max_row):
-            v = table.sizeHintForIndex(table.model().index(row, col))
-            max_width = max(max_width, v.width())
-            if row > lm_row:
-                lm_now = clock()
-                lm_elapsed = (lm_now - lm_start) * 1000
-                if lm_elapsed >= limit_ms:
-                    break
-                if lm_elapsed < 1:
-                    lm_row = lm_row * 2
-                else:
-                    lm_row = int((row / lm_elapsed) * limit_ms)
-        return max_width
+        strings = []
+        for y0, y1 in _sample_spans(rows, AUTOSIZE_ROWS):
+            strings.extend(model.columnText(col, y0, y1))
+            if limit_ms is not None and (clock() - lm_start) * 1000 >= limit_ms:
+                break
+        return self._textWidth(table, strings)
 
     def _resizeColumnToContents(self, header, data, col, limit_ms):
         hdr_width = self._sizeHintForColumn(header, col, limit_ms)
@@ -406,6 +1092,7 @@ class ExtTableView(QtWidgets.QWidget):
     def eventFilter(self, obj, event):
         if obj == self.table_data and event.type() == QtCore.QEvent.Resize:
             self._resizeVisibleColumnsToContents()
+            self._update_window_size()
         return False
 
     def _resizeVisibleColumnsToContents(self):
@@ -438,12 +1125,32 @@ class ExtTableView(QtWidgets.QWidget):
             self._resizeVisibleColumnsToContents()
             self.table_data.scrollTo(new_index)
 
+    @profiling.timed('ExtTableView.resizeColumnsToContents')
     def resizeColumnsToContents(self):
         self._autosized_cols = set()
         self._resizeColumnsToContents(self.table_level, self.table_index, self._max_autosize_ms)
         self._update_layout()
 
 
+class FindBar(QtWidgets.QToolBar):
+    def __init__(self):
+        super(FindBar, self).__init__("Find")
+        self.setMovable(False)
+        self.addWidget(QtWidgets.QLabel("Find: "))
+        self.text = QtWidgets.QLineEdit()
+        self.addWidget(self.text)
+        self.mode = QtWidgets.QComboBox()
+        self.mode.addItems([mode.capitalize() for mode in MODES])
+        self.addWidget(self.mode)
+        self.case = QtWidgets.QCheckBox("Match case")
+        self.addWidget(self.case)
+        self.selected = QtWidgets.QCheckBox("Selected columns")
+        self.addWidget(self.selected)
+        self.status = QtWidgets.QLabel()
+        self.status.setContentsMargins(8, 0, 8, 0)
+        self.addWidget(self.status)
+
+
 class Viewer(QtWidgets.QMainWindow):
     def __init__(self, *args, **kwargs):
         super(Viewer, self).__init__()
@@ -451,26 +1158,320 @@ class Viewer(QtWidgets.QMainWindow):
         self.setCentralWidget(self.table)
         self.closed = False
         self.table.setAutosizeLimit(MAX_AUTOSIZE_MS)
+        self._metavar = None
+        self._title = None
+        self._follow = False
+        self._load_timer = QtCore.QTimer(self)
+        self._load_timer.setInterval(LOAD_POLL_MS)
+        self._load_timer.timeout.connect(self._poll_loading)
+        self._paint_stage = False
+
+        # incremental find
+        self._search = None
+        self._search_origin = None
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setInterval(LOAD_POLL_MS)
+        self._search_timer.timeout.connect(self._poll_search)
+        self.find_bar = FindBar()
+        self.find_bar.hide()
+        self.addToolBar(QtCore.Qt.BottomToolBarArea, self.find_bar)
+        self.find_bar.text.textChanged.connect(self._find_changed)
+        self.find_bar.text.returnPressed.connect(self.findNext)
+        self.find_bar.mode.currentIndexChanged.connect(self._find_changed)
+        self.find_bar.case.toggled.connect(self._find_changed)
+        self.find_bar.selected.toggled.connect(self._find_changed)
+        QtWidgets.QShortcut(QtGui.QKeySequence.Find, self, self.showFind)
+        QtWidgets.QShortcut(QtGui.QKeySequence.FindNext, self, self.findNext)
+        QtWidgets.QShortcut(QtGui.QKeySequence.FindPrevious, self,
+                            lambda: self.findNext(backward=True))
+        shortcut = QtWidgets.QShortcut(QtGui.QKeySequence(QtCore.Qt.Key_Escape),
+                                       self.find_bar, self.hideFind)
+        shortcut.setContext(QtCore.Qt.WidgetWithChildrenShortcut)
+
+        # copy and export
+        self._export = None
+        self._export_progress = None
+        self._export_timer = QtCore.QTimer(self)
+        self._export_timer.setInterval(LOAD_POLL_MS)
+        self._export_timer.timeout.connect(self._poll_export)
+        QtWidgets.QShortcut(QtGui.QKeySequence.Copy, self, self.copy)
+        QtWidgets.QShortcut(QtGui.QKeySequence.Save, self, self.exportDialog)
+        QtWidgets.QShortcut(QtGui.QKeySequence.SaveAs, self,
+                            lambda: self.exportDialog(selection=True))
+
         if args or kwargs:
             self.view(*args, **kwargs)
 
     def closeEvent(self, event):
         self.closed = True
+        self._load_timer.stop()
+        if self.table.model() is not None:
+            self.table.model().stop()
+        self.find(None)
+        self.cancelExport()
+        self.table.cancelStats()
+        profiling.finish()
         super(Viewer, self).closeEvent(event)
 
+    def _update_title(self):
+        model = self.table.model()
+        shape = model.shape
+        if self._title is not None:
+            title = self._title
+        else:
+            title = "{} rows, {} columns".format(shape[0], shape[1])
+            if self._metavar:
+                title = "{}: {}".format(self._metavar, title)
+        if model.loading:
+            state = "following" if self._follow else "loading"
+            title = "{} ({}: {} rows)".format(title, state, shape[0])
+        elif getattr(model, 'error', None) is not None:
+            title = "{} (incomplete: {})".format(title, model.error)
+        self.setWindowTitle(title)
+
+    def _poll_loading(self):
+        model = self.table.model()
+        if not model.loading:
+            self._load_timer.stop()
+        # when following, keep showing the last rows unless scrolled away
+        vscroll = self.table.vscroll
+        bottom = self._follow and vscroll.value() == vscroll.maximum()
+        self.table.syncModel()
+        if bottom:
+            self.table.table_data.scrollToBottom()
+        self._update_title()
+
+    def showFind(self):
+        self.find_bar.show()
+        self.find_bar.text.setFocus()
+        self.find_bar.text.selectAll()
+
+    def hideFind(self):
+        self.find_bar.hide()
+        self.table.setFocus()
+
+    def _find_changed(self):
+        bar = self.find_bar
+        columns = None
+        if bar.selected.isChecked():
+            columns = set()
+            for sel in self.table.table_data.selectionModel().selection():
+                columns.update(range(sel.left(), sel.right() + 1))
+        self.find(bar.text.text(), MODES[bar.mode.currentIndex()],
+                  columns=columns, case=bar.case.isChecked())
+
+    def find(self, text, mode='text', columns=None, case=False):
+        """Search text in the background (cancelling the previous search),
+        moving to the first match from the current cell. mode is one of
+        'text', 'regex' or 'number'. Restrict the search to the columns
+        indices when given"""
+        if self._search is not None:
+            self._search.cancel()
+            self._search = None
+        self._search_timer.stop()
+        self.find_bar.status.clear()
+        if not text:
+            return
+        try:
+            query = Query(text, mode, case, self.table._precision)
+        except (ValueError, re.error):
+            self.find_bar.status.setText("Invalid {}".format(mode))
+            return
+        index = self.table.table_data.currentIndex()
+        self._search_origin = (max(0, index.row()), max(0, index.column()))
+        self._search = Search(self.table.model(), query, columns)
+        self._search.start()
+        self._search_timer.start()
+
+    def _restart_search(self):
+        search = self._search
+        if search is not None:
+            self.find(search.query.text, search.query.mode,
+                      search.columns, search.query.case)
+
+    def findNext(self, backward=False):
+        """Move to the next (or previous) match of the current search"""
+        search = self._search
+        if search is None:
+            return
+        if search.model is not self.table.model():
+            self._restart_search()
+            return
+        index = self.table.table_data.currentIndex()
+        pos = search.matches.next(max(0, index.row()), max(0, index.column()), backward)
+        if pos is not None:
+            self._search_origin = None
+            self.table.setCurrentIndex(*pos)
+
+    def _poll_search(self):
+        search = self._search
+        if search is None:
+            self._search_timer.stop()
+            return
+        running = search.running
+        if self._search_origin is not None:
+            # move to the first match following the starting cell
+            y, x = self._search_origin
+            pos = search.matches.next(y, x - 1)
+            if pos is not None and (pos >= self._search_origin or not running):
+                self._search_origin = None
+                self.table.setCurrentIndex(*pos)
+        count = len(search.matches)
+        status = "{} match{}".format(count, '' if count == 1 else 'es')
+        if search.error is not None:
+            status = "{} (error: {})".format(status, search.error)
+        elif running:
+            rows = search.model.shape[0]
+            status = "{} ({:.0%} searched)".format(status, float(search.rows) / max(1, rows))
+        self.find_bar.status.setText(status)
+        if not running:
+            self._search_timer.stop()
+
+    def copy(self):
+        """Copy the selection to the clipboard as TSV, with headers. Large
+        selections are formatted in the background"""
+        try:
+            rows, columns = self.table.selectedSpans()
+        except ValueError as e:
+            self._warn("Cannot copy", e)
+            return
+        if not rows:
+            return
+        self._start_export(io.StringIO(), 'tsv', rows, columns)
+
+    def export(self, path, fmt=None, selection=False):
+        """Export the view (or the selection) to path in the background, as
+        'csv', 'tsv' or 'parquet' (from the extension by default)"""
+        rows = columns = None
+        if selection:
+            try:
+                rows, columns = self.table.selectedSpans()
+            except ValueError as e:
+                self._warn("Cannot export", e)
+                return
+            if not rows:
+                return
+        self._start_export(path, fmt, rows, columns)
+
+    def _warn(self, title, message):
+        # shown without blocking the caller
+        box = QtWidgets.QMessageBox(QtWidgets.QMessageBox.Warning, title,
+                                    "{}.".format(message).capitalize(), parent=self)
+        box.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        box.open()
+
+    def exportDialog(self, selection=False):
+        if selection:
+            try:
+                self.table.selectedSpans()
+            except ValueError as e:
+                self._warn("Cannot export", e)
+                return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export selection" if selection else "Export",
+            filter="CSV (*.csv);;TSV (*.tsv);;Parquet (*.parquet)")
+        if path:
+            self.export(path, selection=selection)
+
+    def _start_export(self, output, fmt, rows, columns):
+        self.cancelExport()
+        export = Export(self.table.model(), output, fmt, rows, columns,
+                        precision=self.table._precision)
+        self._export = export
+        if export.total <= EXPORT_ROWS:
+            # small exports are done at once
+            export.run()
+            self._export_done()
+            return
+        progress = QtWidgets.QProgressDialog(
+            "Copying..." if isinstance(output, io.StringIO) else "Exporting...",
+            "Cancel", 0, export.total, self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.canceled.connect(self.cancelExport)
+        self._export_progress = progress
+        export.start()
+        self._export_timer.start()
+
+    def cancelExport(self):
+        export = self._export
+        if export is not None:
+            export.cancel()
+            self._export_done()
+
+    def _poll_export(self):
+        export = self._export
+        if export is None:
+            self._export_timer.stop()
+        elif export.running:
+            if self._export_progress is not None:
+                self._export_progress.setValue(export.rows)
+        else:
+            self._export_done()
+
+    def _export_done(self):
+        export = self._export
+        self._export = None
+        self._export_timer.stop()
+        if self._export_progress is not None:
+            self._export_progress.canceled.disconnect(self.cancelExport)
+            self._export_progress.close()
+            self._export_progress = None
+        if export.running or export.cancelled:
+            return
+        if export.error is not None:
+            QtWidgets.QMessageBox.warning(self, "Export failed", str(export.error))
+        elif isinstance(export.output, io.StringIO):
+            QtWidgets.QApplication.clipboard().setText(export.output.getvalue())
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint and self._paint_stage is None:
+            # time the first paint, then emit the profile
+            obj.removeEventFilter(self)
+            self._paint_stage = profiling.stage('Viewer.paint')
+            self._paint_stage.__enter__()
+            QtCore.QTimer.singleShot(0, self._painted)
+        return super(Viewer, self).eventFilter(obj, event)
+
+    def _painted(self):
+        self._paint_stage.__exit__(None, None, None)
+        profiling.finish()
+
+    @profiling.timed('Viewer.updateModel')
+    def updateModel(self, model):
+        """Show an updated version of the current model, keeping the state of
+        the view (see ExtTableView.updateModel)"""
+        old_model = self.table.model()
+        if old_model is not None and old_model is not model:
+            old_model.stop()
+        if not self.table.updateModel(model):
+            self.table.resizeColumnsToContents()
+        self._restart_search()
+        self._update_title()
+        if model.loading:
+            self._load_timer.start()
+        else:
+            self._load_timer.stop()
+
+    @profiling.timed('Viewer.view')
     def view(self, model, hdr_rows=None, idx_cols=None, start_pos=None,
-             metavar=None, title=None, relayout=True):
+             metavar=None, title=None, relayout=True, precision=None, follow=False):
         old_model = self.table.model()
+        if old_model is not None and old_model is not model:
+            old_model.stop()
+        self.table.setFloatPrecision(FLOAT_PRECISION if precision is None else precision)
         self.table.setModel(model, relayout=False)
+        self._restart_search()
         shape = model.shape
 
-        if title is not None:
-            self.setWindowTitle(title)
+        self._metavar = metavar
+        self._title = title
+        self._follow = follow
+        self._update_title()
+        if model.loading:
+            self._load_timer.start()
         else:
-            title = "{} rows, {} columns".format(shape[0], shape[1])
-            if metavar:
-                title = "{}: {}".format(metavar, title)
-            self.setWindowTitle(title)
+            self._load_timer.stop()
 
         if relayout or old_model is None:
             self.table.resizeColumnsToContents()
@@ -484,3 +1485,6 @@ class Viewer(QtWidgets.QMainWindow):
         self.showNormal()
         self.setWindowState(QtCore.Qt.WindowActive)
         self.closed = False
+        if profiling.active():
+            self._paint_stage = None
+            self.table.table_data.viewport().installEventFilter(self)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Notification of changes to a file, used to follow growing files
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+from .compat import *
+
+import os
+import select
+import struct
+import sys
+import time
+
+POLL_INTERVAL = 0.5     # Seconds between checks of a file without inotify
+
+# inotify(7) events of a directory entry being written, replaced or removed
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | \
+    _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+def _inotify(path):
+    # non-blocking inotify descriptor watching the directory path, or None
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, path.encode(sys.getfilesystemencoding()), _IN_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class Watcher(object):
+    """Wait for changes to a file, including its replacement by another file
+    of the same name (as when rotated). The directory of the file is watched
+    with inotify when available, falling back to polling every interval"""
+
+    def __init__(self, path, interval=None):
+        self.path = os.path.abspath(path)
+        self.interval = POLL_INTERVAL if interval is None else interval
+        self._name = os.path.basename(self.path).encode(sys.getfilesystemencoding())
+        self._fd = _inotify(os.path.dirname(self.path))
+
+    @property
+    def notified(self):
+        """Whether changes are notified (instead of being polled)"""
+        return self._fd is not None
+
+    def _changed(self):
+        # whether any pending event concerns the file
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except OSError:
+                return changed
+            if not data:
+                return changed
+            pos = 0
+            while pos < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = data[pos:pos + length].rstrip(b'\0')
+                pos += length
+                changed |= name == self._name
+
+    def wait(self, timeout=None):
+        """Wait until the file might have changed, for at most timeout
+        seconds (by default, the polling interval). Return True when a change
+        was notified"""
+        timeout = self.interval if timeout is None else timeout
+        if self._fd is None:
+            time.sleep(timeout)
+            return False
+        end = time.time() + timeout
+        while True:
+            remaining = end - time.time()
+            if remaining <= 0:
+                return False
+            if select.select([self._fd], [], [], remaining)[0] and self._changed():
+                return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
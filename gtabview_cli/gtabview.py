@@ -5,9 +5,12 @@ from __future__ import print_function, unicode_literals, absolute_import
 import os
 import sys
 import argparse
+import threading
 
 from . import __version__
 
+APP = None
+
 
 def arg_parse():
     parser = argparse.ArgumentParser(description="View a tab-delimited file "
@@ -31,6 +34,15 @@ def arg_parse():
                         help="Set the sheet index to read (defaults to 0)")
     parser.add_argument('--transpose', '-T', action='store_true',
                         help="Transpose the dataset.")
+    parser.add_argument('--follow', '-f', action='store_true',
+                        help="Keep reading the lines appended to the file, "
+                        "like 'tail -f'.")
+    parser.add_argument('--profile', nargs='?', const=True, default=None,
+                        metavar='PATH', help="Report the time spent loading "
+                        "the data as JSON, to PATH or the standard error.")
+    parser.add_argument('--profile-trace', metavar='PATH',
+                        help="Also write the loading profile as a Chrome "
+                        "trace to PATH (implies --profile).")
     parser.add_argument('--start_pos', '-s',
                         help="Initial cursor display position. "
                         "Single number for just y (row) position, or two "
@@ -76,6 +88,32 @@ def fixup_stdin():
     return data
 
 
+def read_parallel(data, args):
+    """Read data while Qt is initialized, returning the model"""
+    global APP
+    from gtabview.dataio import read_model
+    result = []
+    def read():
+        try:
+            result.append(read_model(data, enc=args.encoding, delimiter=args.delimiter,
+                                     hdr_rows=args.header, idx_cols=args.index,
+                                     sheet_index=args.sheet, transpose=args.transpose,
+                                     background=True, follow=args.follow))
+        except Exception as e:
+            result.append(e)
+    reader = threading.Thread(target=read)
+    reader.daemon = True
+    reader.start()
+
+    from gtabview.qtpy import QtWidgets
+    if QtWidgets.QApplication.instance() is None:
+        APP = QtWidgets.QApplication(sys.argv[:1])
+    reader.join()
+    if isinstance(result[0], Exception):
+        raise result[0]
+    return result[0]
+
+
 def main():
     args, extra = arg_parse()
     pos_plus = [i for i in extra if i.startswith('+')]
@@ -86,11 +124,16 @@ def main():
         args.filename = "<stdin>"
         data = fixup_stdin()
 
-    from gtabview import view
+    from gtabview import view, profiling
+    if args.profile_trace:
+        profiling.TRACE = args.profile_trace
+        if args.profile is None:
+            args.profile = True
+    profiling.start(args.profile)
     try:
-        view(data, enc=args.encoding, start_pos=start_pos, delimiter=args.delimiter,
-             hdr_rows=args.header, idx_cols=args.index, sheet_index=args.sheet,
-             transpose=args.transpose, metavar=args.filename)
+        model = read_parallel(data, args)
+        view(model, start_pos=start_pos, metavar=args.filename, profile=args.profile,
+             follow=args.follow)
     except KeyboardInterrupt:
         return 0
     except IOError as e:
@@ -41,3 +41,20 @@ def materialize_header(model, axis):
 def materialize_names(model, axis):
     shape = model.header_shape
     return [model.name(axis, x) for x in range(shape[axis])]
+
+def materialize_blocks(model, size=2):
+    shape = model.shape
+    data = [[] for y in range(shape[0])]
+    for y in range(0, shape[0], size):
+        for x in range(0, shape[1], size):
+            block = model.data_block(y, min(shape[0], y + size), x, min(shape[1], x + size))
+            for i, row in enumerate(block):
+                data[y + i].extend(row)
+    return data
+
+def materialize_header_blocks(model, axis, size=2):
+    shape = model.shape
+    header_shape = model.header_shape
+    return [sum([model.header_block(axis, x, min(shape[not axis], x + size), level)
+                 for x in range(0, shape[not axis], size)], [])
+            for level in range(header_shape[axis])]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview import profiling
+from gtabview.dataio import read_model
+import gtabview.columns
+import tempfile
+
+
+@require('numpy')
+def test_coded_column():
+    from gtabview.columns import CodedColumn, TextColumn, concat_text, text_column
+    strings = ['ok', 'err', 'ok', '', 'ok', 'été'] * 2
+    column = text_column(strings)
+    assert(isinstance(column, CodedColumn) and column.categories == ['ok', 'err', '', 'été'])
+    assert([column[y] for y in range(len(column))] == strings)
+    assert(column.slice(1, 4) == strings[1:4] and column.take([11, 0]) == ['été', 'ok'])
+    assert(column.array(0, 2).tolist() == strings[:2])
+    assert(column.text_nbytes == TextColumn.from_strings(strings).nbytes)
+
+    # unique values are not encoded
+    unique = ['v{}'.format(y) for y in range(100)]
+    assert(isinstance(text_column(unique), TextColumn))
+
+    # dictionaries are merged, spilling to plain strings above DICT_SIZE
+    merged = concat_text([column, text_column(['err', 'new', 'new', 'new'])])
+    assert(isinstance(merged, CodedColumn) and len(merged.categories) == 5)
+    assert(merged.slice(0, len(merged)) == strings + ['err', 'new', 'new', 'new'])
+    old_size = gtabview.columns.DICT_SIZE
+    gtabview.columns.DICT_SIZE = 4
+    try:
+        merged = concat_text([column, text_column(['err', 'new', 'new', 'new'])])
+        assert(isinstance(merged, TextColumn))
+        assert(merged.slice(0, len(merged)) == strings + ['err', 'new', 'new', 'new'])
+    finally:
+        gtabview.columns.DICT_SIZE = old_size
+
+
+@require('numpy')
+def test_coded_csv():
+    lines = ['id,status,host'] + ['{},{},h{}'.format(y, ['ok', 'err'][y % 7 == 0], y % 3)
+                                  for y in range(1000)]
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write('\n'.join(lines).encode('utf-8'))
+    try:
+        report_path = tempfile.mktemp(suffix='.json')
+        profiling.start(report=report_path)
+        model = read_model(fd.name, lazy=False, idx_cols=1)
+        report = profiling.finish()
+        os.unlink(report_path)
+        expected = read_model(fd.name, lazy=False, idx_cols=1, typed=False)
+        assert(materialize(model) == materialize(expected))
+        assert(model.header(1, 7, 0) == '7' and model.data(7, 0) == 'err')
+        assert(model.column_block(1, 2, 4).tolist() == ['h2', 'h0'])
+        usage = model.memory_usage()
+        assert(len(usage) == 3 and usage[0] == 8000 and usage[1] < 2000)
+
+        stage = [stage for stage in report['stages'] if stage['name'] == 'encode_strings'][0]
+        args = stage['args']
+        assert(args['columns'] == args['encoded'] == 2)
+        assert(args['encoded_bytes'] == sum(usage[1:]) < args['text_bytes'])
+    finally:
+        os.unlink(fd.name)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview import compressed
+import io
+import random
+import tempfile
+
+
+def _members(data, compress):
+    # two members/streams/frames, followed by some padding
+    half = len(data) // 2
+    return compress(data[:half]) + compress(data[half:]) + b'\0' * 16
+
+def _formats():
+    import bz2
+    import gzip
+    import lzma
+    return [('gzip', gzip.compress), ('bz2', bz2.compress), ('xz', lzma.compress)]
+
+
+def test_open_stream():
+    data = b''.join(b'%d,%d\n' % (i, i * i) for i in range(1000))
+    for fmt, compress in _formats():
+        packed = _members(data, compress)
+        assert(compressed.detect(packed) == fmt)
+        assert(compressed.open_stream(io.BufferedReader(io.BytesIO(packed))).read() == data)
+    fd = io.BufferedReader(io.BytesIO(data))
+    assert(compressed.open_stream(fd) is fd)
+
+def _check_seekable(formats):
+    saved = compressed.BLOCK_BYTES, compressed.CHECKPOINT_BYTES, compressed.READ_BYTES
+    compressed.BLOCK_BYTES, compressed.CHECKPOINT_BYTES, compressed.READ_BYTES = 1000, 4000, 500
+    rnd = random.Random(0)
+    data = b''.join(b'%d,%d\n' % (i, rnd.randrange(1 << 30)) for i in range(5000))
+    fd = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        for fmt, compress in formats:
+            fd.seek(0)
+            fd.truncate()
+            fd.write(_members(data, compress))
+            fd.flush()
+            buf = compressed.SeekableBuffer(fd.name, fmt)
+            assert(buf.fill(100) >= 100 and not buf.complete)
+            assert(buf[10:90] == data[10:90])
+            assert(buf.fill() == len(data) and buf.complete)
+            if fmt == 'gzip':
+                # decompressor states are recorded within members
+                assert(len(buf._checkpoints) > 3)
+            buf._blocks.clear()
+            for _ in range(100):
+                start = rnd.randrange(len(data))
+                stop = start + rnd.randrange(3000)
+                assert(buf[start:stop] == data[start:stop])
+    finally:
+        compressed.BLOCK_BYTES, compressed.CHECKPOINT_BYTES, compressed.READ_BYTES = saved
+        fd.close()
+        os.unlink(fd.name)
+
+def test_seekable_buffer():
+    _check_seekable(_formats())
+
+@require('zstandard')
+def test_zstd():
+    import zstandard
+    compress = zstandard.ZstdCompressor().compress
+    data = b''.join(b'%d,%d\n' % (i, i * i) for i in range(1000))
+    packed = _members(data, compress)
+    assert(compressed.detect(packed) == 'zstd')
+    assert(compressed.open_stream(io.BufferedReader(io.BytesIO(packed))).read() == data)
+    _check_seekable([('zstd', compress)])
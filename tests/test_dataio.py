@@ -2,7 +2,8 @@
 from __future__ import print_function, unicode_literals, absolute_import
 
 from . import *
-from gtabview.dataio import read_table
+from gtabview.dataio import read_model, read_table
+from gtabview.models import as_model
 
 
 def test_skip_empty_line_1():
@@ -25,3 +26,427 @@ def test_xls_fallback():
 def test_xls_read():
     data, _ = read_table(os.path.join(TDATA_ROOT, 'simple.xls'), None, None, 1)
     assert(data == [['a', 'b', 'c'], [1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    try:
+        read_table(os.path.join(TDATA_ROOT, 'simple.xls'), None, None, 1, sheet_index=1)
+        assert(False)
+    except IndexError:
+        pass
+
+def test_lazy_csv():
+    for name in ['empty-line-1.txt', 'empty-line-2.txt', 'hash-headers.txt', 'simple.csv']:
+        path = os.path.join(TDATA_ROOT, name)
+        data, hdr_rows = read_table(path, None, None, None)
+        model = read_model(path, lazy=True)
+        expected = as_model(data, hdr_rows=hdr_rows)
+        assert(model.shape == expected.shape)
+        assert(materialize(model) == materialize(expected))
+        assert(materialize_header(model, 0) == materialize_header(expected, 0))
+
+def test_lazy_csv_quoted_newlines():
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write(b'a,b\n"1\n2",3\r\n"""\n",4\n')
+    try:
+        model = read_model(fd.name, lazy=True)
+        assert(materialize_header(model, 0) == [['a', 'b']])
+        assert(materialize(model) == [['1\n2', '3'], ['"\n', '4']])
+    finally:
+        os.unlink(fd.name)
+
+def test_lazy_csv_close():
+    import gtabview.dataio
+    import gzip
+    import tempfile
+    text = 'a,b\n' + ''.join('{},{}\n'.format(y, y) for y in range(1000))
+    paths = []
+    for suffix, write in [('.csv', open), ('.csv.gz', gzip.open)]:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as fd:
+            paths.append(fd.name)
+        with write(fd.name, 'wb') as fd:
+            fd.write(text.encode('utf-8'))
+    old_cache = gtabview.dataio.FORMAT_CACHE
+    gtabview.dataio.FORMAT_CACHE = 1
+    try:
+        model = read_model(paths[0], lazy=True, background=True)
+        buf = model._data._buf
+        model.close()
+        assert(buf.closed and not model.loading)
+        # compressed buffers are kept open while their index is cached
+        model = read_model(paths[1], lazy=True)
+        assert(model.shape == (1000, 2) and model.data(999, 1) == '999')
+        buf = model._data._buf
+        model.close()
+        assert(not buf._fd.closed)
+        gtabview.dataio._indexes.clear()
+        model = read_model(paths[1], lazy=True)
+        gtabview.dataio._indexes.clear()
+        model.close()
+        assert(model._data._buf._fd.closed)
+        # only the most recent formats are kept
+        assert(len(gtabview.dataio._formats) == 1)
+    finally:
+        gtabview.dataio.FORMAT_CACHE = old_cache
+        for path in paths:
+            os.unlink(path)
+
+@require('numpy')
+def test_split_lines():
+    from gtabview.dataio import _split_lines
+    buf = b'a,b\n"1\n2",3\n"x\n\ny",4\n5,6\n'
+    bounds = _split_lines(buf, len(buf), 8)
+    assert(bounds == [0, 4, 12, 21, 25])
+    assert(_split_lines(buf, len(buf), 2) == [0, 12, 25])
+
+@require('numpy')
+def test_parallel_csv():
+    import gtabview.dataio
+    import io
+    import tempfile
+    text = 'a,b,c\n' + ''.join('{},"x\n{}",{}\n'.format(y, y, ',' * (y % 3)) for y in range(1000))
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write(text.encode('utf-8'))
+    old_chunk = gtabview.dataio.PARALLEL_CHUNK
+    gtabview.dataio.PARALLEL_CHUNK = 997
+    try:
+        for typed in [False, True]:
+            expected = read_model(fd.name, lazy=False, parallel=False, typed=typed)
+            for data in [fd.name, io.BytesIO(text.encode('utf-8'))]:
+                model = read_model(data, lazy=False, parallel=2, typed=typed)
+                if not typed:
+                    assert(isinstance(model._data, gtabview.dataio._ParsedRows))
+                assert(model.shape == expected.shape == (1000, 5))
+                assert(materialize(model) == materialize(expected))
+                assert(materialize_header(model, 0) == materialize_header(expected, 0))
+    finally:
+        gtabview.dataio.PARALLEL_CHUNK = old_chunk
+        os.unlink(fd.name)
+
+@require('numpy')
+def test_parallel_csv_opt_in():
+    import gtabview.dataio
+    import tempfile
+    from gtabview import profiling
+    text = 'a,b\n' + ''.join('{},x{}\n'.format(y, y % 7) for y in range(1000))
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write(text.encode('utf-8'))
+    old = (gtabview.dataio.PARALLEL_SIZE, gtabview.dataio.PARALLEL_CHUNK,
+           gtabview.dataio.PARALLEL_WORKERS)
+    gtabview.dataio.PARALLEL_SIZE = 1000
+    gtabview.dataio.PARALLEL_CHUNK = 997
+    gtabview.dataio.PARALLEL_WORKERS = 2
+    report_path = tempfile.mktemp(suffix='.json')
+    try:
+        expected = read_model(fd.name, parallel=False)
+        # processes are only used when requested, above PARALLEL_SIZE
+        for args, workers in [({}, None), ({'background': True}, None),
+                              ({'parallel': True}, 2), ({'parallel': True, 'typed': False}, 2)]:
+            profiling.start(report=report_path)
+            model = read_model(fd.name, **args)
+            report = profiling.finish()
+            stages = [stage['args']['workers'] for stage in report['stages']
+                      if stage['name'] == 'parallel_map']
+            assert(stages == ([workers] if workers else []))
+            assert(not model.loading and model.shape == expected.shape == (1000, 2))
+            assert(materialize(model) == materialize(expected))
+        gtabview.dataio.PARALLEL_SIZE = len(text)
+        profiling.start(report=report_path)
+        read_model(fd.name, parallel=True)
+        report = profiling.finish()
+        assert(not [stage for stage in report['stages'] if stage['name'] == 'parallel_map'])
+    finally:
+        (gtabview.dataio.PARALLEL_SIZE, gtabview.dataio.PARALLEL_CHUNK,
+         gtabview.dataio.PARALLEL_WORKERS) = old
+        if os.path.exists(report_path):
+            os.unlink(report_path)
+        os.unlink(fd.name)
+
+@require('numpy')
+def test_typed_csv():
+    import gtabview.dataio
+    import numpy as np
+    from gtabview.formatting import format_block, get_as_str
+    import tempfile
+    lines = ['#i,f,b,d,t,s', '', '1,0.5,True,2020-01-02,2020-01-02T10:30:00,x']
+    lines += ['{},{},{},2020-01-{:02},,{}'.format(y, y * 0.25 if y % 5 else '', y % 2 == 0,
+                                                 y % 28 + 1, y) for y in range(2, 500)]
+    lines += ['007,1.5,x,2020,2020-01-01T00:00:00,', '8']
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write('\n'.join(lines).encode('utf-8'))
+    old_chunk = gtabview.dataio.PARALLEL_CHUNK
+    gtabview.dataio.PARALLEL_CHUNK = 1000
+    try:
+        model = read_model(fd.name, lazy=False)
+        expected = read_model(fd.name, lazy=False, typed=False)
+        assert(model.shape == expected.shape == (501, 6))
+        assert(materialize_header(model, 0) == [['i', 'f', 'b', 'd', 't', 's']])
+        # the last rows do not conform to the types of the sample
+        assert([model.kind(x) for x in range(6)] == ['str', 'float', 'str', 'str', 'datetime', 'str'])
+        # values are shown as read (missing cells being empty), while columns are native
+        as_str = get_as_str()
+        assert(format_block(model, 0, 501, 0, 6, as_str) == format_block(expected, 0, 501, 0, 6, as_str))
+        assert(materialize(model)[:500] == materialize(expected)[:500])
+        assert(model.data(0, 1) == '0.5' and model.data(4, 1) == '')
+        assert(model.column_block(1, 0, 3).tolist() == [0.5, 0.5, 0.75])
+        assert(np.isnan(model.column_block(1, 500, 501)[0]))
+        assert(model.column_block(4, 0, 1)[0] == np.datetime64('2020-01-02T10:30'))
+        assert(np.isnat(model.column_take(4, [1])[0]))
+        model = read_model(fd.name, lazy=False, idx_cols=1)
+        assert(model.shape == (501, 5) and model.header(1, 499, 0) == '007')
+    finally:
+        gtabview.dataio.PARALLEL_CHUNK = old_chunk
+        os.unlink(fd.name)
+
+@require('numpy')
+def test_typed_csv_text():
+    import gtabview.dataio
+    from gtabview.formatting import format_block, get_as_str
+    from gtabview.models import SortedExtDataModel, sort_order
+    import tempfile
+    # values are shown exactly as read: floats which are not keep their text
+    lines = ['zip,n,t,f,i,d', '02134,1,2020-01-01 10:00,0.5,-0,2020-01-01',
+             '10001,,2020-01-02 11:00,1e3,2,2020-01', '00501,3,,2.50,3,']
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write('\n'.join(lines).encode('utf-8'))
+    try:
+        model = read_model(fd.name, lazy=False)
+        expected = read_model(fd.name, lazy=False, typed=False)
+        assert([model.kind(x) for x in range(6)] == ['str', 'float', 'str', 'float', 'float', 'str'])
+        assert(materialize(model) == materialize(expected))
+        as_str = get_as_str()
+        assert(format_block(model, 0, 3, 0, 6, as_str) == format_block(expected, 0, 3, 0, 6, as_str))
+        assert(format_block(model, 0, 1, 0, 3, as_str) == [['02134', '1', '2020-01-01 10:00']])
+        assert(model.column_block(3, 0, 3).tolist() == [0.5, 1000.0, 2.5])
+        assert(format_block(model, 0, 3, 3, 4, as_str, 1) == [['0.5'], ['1000.0'], ['2.5']])
+        # sorted numerically
+        order = sort_order(model, [(3, False)])
+        assert(list(order) == [1, 2, 0])
+        assert(format_block(SortedExtDataModel(model, order), 0, 3, 3, 4, as_str) ==
+               [['1e3'], ['2.50'], ['0.5']])
+    finally:
+        os.unlink(fd.name)
+
+    # chunks shown as read or not are merged
+    lines = ['p,q'] + ['{},x'.format(y * 0.5) for y in range(300)] + \
+        ['{:.2f},x'.format(y * 0.5) for y in range(300)]
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as fd:
+        fd.write('\n'.join(lines).encode('utf-8'))
+    old_chunk = gtabview.dataio.PARALLEL_CHUNK
+    gtabview.dataio.PARALLEL_CHUNK = 1000
+    try:
+        model = read_model(fd.name, lazy=False)
+        assert(model.kind(0) == 'float' and model.shape == (600, 2))
+        assert(materialize(model) == [line.split(',') for line in lines[1:]])
+        assert(model.column_block(0, 299, 301).tolist() == [149.5, 0.0])
+    finally:
+        gtabview.dataio.PARALLEL_CHUNK = old_chunk
+        os.unlink(fd.name)
+
+def test_follow_csv():
+    import tempfile
+    import time
+    def wait(model, rows):
+        end = time.time() + 10
+        while model.shape[0] != rows and time.time() < end:
+            time.sleep(0.01)
+        assert(model.shape[0] == rows)
+    path = tempfile.mktemp(suffix='.csv')
+    with open(path, 'wb') as fd:
+        fd.write(b'#a,b\n1,2\n3,"4\n')
+    try:
+        model = read_model(path, follow=True)
+        assert(model.loading and model.shape == (1, 2))
+        assert(materialize_header(model, 0) == [['a', 'b']])
+        # only complete lines (outside of quotes) are shown
+        with open(path, 'ab') as fd:
+            fd.write(b'5"\n6,7,8\n9')
+        wait(model, 3)
+        # and the width grows with the longer rows
+        assert(materialize(model) == [['1', '2', None], ['3', '4\n5', None], ['6', '7', '8']])
+
+        # truncated, then replaced by another file
+        with open(path, 'wb') as fd:
+            fd.write(b'a,b\n10,11\n')
+        wait(model, 1)
+        assert(model.data(0, 0) == '10')
+        with open(path + '.new', 'wb') as fd:
+            fd.write(b'a,b\n12,13\n14,15\n')
+        os.rename(path + '.new', path)
+        wait(model, 2)
+        assert(materialize(model)[1] == ['14', '15', None])
+        model.stop()
+        end = time.time() + 10
+        while model.loading and time.time() < end:
+            time.sleep(0.01)
+        assert(not model.loading)
+    finally:
+        os.unlink(path)
+
+def test_background_csv():
+    import time
+    for name in ['empty-line-1.txt', 'empty-line-2.txt', 'hash-headers.txt', 'simple.csv']:
+        path = os.path.join(TDATA_ROOT, name)
+        data, hdr_rows = read_table(path, None, None, None)
+        expected = as_model(data, hdr_rows=hdr_rows)
+        with open(path, 'rb') as fd:
+            model = read_model(fd, background=True)
+            while model.loading:
+                time.sleep(0.01)
+        assert(model.shape == expected.shape)
+        assert(materialize(model) == materialize(expected))
+        assert(materialize_header(model, 0) == materialize_header(expected, 0))
+
+def test_sample_lines():
+    from gtabview.dataio import SAMPLE_BYTES, SAMPLE_SPOTS, _sample_lines
+    buf = b'1,2,3\n' * (1 << 20)
+    lines = _sample_lines(buf, len(buf))
+    assert(sum(map(len, lines)) <= SAMPLE_BYTES * (SAMPLE_SPOTS + 2))
+    assert(set(lines) == {b'1,2,3\n'})
+
+def test_decode_fallback():
+    from gtabview.dataio import _decode
+    data = 'a,b\n'.encode('utf-8') + '\xe8,1\n'.encode('latin-1') + '€,2\n'.encode('utf-8')
+    assert(_decode(data, 'utf-8') == 'a,b\n\xe8,1\n€,2\n')
+
+@require('xlrd')
+def test_xls_lazy():
+    path = os.path.join(TDATA_ROOT, 'simple.xls')
+    data, hdr_rows = read_table(path, None, None, None)
+    model = read_model(path)
+    expected = as_model(data, hdr_rows=hdr_rows)
+    assert(model.shape == expected.shape)
+    assert(materialize(model) == materialize(expected))
+    assert(materialize_header(model, 0) == materialize_header(expected, 0))
+
+@require('openpyxl')
+def test_xlsx_lazy():
+    import openpyxl
+    import tempfile
+    from gtabview import dataio
+    wb = openpyxl.Workbook()
+    wb.active.append(['#a', 'b', 'c'])
+    for y in range(100):
+        wb.active.append([y, str(y)] + [None] * (y % 2) + [y * 1.5])
+    fd = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    fd.close()
+    sheet_rows = dataio.SHEET_ROWS
+    try:
+        wb.save(fd.name)
+        dataio.SHEET_ROWS = 16
+        model = read_model(fd.name)
+        assert(model.shape == (100, 4))
+        assert(not model.random_access)
+        assert(materialize_header(model, 0) == [['a', 'b', 'c', None]])
+        # read out of order, restarting the stream
+        for y in [99, 0, 50, 49, 17]:
+            assert(model.data(y, 0) == y and model.data(y, 2 + y % 2) == y * 1.5)
+        data, hdr_rows = read_table(fd.name, None, None, None)
+        assert(materialize(model) == materialize(as_model(data, hdr_rows=hdr_rows)))
+        # blocks past the end of the sheet (as when max_row is overstated)
+        # are empty, while streaming from an earlier block
+        rows = model._data
+        assert(rows.parse(90) == [89, '89', None, 133.5] and rows.parse(130) == [])
+        try:
+            read_model(fd.name, sheet_index=1)
+            assert(False)
+        except IndexError:
+            pass
+    finally:
+        dataio.SHEET_ROWS = sheet_rows
+        os.unlink(fd.name)
+
+@require('pandas')
+@require('pyarrow')
+def test_columnar():
+    import pandas as pd
+    import shutil
+    import tempfile
+    from gtabview import dataio
+    frame = pd.DataFrame({'i': range(10), 'f': [0.5, None] * 5, 's': list('abcdefghij')},
+                         index=pd.Index(list('ABCDEFGHIJ'), name='key'))
+    expected = as_model(frame)
+    tmp = tempfile.mkdtemp()
+    arrow_columns = dataio.ARROW_COLUMNS
+    try:
+        dataio.ARROW_COLUMNS = 2
+        frame.to_parquet(os.path.join(tmp, 'data.parquet'), row_group_size=3)
+        frame.to_feather(os.path.join(tmp, 'data.feather'), chunksize=4)
+        os.mkdir(os.path.join(tmp, 'dataset'))
+        frame[:5].to_parquet(os.path.join(tmp, 'dataset', '0.parquet'))
+        frame[5:].to_parquet(os.path.join(tmp, 'dataset', '1.parquet'))
+        for name in ['data.parquet', 'data.feather', 'dataset']:
+            model = read_model(os.path.join(tmp, name))
+            assert(model.shape == expected.shape)
+            assert(model.header_shape == expected.header_shape)
+            assert(repr(materialize_blocks(model, 4)) == repr(materialize(expected)))
+            assert(materialize_header(model, 0) == materialize_header(expected, 0))
+            assert(materialize_header(model, 1) == materialize_header(expected, 1))
+            assert(materialize_names(model, 1) == ['key'])
+    finally:
+        dataio.ARROW_COLUMNS = arrow_columns
+        shutil.rmtree(tmp)
+
+@require('pandas')
+@require('pyarrow')
+def test_columnar_timestamps():
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import tempfile
+    from gtabview.dataio import ExtArrowModel
+    from gtabview.formatting import format_block, get_as_str
+    frame = pd.DataFrame({'t': pd.to_datetime(['2020-01-02 10:30', None])})
+    fd = tempfile.NamedTemporaryFile(suffix='.parquet', delete=False)
+    try:
+        fd.close()
+        frame.to_parquet(fd.name)
+        model = read_model(fd.name)
+        assert(format_block(model, 0, 2, 0, 1, get_as_str()) == [['2020-01-02 10:30:00'], ['']])
+    finally:
+        os.unlink(fd.name)
+
+    # without pandas metadata, datetime columns are plain NumPy arrays
+    table = pa.table({'t': pa.array(frame['t'])})
+    model = ExtArrowModel(table.schema.names, [2], lambda chunk, positions:
+                          [table.column(p) for p in positions])
+    assert(isinstance(model.column_block(0, 0, 2), np.ndarray))
+
+@require('numpy')
+def test_npy():
+    import numpy as np
+    import tempfile
+    fd = tempfile.NamedTemporaryFile(suffix='.npy', delete=False)
+    try:
+        np.save(fd, np.arange(12).reshape(3, 4))
+        fd.close()
+        model = read_model(fd.name)
+        assert(model.shape == (3, 4))
+        assert(materialize(model)[2] == [8, 9, 10, 11])
+    finally:
+        os.unlink(fd.name)
+
+def test_compressed_csv():
+    import gzip
+    import time
+    import tempfile
+    path = os.path.join(TDATA_ROOT, 'simple.csv')
+    data, hdr_rows = read_table(path, None, None, None)
+    expected = as_model(data, hdr_rows=hdr_rows)
+    fd = tempfile.NamedTemporaryFile(suffix='.csv.gz', delete=False)
+    try:
+        with open(path, 'rb') as raw:
+            fd.write(gzip.compress(raw.read()))
+        fd.close()
+        # reopening reuses the index of the lazy model
+        for args in [{'lazy': False}, {'lazy': True}, {'lazy': True}, {'background': True}]:
+            model = read_model(fd.name, **args)
+            while model.loading:
+                time.sleep(0.01)
+            assert(materialize(model) == materialize(expected))
+            assert(materialize_header(model, 0) == materialize_header(expected, 0))
+        with open(fd.name, 'rb') as stream:
+            model = read_model(stream, background=True)
+            while model.loading:
+                time.sleep(0.01)
+        assert(materialize(model) == materialize(expected))
+    finally:
+        os.unlink(fd.name)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview.models import as_model
+from gtabview.export import Export, export_format
+import gtabview.export
+import io
+import tempfile
+
+
+def _export(model, output, *args, **kwargs):
+    export = Export(model, output, *args, **kwargs)
+    export.run()
+    assert(export.error is None)
+    return export
+
+def test_export_format():
+    assert(export_format('a.CSV') == 'csv')
+    assert(export_format('a.tsv') == 'tsv')
+    assert(export_format('a.parquet') == 'parquet')
+    assert(export_format('a') == 'csv')
+
+def test_export_tsv():
+    model = as_model([['a', 'b', 'c'], [1, 'x\ty', None], [2, 3.5, 'z']], hdr_rows=1)
+    fd = io.StringIO()
+    _export(model, fd)
+    assert(fd.getvalue() == 'a\tb\tc\n1\t"x\ty"\t\n2\t3.5\tz\n')
+    fd = io.StringIO()
+    _export(model, fd, rows=[(1, 2)], columns=[(0, 1), (2, 3)])
+    assert(fd.getvalue() == 'a\tc\n2\tz\n')
+
+def test_export_blocks():
+    old_rows = gtabview.export.EXPORT_ROWS
+    gtabview.export.EXPORT_ROWS = 7
+    try:
+        model = as_model([[i, i * 2] for i in range(100)])
+        fd = io.StringIO()
+        export = _export(model, fd, 'csv', rows=[(10, 20), (50, 60)], header=False)
+        lines = fd.getvalue().splitlines()
+        assert(export.rows == export.total == 20)
+        assert(lines[0] == '10,20' and lines[10] == '50,100' and len(lines) == 20)
+    finally:
+        gtabview.export.EXPORT_ROWS = old_rows
+
+def test_export_cancel():
+    path = os.path.join(tempfile.mkdtemp(), 'out.csv')
+    export = Export(as_model([[i] for i in range(10000)]), path)
+    export.cancel()
+    export.run()
+    assert(export.rows == 0 and not os.path.exists(path))
+
+@require('pandas')
+def test_export_frame_csv():
+    import pandas as pd
+    frame = pd.DataFrame({'a': [1, 2], 'b': [0.5, None]},
+                         index=pd.Index(['x', 'y'], name='key'))
+    path = os.path.join(tempfile.mkdtemp(), 'out.csv')
+    _export(as_model(frame), path)
+    with io.open(path, encoding='utf-8', newline='') as fd:
+        assert(fd.read() == 'key,a,b\r\nx,1,0.5\r\ny,2,\r\n')
+
+@require('pyarrow')
+@require('pandas')
+def test_export_parquet():
+    import pandas as pd
+    import pyarrow.parquet as pq
+    old_rows = gtabview.export.EXPORT_ROWS
+    gtabview.export.EXPORT_ROWS = 3
+    try:
+        frame = pd.DataFrame({'a': range(10), 'b': ['s%d' % i for i in range(10)],
+                              'c': [i if i % 2 else 'x' for i in range(10)]})
+        path = os.path.join(tempfile.mkdtemp(), 'out.parquet')
+        _export(as_model(frame), path, columns=[(0, 1), (2, 3)])
+        table = pq.read_table(path)
+        assert(table.column_names == ['L0', 'a', 'c'])
+        assert(table.column('a').to_pylist() == list(range(10)))
+        assert(table.column('c').to_pylist()[:2] == ['x', '1'])
+        assert(table.column('L0').to_pylist()[-1] == '9')
+    finally:
+        gtabview.export.EXPORT_ROWS = old_rows
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview.formatting import format_block, format_column, get_as_str
+from gtabview.models import as_model
+
+
+def format_cells(model, as_str):
+    return [[as_str(v) for v in row] for row in materialize(model)]
+
+@require('numpy')
+def test_format_array():
+    import numpy as np
+    as_str = get_as_str()
+    for data in [np.array([[1, 2], [3, 4]]),
+                 np.array([[0.1, np.nan], [1e16, -np.inf]]),
+                 np.array([[0.1, np.nan]], dtype=np.float32),
+                 np.array([[True, False]]),
+                 np.array([['a', 'bb']]),
+                 np.array([['2020-01-01', 'NaT']], dtype='datetime64[s]')]:
+        model = as_model(data)
+        expected = format_cells(model, as_str)
+        for transpose in [False, True]:
+            if transpose:
+                model = model.transpose()
+                expected = [list(row) for row in zip(*expected)]
+            shape = model.shape
+            assert(format_block(model, 0, shape[0], 0, shape[1], as_str) == expected)
+
+@require('pandas')
+def test_format_frame():
+    import numpy as np
+    import pandas as pd
+    frame = pd.DataFrame({'i': [1, 2, 3],
+                          'f': [0.5, None, 1 / 3.],
+                          'd': pd.to_datetime(['2020-01-01 00:00:00', None, '2020-01-01 00:00:00.5'], format='mixed'),
+                          'c': pd.Categorical(['a', None, 'b']),
+                          'o': ['x', None, 3],
+                          's': pd.Series(['x', None, 'y'], dtype='string')})
+    model = as_model(frame)
+    as_str = get_as_str()
+    assert(format_block(model, 0, 3, 0, 6, as_str) == format_cells(model, as_str))
+    assert(format_block(model, 1, 3, 1, 3, as_str) == [['', ''], ['0.3333333333333333', '2020-01-01 00:00:00.500000']])
+
+@require('numpy')
+def test_format_precision():
+    import numpy as np
+    assert(format_column(np.array([0.5, np.nan, 1 / 3.]), precision=2) == ['0.50', '', '0.33'])
+    assert(get_as_str(2)(1 / 3.) == '0.33')
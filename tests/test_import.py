@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 200  # Maximum time to import gtabview (without Qt)
+
+
+def _run(*args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    proc = subprocess.Popen([sys.executable] + list(args), env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    assert(proc.returncode == 0)
+    return out.decode(), err.decode()
+
+def test_import_lazy():
+    # Qt and the readers are only imported on use
+    out, _ = _run('-c', 'import sys, gtabview; gtabview.read_model; '
+                  'print(" ".join(sys.modules))')
+    modules = set(out.split())
+    for name in ['PyQt5', 'PyQt4', 'PySide', 'gtabview.viewer', 'csv', 'xlrd',
+                 'openpyxl', 'numpy', 'pandas']:
+        assert(name not in modules)
+    out, _ = _run('-c', 'import sys, gtabview; gtabview.Viewer; '
+                  'print(" ".join(sys.modules))')
+    assert('gtabview.viewer' in out.split())
+
+def test_import_time():
+    if sys.version_info < (3, 7):
+        raise nose.SkipTest("requires -X importtime")
+    _, err = _run('-X', 'importtime', '-c', 'import gtabview')
+    # "import time: self [us] | cumulative | imported package"
+    times = [line.split('|') for line in err.splitlines() if line.startswith('import time:')]
+    cumulative = [int(t[1]) for t in times if t[2].strip() == 'gtabview']
+    assert(cumulative and cumulative[0] < IMPORT_BUDGET_MS * 1000)
@@ -168,3 +168,143 @@ def test_model_matrix():
     assert(model.header_shape == (0, 0))
     assert(model.shape == (2, 3))
     assert(materialize(model) == [[1, 2, 3], [1, 2, 3]])
+
+def test_model_blocks():
+    from collections import OrderedDict
+    datasets = [[1, 2, 3],
+                OrderedDict([('a', [1, 2, 3]), ('b', (1, 2)), ('c', [])]),
+                [[None, 'a', 'b', 'c'], ['x', 1, 2, 3], ['y', 1], ['z', 1, 2, 3, 4]]]
+    try:
+        import numpy as np
+        datasets.append(np.arange(15).reshape(3, 5))
+    except ImportError:
+        pass
+    try:
+        import pandas as pd
+        datasets.append(pd.DataFrame({'a': [1, 2, 3], 'b': [1.5, None, 2],
+                                      'c': pd.to_datetime(['2020-01-01', None, '2020-01-02'])},
+                                     index=pd.MultiIndex.from_tuples([('A', 'x'), ('A', 'y'), ('B', 'x')])))
+    except ImportError:
+        pass
+    for data in datasets:
+        for transpose in [False, True]:
+            model = as_model(data, hdr_rows=1, idx_cols=1, transpose=transpose)
+            # compare representations, as NaN != NaN
+            assert(repr(materialize_blocks(model)) == repr(materialize(model)))
+            for axis in [0, 1]:
+                assert(repr(materialize_header_blocks(model, axis)) ==
+                       repr(materialize_header(model, axis)))
+
+@require('pandas')
+def test_model_frame_multiindex_codes():
+    import pandas as pd
+    index = pd.MultiIndex.from_tuples([('A', 1), ('A', 2), ('B', 2), (None, 2), ('B', 3)])
+    model = as_model(pd.DataFrame({'v': range(5)}, index=index))
+    for level in [0, 1]:
+        expected = [v[level] for v in index.values]
+        assert(repr([model.header(1, x, level) for x in range(5)]) == repr(expected))
+        assert(repr(model.header_block(1, 1, 4, level)) == repr(expected[1:4]))
+    assert(model.header_starts(1, 0, 5, 0) == [True, False, True, True, True])
+    assert(model.header_starts(1, 1, 5, 1) == [True, False, False, True])
+    assert(model.transpose().header_starts(0, 0, 2, 0) == [True, False])
+    # runs of missing labels
+    index = pd.MultiIndex.from_tuples([(None, 1), (None, 1), ('A', 1), (float('nan'), 2)])
+    model = as_model(pd.DataFrame({'v': range(4)}, index=index))
+    assert(model.header_starts(1, 0, 4, 0) == [True, True, True, True])
+    assert(model.header_starts(1, 1, 3, 1) == [False, False])
+    generic = [a != b for a, b in zip(model.header_block(1, 0, 4, 0), model.header_block(1, 1, 4, 0))]
+    assert(model.header_starts(1, 1, 4, 0) == generic)
+    # generic implementation
+    model = as_model([['a', 1], ['a', 2], ['b', 3]], idx_cols=1)
+    assert(model.header_starts(1, 0, 3, 0) == [True, False, True])
+    assert(model.header_starts(1, 2, 3, 0) == [True])
+
+def test_model_sorted():
+    from gtabview.models import SortedExtDataModel, sort_order
+    model = as_model([[2, 'b'], [1, 'c'], [2, 'a'], [None, 'd'], [1, 'a']], hdr_rows=0)
+    order = sort_order(model, [(0, True), (1, False)])
+    assert(list(order) == [1, 4, 0, 2, 3])
+    order = sort_order(model, [(0, False)])
+    assert(list(order) == [0, 2, 1, 4, 3])
+    sorted_model = SortedExtDataModel(model, sort_order(model, [(1, True)]))
+    assert(sorted_model.shape == model.shape)
+    assert([sorted_model.data(y, 1) for y in range(5)] == ['a', 'a', 'b', 'c', 'd'])
+    assert(sorted_model.data_block(0, 2, 0, 2) == [[2, 'a'], [1, 'a']])
+
+@require('pandas')
+def test_model_frame_sorted():
+    import pandas as pd
+    from gtabview.models import SortedExtDataModel, sort_order
+    df = pd.DataFrame({'a': [3., None, 1., 2.], 'b': list('wxyz')},
+                      index=list('pqrs'))
+    model = as_model(df)
+    order = sort_order(model, [(0, True)])
+    assert(list(order) == [2, 3, 0, 1])
+    model = SortedExtDataModel(model, order)
+    assert(model.header(1, 0, 0) == 'r')
+    assert(list(model.column_block(1, 0, 4)) == list('yzwx'))
+
+@require('pandas')
+def test_model_frame_sorted_descending():
+    import numpy as np
+    import pandas as pd
+    from gtabview.models import sort_order
+    times = pd.to_datetime(['2020-01-02', None, '2020-01-01', '2020-01-03'])
+    df = pd.DataFrame({'c': pd.Categorical(['a', 'b', 'c', 'b']),
+                       'm': pd.Categorical(['a', None, 'c', 'b']), 't': times})
+    model = as_model(df)
+    assert(list(sort_order(model, [(0, False)])) == [2, 1, 3, 0])
+    assert(list(sort_order(model, [(1, False)])) == [2, 3, 0, 1])
+    assert(list(sort_order(model, [(1, True)])) == [0, 3, 2, 1])
+    assert(list(sort_order(model, [(2, True)])) == [2, 0, 3, 1])
+    assert(list(sort_order(model, [(2, False)])) == [3, 0, 2, 1])
+
+    # the data is left untouched
+    values = np.array(['2020-01-02', 'NaT', '2020-01-01'], dtype='datetime64[D]')
+    model = as_model(values.reshape(3, 1))
+    assert(list(sort_order(model, [(0, True)])) == [2, 0, 1])
+    assert(np.isnat(values[1]))
+
+@require('dask')
+def test_model_partitioned():
+    import time
+    import pandas as pd
+    import dask.dataframe as dd
+    import gtabview.models
+    from gtabview.models import ExtPartitionedModel, sort_order
+    df = pd.DataFrame({'a': range(100), 'b': ['v{}'.format(y % 9) for y in range(100)]},
+                      index=['r{:02}'.format(y) for y in range(100)])
+    df.index.name = 'row'
+    model = as_model(dd.from_pandas(df, npartitions=7))
+    assert(isinstance(model, ExtPartitionedModel) and not model.random_access)
+    while model.loading:
+        time.sleep(0.01)
+    assert(model.error is None and len(model._offsets) == 8)
+    expected = as_model(df)
+    assert(model.shape == expected.shape and model.header_shape == expected.header_shape)
+    assert(materialize(model) == materialize(expected))
+    assert(materialize_blocks(model, 6) == materialize_blocks(expected, 6))
+    assert(materialize_header_blocks(model, 1, 6) == materialize_header_blocks(expected, 1, 6))
+    assert(materialize_header(model, 0) == materialize_header(expected, 0))
+    assert(materialize_names(model, 1) == ['row'])
+    assert(model.column_block(0, 10, 40).tolist() == list(range(10, 40)))
+    assert(model.column_take(1, [99, 0, 50]).tolist() == ['v0', 'v0', 'v5'])
+    assert(list(sort_order(model, [(1, True), (0, False)]))[:2] == [99, 90])
+
+    # only the partitions in view (and the next one) are materialized,
+    # keeping the last used within PARTITION_CACHE
+    old_cache = gtabview.models.PARTITION_CACHE
+    gtabview.models.PARTITION_CACHE = 1
+    try:
+        model = as_model(dd.from_pandas(df, npartitions=7))
+        while model.loading:
+            time.sleep(0.01)
+        assert(model.data(0, 0) == 0)
+        model._prefetcher.join()
+        assert(list(model._cache) == [0, 1])
+        assert(model.data_block(50, 52, 1, 2) == [['v5'], ['v6']])
+        model._prefetcher.join()
+        assert(len(model._cache) == 2 and model._partition(3, False).shape[0] > 0)
+        assert(len(model._cache) == 2)
+    finally:
+        gtabview.models.PARTITION_CACHE = old_cache
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview import profiling
+from gtabview.dataio import _has_numpy
+import json
+import tempfile
+import time
+
+
+def test_profile_stages():
+    assert(not profiling.active())
+    with profiling.stage('ignored'):
+        pass
+    report_path = tempfile.mktemp(suffix='.json')
+    trace_path = tempfile.mktemp(suffix='.json')
+    assert(profiling.start(report_path, trace_path))
+    assert(not profiling.start(report_path))
+    with profiling.stage('outer'):
+        with profiling.stage('inner', rows=10):
+            data = [0] * 100000
+    profiling.finish()
+    assert(not profiling.active())
+
+    with open(report_path) as fd:
+        stages = json.load(fd)['stages']
+    assert([s['name'] for s in stages] == ['outer', 'inner'])
+    outer, inner = stages
+    assert(outer['depth'] == 0 and inner['depth'] == 1)
+    assert(inner['args'] == {'rows': 10})
+    assert(outer['wall'] >= inner['wall'])
+    assert(outer['peak_bytes'] >= inner['peak_bytes'] >= 800000)
+    with open(trace_path) as fd:
+        events = json.load(fd)['traceEvents']
+    assert([e['name'] for e in events] == ['outer', 'inner'])
+    assert(all(e['ph'] == 'X' for e in events))
+    os.unlink(report_path)
+    os.unlink(trace_path)
+
+def test_profile_view():
+    gtabview.WAIT = False
+    report_path = tempfile.mktemp(suffix='.json')
+    view(os.path.join(SAMPLE_ROOT, "data_ohlcv.csv"), profile=report_path)
+    for _ in range(500):
+        if not profiling.active():
+            break
+        gtabview.APP.processEvents()
+        time.sleep(0.01)
+    assert(not profiling.active())
+    with open(report_path) as fd:
+        names = [s['name'] for s in json.load(fd)['stages']]
+    # text is parsed into typed columns when NumPy is available
+    parse = 'parse_typed' if _has_numpy() else 'parse_lines'
+    for name in ['read_model', 'detect_dialect', parse, 'as_model', 'ViewController.view',
+                 'Viewer.view', 'ExtTableView.resizeColumnsToContents', 'Viewer.paint']:
+        assert(name in names)
+    os.unlink(report_path)
+
+def test_profile_view_wait():
+    from gtabview.viewer import QtCore, QtWidgets, Viewer
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    def close():
+        # after the report is written at the first paint
+        if profiling.active():
+            QtCore.QTimer.singleShot(10, close)
+            return
+        for widget in app.topLevelWidgets():
+            if isinstance(widget, Viewer):
+                widget.close()
+    QtCore.QTimer.singleShot(10, close)
+    report_path = tempfile.mktemp(suffix='.json')
+    view(os.path.join(SAMPLE_ROOT, "data_ohlcv.csv"), profile=report_path,
+         wait=True, recycle=False)
+    with open(report_path) as fd:
+        names = [s['name'] for s in json.load(fd)['stages']]
+    assert('ViewController.view' in names and 'Viewer.paint' in names)
+    os.unlink(report_path)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview.models import as_model
+from gtabview.search import Query, Search, Matches
+
+
+def _search(model, *args, **kwargs):
+    columns = kwargs.pop('columns', None)
+    search = Search(model, Query(*args, **kwargs), columns)
+    search.run()
+    assert(search.error is None)
+    return [search.matches[i] for i in range(len(search.matches))]
+
+def test_matches():
+    matches = Matches(3)
+    assert(matches.next(0, 0) is None)
+    matches.extend([1, 5, 9])
+    assert(matches.next(0, 0) == (0, 1))
+    assert(matches.next(0, 1) == (1, 2))
+    assert(matches.next(3, 0) == (0, 1))
+    assert(matches.next(0, 1, backward=True) == (3, 0))
+
+def test_search_list():
+    model = as_model([['Foo', 1], ['bar', '2.0'], ['foobar', None]], hdr_rows=0)
+    assert(_search(model, 'foo') == [(0, 0), (2, 0)])
+    assert(_search(model, 'foo', case=True) == [(2, 0)])
+    assert(_search(model, '^(bar|1)$', 'regex') == [(0, 1), (1, 0)])
+    assert(_search(model, '2', 'number') == [(1, 1)])
+    assert(_search(model, 'bar', columns=[1]) == [])
+
+@require('pandas')
+def test_search_frame():
+    import pandas as pd
+    df = pd.DataFrame({'a': [1.5, 2., None] * 2000,
+                       'b': ['x', '2', 'y2'] * 2000})
+    model = as_model(df)
+    matches = _search(model, '2')
+    assert(len(matches) == 6000 and matches[:3] == [(1, 0), (1, 1), (2, 1)])
+    assert(_search(model, '2', 'number')[:2] == [(1, 0), (1, 1)])
+    assert(_search(model, 'x|1.5', 'regex', columns=[1])[-1] == (5997, 1))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals, absolute_import
+
+from . import *
+from gtabview.models import as_model
+from gtabview.stats import ColumnStats, HyperLogLog, Stats
+import math
+import random
+
+
+def test_hyperloglog():
+    hll = HyperLogLog()
+    assert(hll.estimate() == 0)
+    for i in range(20000):
+        hll.add(random.getrandbits(64))
+    assert(abs(hll.estimate() - 20000) < 20000 * 0.05)
+
+def test_column_stats():
+    values = [3, None, '4.5', 'x', 1, '', 3]
+    stats = ColumnStats()
+    for value in values:
+        stats.add(value)
+    assert(stats.count == 5 and stats.missing == 2)
+    assert(stats.distinct == 4)
+    assert(stats.min == 1 and stats.max == 4.5)
+    assert(stats.mean == 2.875)
+    assert(abs(stats.std - math.sqrt(2.0625)) < 1e-9)
+
+@require('pandas')
+def test_column_stats_vectorized():
+    import numpy as np
+    stats = ColumnStats()
+    values = np.arange(10000) % 100 * 0.5
+    values[::10] = np.nan
+    for start in range(0, len(values), 3000):
+        stats.add_values(values[start:start + 3000])
+    present = values[~np.isnan(values)]
+    assert(stats.count == len(present) and stats.missing == 1000)
+    assert(abs(stats.mean - present.mean()) < 1e-9)
+    assert(abs(stats.std - present.std(ddof=1)) < 1e-9)
+    assert(stats.min == 0.5 and stats.max == 49.5)
+    assert(abs(stats.distinct - 90) <= 2)
+
+    # the same values as strings, as read from a text file
+    strings = ColumnStats()
+    strings.add_values(np.array(['' if v != v else repr(v) for v in values.tolist()], dtype=object))
+    assert(strings.count == stats.count and strings.max == stats.max)
+    assert(abs(strings.mean - stats.mean) < 1e-9)
+
+def test_column_stats_merge():
+    values = [3, None, '4.5', 'x', 1, '', 3, 'a', 7.25]
+    stats = ColumnStats()
+    for value in values:
+        stats.add(value)
+    merged = ColumnStats()
+    for start in range(0, len(values), 4):
+        block = ColumnStats()
+        for value in values[start:start + 4]:
+            block.add(value)
+        merged.merge(block)
+    merged.merge(ColumnStats())
+    assert((merged.count, merged.missing, merged.distinct, merged.min, merged.max) ==
+           (stats.count, stats.missing, stats.distinct, stats.min, stats.max))
+    assert(abs(merged.mean - stats.mean) < 1e-9 and abs(merged.std - stats.std) < 1e-9)
+    copy = ColumnStats()
+    copy.merge(merged)
+    assert(copy.min == 1 and copy.max == 7.25 and copy.distinct == stats.distinct)
+
+def test_stats_model():
+    model = as_model([[i, 'x%d' % (i % 10)] for i in range(10000)], hdr_rows=0)
+    stats = Stats(model)
+    stats.run()
+    assert(stats.error is None and stats.rows == 10000)
+    col = stats.column(0)
+    assert(col['count'] == 10000 and col['min'] == 0 and col['max'] == 9999)
+    col = stats.column(1)
+    assert(col['distinct'] == 10 and col['min'] == 'x0' and col['mean'] is None)
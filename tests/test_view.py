@@ -43,3 +43,324 @@ def test_view_frame():
 def test_view_frame_empty():
     import pandas as pd
     view(pd.DataFrame())
+
+def test_view_csv_background():
+    view(os.path.join(SAMPLE_ROOT, "data_ohlcv.csv"), background=True)
+
+def test_tile_cache():
+    from gtabview.viewer import TileCache
+    cache = TileCache(limit=10)
+    cache.put('a', 1, 4)
+    cache.put('b', 2, 4)
+    assert(cache.get('a') == 1)
+    cache.put('c', 3, 4)
+    assert('b' not in cache)
+    assert(cache.get('a') == 1 and cache.get('c') == 3)
+    cache.put('d', 4, 20)
+    assert(cache.get('d') == 4 and cache.size == 20)
+
+def test_data_text():
+    from gtabview.models import as_model
+    from gtabview.viewer import Data4ExtModel, QtCore
+    qmodel = Data4ExtModel(as_model([[i, None] for i in range(1000)]))
+    for y in [999, 0, 500]:
+        assert(qmodel.data(qmodel.index(y, 0), QtCore.Qt.DisplayRole) == str(y))
+        assert(qmodel.data(qmodel.index(y, 1), QtCore.Qt.DisplayRole) == '')
+
+def test_sample_spans():
+    from gtabview.viewer import _sample_spans
+    assert(_sample_spans(10, 100) == [(0, 10)])
+    spans = _sample_spans(10000, 100, 4)
+    assert(spans[0] == (0, 25) and spans[-1] == (9975, 10000))
+    assert(sum(y1 - y0 for y0, y1 in spans) == 100)
+
+def test_autosize_sampled():
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView
+    rows = [['x'] * 3 for _ in range(10000)]
+    rows[-1][1] = 'y' * 20
+    table = ExtTableView()
+    table.setModel(as_model(rows))
+    # values far from the head are sampled too
+    assert(table.table_data.columnWidth(1) > table.table_data.columnWidth(0))
+
+def test_sort_columns():
+    import time
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView, QtCore
+    table = ExtTableView()
+    table.setModel(as_model([[3 - i % 4, i] for i in range(100)]))
+    table.sortByColumns([(0, True), (1, False)])
+    while table._sort_job is not None:
+        time.sleep(0.01)
+        table._poll_sort()
+    qmodel = table.table_data.model()
+    text = lambda y, x: qmodel.data(qmodel.index(y, x), QtCore.Qt.DisplayRole)
+    assert(text(0, 0) == '0' and text(0, 1) == '99')
+    table.sortByColumns([])
+    assert(text(0, 0) == '3' and text(0, 1) == '0')
+
+def test_view_find():
+    from gtabview.models import as_model
+    from gtabview.viewer import Viewer
+    viewer = Viewer(as_model([[i, 'x%d' % i] for i in range(10000)], hdr_rows=0))
+    viewer.find('x99')
+    viewer._search.join()
+    viewer._poll_search()
+    index = viewer.table.table_data.currentIndex()
+    assert((index.row(), index.column()) == (99, 1))
+    viewer.findNext()
+    assert(viewer.table.table_data.currentIndex().row() == 990)
+    viewer.close()
+
+def test_column_stats_tooltip():
+    import time
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView, QtCore
+    table = ExtTableView()
+    table.setModel(as_model([['a', 'b']] + [[i, None] for i in range(100)], hdr_rows=1))
+    table.columnStats(0)
+    while table.statsRunning():
+        time.sleep(0.01)
+    qmodel = table.table_header.model()
+    tooltip = qmodel.data(qmodel.index(0, 0), QtCore.Qt.ToolTipRole)
+    assert('count: 100 (0 missing)' in tooltip and 'max: 99' in tooltip)
+    tooltip = qmodel.headerData(1, QtCore.Qt.Horizontal, QtCore.Qt.ToolTipRole)
+    assert('count: 0 (100 missing)' in tooltip)
+    table.setModel(as_model([[1]]))
+    assert(not table.statsRunning())
+
+def test_merge_spans():
+    from gtabview.viewer import _merge_spans
+    assert(_merge_spans([]) == [])
+    assert(_merge_spans([(4, 6), (0, 1), (2, 3), (9, 9), (8, 10)]) == [(0, 6), (8, 10)])
+
+def test_select_ranges():
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView, QtCore
+    table = ExtTableView()
+    table.setModel(as_model([[0] * 50 for _ in range(100000)]))
+    table.table_data.selectAll()
+    header = table.table_header.selectionModel()
+    index = table.table_index.selectionModel()
+    assert(len(header.selection()) == 1 and len(index.selection()) == 1)
+    assert(header.isColumnSelected(49, QtCore.QModelIndex()))
+    assert(index.isRowSelected(99999, QtCore.QModelIndex()))
+    qmodel = table.table_data.model()
+    selection = QtCore.QItemSelection(qmodel.index(5, 2), qmodel.index(10, 3))
+    selection.select(qmodel.index(8, 4), qmodel.index(20, 4))
+    table.table_data.selectionModel().select(selection, QtCore.QItemSelectionModel.ClearAndSelect)
+    assert([(r.left(), r.right()) for r in header.selection()] == [(2, 4)])
+    assert([(r.top(), r.bottom()) for r in index.selection()] == [(5, 20)])
+
+def test_view_copy():
+    from gtabview.models import as_model
+    from gtabview.viewer import Viewer, QtCore, QtWidgets
+    viewer = Viewer(as_model([['a', 'b', 'c']] + [[i, i * 2, 'x'] for i in range(100)],
+                             hdr_rows=1))
+    table = viewer.table
+    selection = QtCore.QItemSelection()
+    header = table.table_header.model()
+    selection.select(header.index(0, 0), header.index(0, 0))
+    selection.select(header.index(0, 2), header.index(0, 2))
+    table.table_header.selectionModel().select(
+        selection, QtCore.QItemSelectionModel.ClearAndSelect | QtCore.QItemSelectionModel.Columns)
+    assert(table.selectedSpans() == ([(0, 100)], [(0, 1), (2, 3)]))
+    viewer.copy()
+    text = QtWidgets.QApplication.clipboard().text()
+    assert(text.startswith('a\tc\n0\tx\n') and text.count('\n') == 101)
+
+    # overlapping ranges covering a rectangle
+    qmodel = table.table_data.model()
+    selection = QtCore.QItemSelection(qmodel.index(0, 0), qmodel.index(2, 1))
+    selection.select(qmodel.index(1, 1), qmodel.index(3, 1))
+    selection.select(qmodel.index(3, 0), qmodel.index(3, 0))
+    table.table_data.selectionModel().select(selection, QtCore.QItemSelectionModel.ClearAndSelect)
+    assert(table.selectedSpans() == ([(0, 4)], [(0, 2)]))
+
+    # cells in different rows and columns are not copied as a rectangle
+    selection = QtCore.QItemSelection(qmodel.index(0, 0), qmodel.index(0, 0))
+    selection.select(qmodel.index(5, 2), qmodel.index(5, 2))
+    table.table_data.selectionModel().select(selection, QtCore.QItemSelectionModel.ClearAndSelect)
+    try:
+        table.selectedSpans()
+        assert(False)
+    except ValueError:
+        pass
+    viewer.copy()
+    assert(QtWidgets.QApplication.clipboard().text() == text)
+    boxes = viewer.findChildren(QtWidgets.QMessageBox)
+    assert(len(boxes) == 1 and boxes[0].isVisible())
+    boxes[0].close()
+    viewer.close()
+
+def test_view_update():
+    from gtabview.models import as_model
+    from gtabview.viewer import Viewer, QtCore
+    rows = [['a', 'b', 'c']] + [[i, i * 2, 'x'] for i in range(100)]
+    viewer = Viewer(as_model(rows, hdr_rows=1))
+    table = viewer.table
+    qmodel = table.table_data.model()
+    text = lambda y, x: qmodel.data(qmodel.index(y, x), QtCore.Qt.DisplayRole)
+    assert(text(0, 0) == '0')
+    table.setCurrentIndex(5, 1)
+    width = table.table_data.columnWidth(2)
+    events = []
+    qmodel.modelReset.connect(lambda: events.append('reset'))
+    qmodel.rowsInserted.connect(lambda parent, a, b: events.append(('rows', a, b)))
+    qmodel.columnsInserted.connect(lambda parent, a, b: events.append(('columns', a, b)))
+    qmodel.dataChanged.connect(lambda a, b, *_: events.append(
+        ('data', a.row(), a.column(), b.row(), b.column())))
+
+    rows[1][0] = 'changed'
+    rows[0].append('d')
+    rows.extend([[i, i * 2, 'x'] for i in range(100, 150)])
+    assert(table.updateModel(as_model(rows, hdr_rows=1)))
+    assert(events[:2] == [('columns', 3, 3), ('rows', 100, 149)] and 'reset' not in events)
+    # only the first tile changed
+    assert(events[2:] == [('data', 0, 0, 63, 3)])
+    assert(text(0, 0) == 'changed' and text(149, 1) == '298' and text(0, 3) == '')
+    header = table.table_header.model()
+    assert(header.data(header.index(0, 3), QtCore.Qt.DisplayRole) == 'd')
+    index = table.table_data.currentIndex()
+    assert((index.row(), index.column()) == (5, 1))
+    assert(table.table_data.columnWidth(2) == width)
+
+    # different header levels reset the view
+    assert(not table.updateModel(as_model(rows, hdr_rows=2)))
+    assert(table.table_data.model() is not qmodel)
+    viewer.close()
+
+def test_view_update_sorted():
+    import time
+    from gtabview.models import as_model
+    from gtabview.viewer import ExtTableView, QtCore
+    table = ExtTableView()
+    table.setModel(as_model([[i] for i in range(10)]))
+    table.sortByColumns([(0, False)])
+    while table._sort_job is not None:
+        time.sleep(0.01)
+        table._poll_sort()
+    qmodel = table.table_data.model()
+    text = lambda y: qmodel.data(qmodel.index(y, 0), QtCore.Qt.DisplayRole)
+    table.updateModel(as_model([[i] for i in range(12)]))
+    # new rows are shown last until sorted again
+    assert([text(y) for y in [0, 9, 10, 11]] == ['9', '0', '10', '11'])
+    while table._sort_job is not None:
+        time.sleep(0.01)
+        table._poll_sort()
+    assert([text(y) for y in [0, 11]] == ['11', '0'])
+
+def test_controller_update():
+    viewer = view([[1, 2], [3, 4]], wait=False, hdr_rows=0)
+    viewer.update([[1, 2], [3, 5], [6, 7]])
+    model = viewer._view.table.model()
+    assert(model.shape == (3, 2) and model.data(1, 1) == 5)
+    viewer._view.close()
+
+def test_view_follow():
+    import tempfile
+    import time
+    from gtabview.viewer import Viewer
+    from gtabview.dataio import read_model
+    path = tempfile.mktemp(suffix='.csv')
+    with open(path, 'w') as fd:
+        fd.write('a,b\n' + ''.join('{},{}\n'.format(i, i) for i in range(1000)))
+    try:
+        model = read_model(path, follow=True)
+        viewer = Viewer(model, follow=True)
+        assert('following: 1000 rows' in viewer.windowTitle())
+        viewer.table.table_data.scrollToBottom()
+        with open(path, 'a') as fd:
+            fd.write(''.join('{},{}\n'.format(i, i) for i in range(1000, 1100)))
+        end = time.time() + 10
+        while model.shape[0] < 1100 and time.time() < end:
+            time.sleep(0.01)
+        viewer._poll_loading()
+        vscroll = viewer.table.vscroll
+        assert(vscroll.value() == vscroll.maximum() and vscroll.value() > 0)
+        viewer.close()
+        end = time.time() + 10
+        while model.loading and time.time() < end:
+            time.sleep(0.01)
+        assert(not model.loading)
+    finally:
+        os.unlink(path)
+
+def test_view_follow_rotate():
+    import tempfile
+    import time
+    from gtabview.viewer import Viewer, QtCore
+    from gtabview.dataio import read_model
+    path = tempfile.mktemp(suffix='.csv')
+    def write(path, name, rows):
+        with open(path, 'w') as fd:
+            fd.write(','.join('c{}'.format(x) for x in range(20)) + '\n')
+            fd.write(''.join(','.join('{}{}_{}'.format(name, y, x) for x in range(20)) + '\n'
+                             for y in range(rows)))
+    write(path, 'old', 1000)
+    try:
+        model = read_model(path, follow=True)
+        viewer = Viewer(model, follow=True)
+        table = viewer.table
+        qmodel = table.table_data.model()
+        text = lambda y, x: qmodel.data(qmodel.index(y, x), QtCore.Qt.DisplayRole)
+        assert(text(0, 0) == 'old0_0')
+        table.sortByColumns([(0, False)])
+        while table._sort_job is not None:
+            time.sleep(0.01)
+            table._poll_sort()
+        assert(text(0, 0) == 'old9_0')
+
+        # a larger file replacing the followed one is shown (and sorted) again
+        write(path + '.new', 'new', 2000)
+        os.rename(path + '.new', path)
+        end = time.time() + 10
+        while (model.generation == 0 or model.shape[0] < 2000) and time.time() < end:
+            time.sleep(0.01)
+        viewer._poll_loading()
+        while table._sort_job is not None:
+            time.sleep(0.01)
+            table._poll_sort()
+        assert(table.model().shape[0] == 2000 and text(0, 0) == 'new9_0')
+        table.sortByColumns([])
+        assert(text(0, 0) == 'new0_0')
+        viewer.close()
+    finally:
+        os.unlink(path)
+
+def test_view_follow_sorted():
+    import tempfile
+    import time
+    from gtabview.viewer import Viewer, QtCore
+    from gtabview.dataio import read_model
+    path = tempfile.mktemp(suffix='.csv')
+    with open(path, 'w') as fd:
+        fd.write('a,b\n' + ''.join('m{},{}\n'.format(y, y) for y in range(1000)))
+    try:
+        model = read_model(path, follow=True)
+        viewer = Viewer(model, follow=True)
+        table = viewer.table
+        qmodel = table.table_data.model()
+        text = lambda y, x: qmodel.data(qmodel.index(y, x), QtCore.Qt.DisplayRole)
+        table.sortByColumns([(0, False)])
+        while table._sort_job is not None:
+            time.sleep(0.01)
+            table._poll_sort()
+        assert(text(0, 0) == 'm999')
+
+        # rows appended while sorted are shown last, then sorted
+        with open(path, 'a') as fd:
+            fd.write(''.join('z{},{}\n'.format(y, y) for y in range(10)))
+        end = time.time() + 10
+        while model.shape[0] < 1010 and time.time() < end:
+            time.sleep(0.01)
+        viewer._poll_loading()
+        assert(qmodel.rowCount() == 1010 and text(1009, 0) == 'z9' and text(0, 0) == 'm999')
+        while table._sort_job is not None:
+            time.sleep(0.01)
+            table._poll_sort()
+        assert(table.model().shape[0] == 1010 and text(0, 0) == 'z9' and text(10, 0) == 'm999')
+        viewer.close()
+    finally:
+        os.unlink(path)